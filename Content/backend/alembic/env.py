@@ -43,6 +43,9 @@ if context.is_offline_mode():
     context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
     with context.begin_transaction():
         context.run_migrations()
+elif config.attributes.get("connection") is not None:
+    # Conexo j aberta pelo app (migrao no startup, sob advisory lock)
+    do_run_migrations(config.attributes["connection"])
 else:
     # Inicia o loop de eventos para o modo online
     asyncio.run(run_migrations_online())
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""contadores_presenca
+
+Revision ID: 3c9e1d7a5b20
+Revises: ba4f82407301
+Create Date: 2026-10-18 15:02:41.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1d7a5b20'
+down_revision: Union[str, Sequence[str], None] = 'ba4f82407301'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'contadores_presenca',
+        sa.Column('aluno_id', sa.UUID(), nullable=False),
+        sa.Column('dojo_id', sa.UUID(), nullable=False),
+        sa.Column('aulas_desde_graduacao', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('desde', sa.DateTime(), nullable=True),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['aluno_id'], ['alunos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dojo_id'], ['dojos.id']),
+        sa.PrimaryKeyConstraint('aluno_id'),
+    )
+
+    # Carga inicial: sem histórico de graduação, conta desde o início
+    op.execute(
+        """
+        INSERT INTO contadores_presenca (aluno_id, dojo_id, aulas_desde_graduacao, atualizado_em)
+        SELECT a.id, a.dojo_id, count(p.id) FILTER (WHERE p.presente), now()
+        FROM alunos a
+        LEFT JOIN presencas p ON p.aluno_id = a.id
+        GROUP BY a.id, a.dojo_id
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_graduacoes_dojo_id_ordem',
+            'graduacoes',
+            ['dojo_id', 'ordem'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_graduacoes_dojo_id_ordem',
+            table_name='graduacoes',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_table('contadores_presenca')
@@ -0,0 +1,71 @@
+"""rollups_presenca
+
+Revision ID: 5e81c3a9d4f7
+Revises: 7d2f4e8b1a63
+Create Date: 2026-10-18 17:45:09.771254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e81c3a9d4f7'
+down_revision: Union[str, Sequence[str], None] = '7d2f4e8b1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'presencas_dia_dojo',
+        sa.Column('dojo_id', sa.UUID(), nullable=False),
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('presentes', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('registros', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['dojo_id'], ['dojos.id']),
+        sa.PrimaryKeyConstraint('dojo_id', 'dia'),
+    )
+    op.create_table(
+        'presencas_semana_aluno',
+        sa.Column('aluno_id', sa.UUID(), nullable=False),
+        sa.Column('semana', sa.Date(), nullable=False),
+        sa.Column('dojo_id', sa.UUID(), nullable=False),
+        sa.Column('presentes', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['aluno_id'], ['alunos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dojo_id'], ['dojos.id']),
+        sa.PrimaryKeyConstraint('aluno_id', 'semana'),
+    )
+    op.create_index(
+        'ix_presencas_semana_aluno_dojo_id_semana', 'presencas_semana_aluno', ['dojo_id', 'semana']
+    )
+
+    # Carga inicial a partir das presenças existentes
+    op.execute(
+        """
+        INSERT INTO presencas_dia_dojo (dojo_id, dia, presentes, registros)
+        SELECT dojo_id, dia, count(*) FILTER (WHERE presente), count(*)
+        FROM presencas
+        GROUP BY dojo_id, dia
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO presencas_semana_aluno (aluno_id, semana, dojo_id, presentes)
+        SELECT p.aluno_id, date_trunc('week', p.dia)::date, a.dojo_id, count(*)
+        FROM presencas p
+        JOIN alunos a ON a.id = p.aluno_id
+        WHERE p.presente
+        GROUP BY p.aluno_id, date_trunc('week', p.dia)::date, a.dojo_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_presencas_semana_aluno_dojo_id_semana', table_name='presencas_semana_aluno')
+    op.drop_table('presencas_semana_aluno')
+    op.drop_table('presencas_dia_dojo')
@@ -0,0 +1,63 @@
+"""lotes_cobranca
+
+Revision ID: 7c1e5a9f3d84
+Revises: e4a8c6f0b317
+Create Date: 2026-10-18 22:08:14.630271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5a9f3d84'
+down_revision: Union[str, Sequence[str], None] = 'e4a8c6f0b317'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'lotes_cobranca',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('dojo_id', sa.UUID(), nullable=False),
+        sa.Column('referencia_mes', sa.String(length=7), nullable=False),
+        sa.Column('valor', sa.Float(), nullable=False),
+        sa.Column('vencimento', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('cobrados', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('falhas', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('ignorados', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('criado_por', sa.UUID(), nullable=True),
+        sa.Column('criado_em', sa.DateTime(), nullable=True),
+        sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+        sa.Column('concluido_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['dojo_id'], ['dojos.id']),
+        sa.ForeignKeyConstraint(['criado_por'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dojo_id', 'referencia_mes', name='uq_lotes_cobranca_dojo_id_referencia_mes'),
+    )
+    op.create_table(
+        'itens_lote_cobranca',
+        sa.Column('lote_id', sa.UUID(), nullable=False),
+        sa.Column('aluno_id', sa.UUID(), nullable=False),
+        sa.Column('pagamento_id', sa.UUID(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('tentativas', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('ultimo_erro', sa.Text(), nullable=True),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['lote_id'], ['lotes_cobranca.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['aluno_id'], ['alunos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['pagamento_id'], ['pagamentos.id']),
+        sa.PrimaryKeyConstraint('lote_id', 'aluno_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('itens_lote_cobranca')
+    op.drop_table('lotes_cobranca')
@@ -0,0 +1,58 @@
+"""historico_graduacoes
+
+Revision ID: 7d2f4e8b1a63
+Revises: 3c9e1d7a5b20
+Create Date: 2026-10-18 16:20:12.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2f4e8b1a63'
+down_revision: Union[str, Sequence[str], None] = '3c9e1d7a5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'historico_graduacoes',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('aluno_id', sa.UUID(), nullable=False),
+        sa.Column('dojo_id', sa.UUID(), nullable=False),
+        sa.Column('graduacao_id', sa.UUID(), nullable=False),
+        sa.Column('graduacao_anterior_id', sa.UUID(), nullable=True),
+        sa.Column('data', sa.DateTime(), nullable=False),
+        sa.Column('registrado_por', sa.UUID(), nullable=True),
+        sa.ForeignKeyConstraint(['aluno_id'], ['alunos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dojo_id'], ['dojos.id']),
+        sa.ForeignKeyConstraint(['graduacao_id'], ['graduacoes.id']),
+        sa.ForeignKeyConstraint(['graduacao_anterior_id'], ['graduacoes.id']),
+        sa.ForeignKeyConstraint(['registrado_por'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_historico_graduacoes_aluno_id_data', 'historico_graduacoes', ['aluno_id', 'data']
+    )
+
+    # Graduações feitas desde os contadores (contadores_presenca.desde) viram histórico
+    op.execute(
+        """
+        INSERT INTO historico_graduacoes (id, aluno_id, dojo_id, graduacao_id, data)
+        SELECT gen_random_uuid(), c.aluno_id, c.dojo_id, a.graduacao_id, c.desde
+        FROM contadores_presenca c
+        JOIN alunos a ON a.id = c.aluno_id
+        WHERE c.desde IS NOT NULL AND a.graduacao_id IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_historico_graduacoes_aluno_id_data', table_name='historico_graduacoes')
+    op.drop_table('historico_graduacoes')
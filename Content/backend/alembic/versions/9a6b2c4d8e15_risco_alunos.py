@@ -0,0 +1,46 @@
+"""risco_alunos
+
+Revision ID: 9a6b2c4d8e15
+Revises: 5e81c3a9d4f7
+Create Date: 2026-10-18 19:12:33.905184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6b2c4d8e15'
+down_revision: Union[str, Sequence[str], None] = '5e81c3a9d4f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'risco_alunos',
+        sa.Column('aluno_id', sa.UUID(), nullable=False),
+        sa.Column('dojo_id', sa.UUID(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('nivel', sa.String(length=10), nullable=False),
+        sa.Column('queda_frequencia', sa.Float(), nullable=False),
+        sa.Column('semanas_sem_treinar', sa.Integer(), nullable=False),
+        sa.Column('sequencia_semanas', sa.Integer(), nullable=False),
+        sa.Column('pagamentos_atrasados', sa.Integer(), nullable=False),
+        sa.Column('calculado_em', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['aluno_id'], ['alunos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dojo_id'], ['dojos.id']),
+        sa.PrimaryKeyConstraint('aluno_id'),
+    )
+    op.create_index(
+        'ix_risco_alunos_dojo_id_score', 'risco_alunos', ['dojo_id', sa.text('score DESC')]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_risco_alunos_dojo_id_score', table_name='risco_alunos')
+    op.drop_table('risco_alunos')
@@ -0,0 +1,48 @@
+"""cobrancas_adiadas
+
+Revision ID: a8d3f6c1e592
+Revises: d5b9e2a7c461
+Create Date: 2026-10-18 23:58:12.604317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d3f6c1e592'
+down_revision: Union[str, Sequence[str], None] = 'd5b9e2a7c461'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Default constante: só metadado no Postgres 11+, sem reescrever a tabela
+    op.add_column(
+        'pagamentos',
+        sa.Column('cobranca_adiada', sa.Boolean(), server_default='false', nullable=False),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pagamentos_cobranca_adiada',
+            'pagamentos',
+            ['criado_em'],
+            postgresql_where=sa.text('cobranca_adiada'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_pagamentos_cobranca_adiada',
+            table_name='pagamentos',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('pagamentos', 'cobranca_adiada')
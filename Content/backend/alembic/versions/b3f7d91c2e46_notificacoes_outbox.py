@@ -0,0 +1,55 @@
+"""notificacoes_outbox
+
+Revision ID: b3f7d91c2e46
+Revises: 9a6b2c4d8e15
+Create Date: 2026-10-18 20:41:07.512334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f7d91c2e46'
+down_revision: Union[str, Sequence[str], None] = '9a6b2c4d8e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'notificacoes_outbox',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('dojo_id', sa.UUID(), nullable=True),
+        sa.Column('canal', sa.String(length=20), nullable=False),
+        sa.Column('instancia', sa.String(length=50), nullable=False),
+        sa.Column('destino', sa.String(length=30), nullable=False),
+        sa.Column('mensagem', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('tentativas', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('disponivel_em', sa.DateTime(), nullable=False),
+        sa.Column('ultimo_erro', sa.Text(), nullable=True),
+        sa.Column('criado_em', sa.DateTime(), nullable=True),
+        sa.Column('enviado_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['dojo_id'], ['dojos.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_notificacoes_outbox_disponivel_em',
+        'notificacoes_outbox',
+        ['disponivel_em'],
+        postgresql_where=sa.text("status = 'pendente'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_notificacoes_outbox_disponivel_em',
+        table_name='notificacoes_outbox',
+        postgresql_where=sa.text("status = 'pendente'"),
+    )
+    op.drop_table('notificacoes_outbox')
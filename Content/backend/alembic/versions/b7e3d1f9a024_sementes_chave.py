@@ -0,0 +1,32 @@
+"""sementes_chave
+
+Revision ID: b7e3d1f9a024
+Revises: f3a1c8d2b604
+Create Date: 2026-10-18 23:59:58.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d1f9a024'
+down_revision: Union[str, Sequence[str], None] = 'f3a1c8d2b604'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('lutas_chave', sa.Column('cabeca_a', sa.Integer(), nullable=True))
+    op.add_column('lutas_chave', sa.Column('cabeca_b', sa.Integer(), nullable=True))
+    op.add_column('categorias_evento', sa.Column('semente_chave', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('categorias_evento', 'semente_chave')
+    op.drop_column('lutas_chave', 'cabeca_b')
+    op.drop_column('lutas_chave', 'cabeca_a')
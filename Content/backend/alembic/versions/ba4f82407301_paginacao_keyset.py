@@ -0,0 +1,90 @@
+"""paginacao_keyset
+
+Revision ID: ba4f82407301
+Revises: f68ad0e538be
+Create Date: 2026-10-18 13:27:05.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ba4f82407301'
+down_revision: Union[str, Sequence[str], None] = 'f68ad0e538be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Índices keyset: (filtro, chaves de ordenação..., id) -> substituem os anteriores
+# (novo, antigo, tabela, colunas, where parcial)
+INDICES = [
+    ("ix_alunos_dojo_id_nome_id", "ix_alunos_dojo_id_nome", "alunos",
+     ["dojo_id", "nome", "id"], None),
+    ("ix_presencas_aluno_id_data_id", "ix_presencas_aluno_id_data", "presencas",
+     ["aluno_id", "data", "id"], None),
+    ("ix_pagamentos_aluno_id_criado_em_id", "ix_pagamentos_aluno_id_criado_em", "pagamentos",
+     ["aluno_id", "criado_em", "id"], None),
+    ("ix_eventos_dojo_id_data_evento_id", "ix_eventos_dojo_id_data_evento", "eventos",
+     ["dojo_id", "data_evento", "id"], None),
+    ("ix_eventos_feed_id", "ix_eventos_feed", "eventos",
+     [sa.text("promovido DESC"), "data_evento", "id"], "visivel_rede"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pagamentos.dojo_id: lista/pagina por dojo sem passar pelo join com alunos
+    op.add_column('pagamentos', sa.Column('dojo_id', sa.UUID(), nullable=True))
+    op.execute(
+        "UPDATE pagamentos p SET dojo_id = a.dojo_id FROM alunos a WHERE a.id = p.aluno_id"
+    )
+    op.alter_column('pagamentos', 'dojo_id', existing_type=sa.UUID(), nullable=False)
+    op.create_foreign_key(
+        'pagamentos_dojo_id_fkey', 'pagamentos', 'dojos', ['dojo_id'], ['id']
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pagamentos_dojo_id_criado_em_id',
+            'pagamentos',
+            ['dojo_id', 'criado_em', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for novo, antigo, tabela, colunas, where in INDICES:
+            op.create_index(
+                novo,
+                tabela,
+                colunas,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.drop_index(antigo, table_name=tabela, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for novo, antigo, tabela, colunas, where in reversed(INDICES):
+            op.create_index(
+                antigo,
+                tabela,
+                colunas[:-1],
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.drop_index(novo, table_name=tabela, postgresql_concurrently=True, if_exists=True)
+        op.drop_index(
+            'ix_pagamentos_dojo_id_criado_em_id',
+            table_name='pagamentos',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+    op.drop_constraint('pagamentos_dojo_id_fkey', 'pagamentos', type_='foreignkey')
+    op.drop_column('pagamentos', 'dojo_id')
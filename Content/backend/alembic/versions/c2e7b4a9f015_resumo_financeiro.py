@@ -0,0 +1,42 @@
+"""resumo_financeiro
+
+Revision ID: c2e7b4a9f015
+Revises: a8d3f6c1e592
+Create Date: 2026-10-18 23:59:31.482760
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e7b4a9f015'
+down_revision: Union[str, Sequence[str], None] = 'a8d3f6c1e592'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pagamentos_dojo_id_referencia_mes_status',
+            'pagamentos',
+            ['dojo_id', 'referencia_mes', 'status'],
+            postgresql_include=['valor'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_pagamentos_dojo_id_referencia_mes_status',
+            table_name='pagamentos',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,53 @@
+"""regua_cobranca
+
+Revision ID: d5b9e2a7c461
+Revises: 7c1e5a9f3d84
+Create Date: 2026-10-18 23:41:37.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b9e2a7c461'
+down_revision: Union[str, Sequence[str], None] = '7c1e5a9f3d84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'lembretes_cobranca',
+        sa.Column('pagamento_id', sa.UUID(), nullable=False),
+        sa.Column('etapa', sa.Integer(), nullable=False),
+        sa.Column('enfileirado_em', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['pagamento_id'], ['pagamentos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('pagamento_id', 'etapa'),
+    )
+
+    # pagamentos é grande e quente: cria o índice sem travar escritas
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pagamentos_data_vencimento_id_em_aberto',
+            'pagamentos',
+            ['data_vencimento', 'id'],
+            postgresql_where=sa.text("status IN ('pendente', 'atraso')"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_pagamentos_data_vencimento_id_em_aberto',
+            table_name='pagamentos',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_table('lembretes_cobranca')
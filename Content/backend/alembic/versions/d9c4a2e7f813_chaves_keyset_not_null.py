@@ -0,0 +1,57 @@
+"""chaves_keyset_not_null
+
+Revision ID: d9c4a2e7f813
+Revises: b7e3d1f9a024
+Create Date: 2026-10-19 00:00:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9c4a2e7f813'
+down_revision: Union[str, Sequence[str], None] = 'b7e3d1f9a024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Colunas de ordenação do keyset: com NULL, (a, id) < (cursor) nunca é
+    # verdadeiro e as linhas somem das páginas seguintes
+    op.execute("UPDATE eventos SET promovido = false WHERE promovido IS NULL")
+    op.alter_column(
+        'eventos', 'promovido',
+        existing_type=sa.Boolean(),
+        server_default=sa.text('false'),
+        nullable=False,
+    )
+    op.execute(
+        "UPDATE pagamentos SET criado_em = COALESCE(atualizado_em, now() at time zone 'utc') "
+        "WHERE criado_em IS NULL"
+    )
+    op.alter_column(
+        'pagamentos', 'criado_em',
+        existing_type=sa.DateTime(),
+        server_default=sa.text("(now() at time zone 'utc')"),
+        nullable=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'pagamentos', 'criado_em',
+        existing_type=sa.DateTime(),
+        server_default=None,
+        nullable=True,
+    )
+    op.alter_column(
+        'eventos', 'promovido',
+        existing_type=sa.Boolean(),
+        server_default=None,
+        nullable=True,
+    )
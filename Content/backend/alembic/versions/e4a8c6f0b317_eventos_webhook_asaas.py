@@ -0,0 +1,51 @@
+"""eventos_webhook_asaas
+
+Revision ID: e4a8c6f0b317
+Revises: b3f7d91c2e46
+Create Date: 2026-10-18 21:27:50.118409
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a8c6f0b317'
+down_revision: Union[str, Sequence[str], None] = 'b3f7d91c2e46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'eventos_webhook_asaas',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('asaas_event_id', sa.String(length=100), nullable=False),
+        sa.Column('evento', sa.String(length=50), nullable=True),
+        sa.Column('asaas_payment_id', sa.String(length=100), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('recebido_em', sa.DateTime(), nullable=False),
+        sa.Column('processado_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('asaas_event_id'),
+    )
+    op.create_index(
+        'ix_eventos_webhook_asaas_recebido_em',
+        'eventos_webhook_asaas',
+        ['recebido_em'],
+        postgresql_where=sa.text("status = 'pendente'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_eventos_webhook_asaas_recebido_em',
+        table_name='eventos_webhook_asaas',
+        postgresql_where=sa.text("status = 'pendente'"),
+    )
+    op.drop_table('eventos_webhook_asaas')
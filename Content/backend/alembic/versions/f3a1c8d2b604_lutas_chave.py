@@ -0,0 +1,48 @@
+"""lutas_chave
+
+Revision ID: f3a1c8d2b604
+Revises: c2e7b4a9f015
+Create Date: 2026-10-18 23:59:52.117406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a1c8d2b604'
+down_revision: Union[str, Sequence[str], None] = 'c2e7b4a9f015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'lutas_chave',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('evento_id', sa.UUID(), nullable=False),
+        sa.Column('categoria_id', sa.UUID(), nullable=False),
+        sa.Column('rodada', sa.Integer(), nullable=False),
+        sa.Column('posicao', sa.Integer(), nullable=False),
+        sa.Column('atleta_a_id', sa.UUID(), nullable=True),
+        sa.Column('atleta_b_id', sa.UUID(), nullable=True),
+        sa.Column('bye', sa.Boolean(), server_default='false', nullable=False),
+        sa.Column('vencedor_id', sa.UUID(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['evento_id'], ['eventos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['categoria_id'], ['categorias_evento.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['atleta_a_id'], ['alunos.id']),
+        sa.ForeignKeyConstraint(['atleta_b_id'], ['alunos.id']),
+        sa.ForeignKeyConstraint(['vencedor_id'], ['alunos.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('evento_id', 'categoria_id', 'rodada', 'posicao', name='uq_lutas_chave_posicao'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('lutas_chave')
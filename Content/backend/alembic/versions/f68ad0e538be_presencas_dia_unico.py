@@ -0,0 +1,47 @@
+"""presencas_dia_unico
+
+Revision ID: f68ad0e538be
+Revises: fc70f53c6d7e
+Create Date: 2026-10-18 11:04:52.630417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f68ad0e538be'
+down_revision: Union[str, Sequence[str], None] = 'fc70f53c6d7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('presencas', sa.Column('dia', sa.Date(), nullable=True))
+    op.execute("UPDATE presencas SET dia = data::date")
+
+    # Duplicatas antigas (mesmo aluno, mesmo dia) impediriam a constraint.
+    # A chamada grava presente=false e o check-in presente=true no mesmo dia:
+    # mantém uma linha presente se houver, senão a primeira registrada.
+    op.execute(
+        """
+        DELETE FROM presencas p
+        USING presencas o
+        WHERE p.aluno_id = o.aluno_id
+          AND p.dia = o.dia
+          AND (NOT COALESCE(p.presente, false), COALESCE(p.criado_em, p.data), p.id)
+            > (NOT COALESCE(o.presente, false), COALESCE(o.criado_em, o.data), o.id)
+        """
+    )
+
+    op.alter_column('presencas', 'dia', existing_type=sa.Date(), nullable=False)
+    op.create_unique_constraint('uq_presencas_aluno_id_dia', 'presencas', ['aluno_id', 'dia'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_presencas_aluno_id_dia', 'presencas', type_='unique')
+    op.drop_column('presencas', 'dia')
@@ -0,0 +1,61 @@
+"""indices_consultas_quentes
+
+Revision ID: fc70f53c6d7e
+Revises: 2a4ce4feb92b
+Create Date: 2026-10-18 09:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fc70f53c6d7e'
+down_revision: Union[str, Sequence[str], None] = '2a4ce4feb92b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nome, tabela, colunas, where parcial)
+INDICES = [
+    # GET /alunos: WHERE dojo_id = ? ORDER BY nome
+    ("ix_alunos_dojo_id_nome", "alunos", ["dojo_id", "nome"], None),
+    # Histórico/resumo de presença e progresso: WHERE aluno_id = ? AND data >= ?
+    ("ix_presencas_aluno_id_data", "presencas", ["aluno_id", "data"], None),
+    # Pagamentos por aluno (join do dojo + "meus pagamentos")
+    ("ix_pagamentos_aluno_id_criado_em", "pagamentos", ["aluno_id", "criado_em"], None),
+    # Webhook do Asaas: WHERE asaas_id = ?
+    ("ix_pagamentos_asaas_id", "pagamentos", ["asaas_id"], "asaas_id IS NOT NULL"),
+    # Checagem de inscrição duplicada
+    ("ix_inscricoes_evento_evento_id_aluno_id", "inscricoes_evento", ["evento_id", "aluno_id"], None),
+    # Geração de chaves: inscritos pagos de uma categoria
+    ("ix_inscricoes_evento_categoria_pagos", "inscricoes_evento", ["evento_id", "categoria_id"], "pago"),
+    # GET /eventos/meus: WHERE dojo_id = ? ORDER BY data_evento DESC
+    ("ix_eventos_dojo_id_data_evento", "eventos", ["dojo_id", "data_evento"], None),
+    # GET /eventos/feed: WHERE visivel_rede ORDER BY promovido DESC, data_evento
+    ("ix_eventos_feed", "eventos", [sa.text("promovido DESC"), "data_evento"], "visivel_rede"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY não bloqueia escritas, mas não roda dentro de transação
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas, where in INDICES:
+            op.create_index(
+                nome,
+                tabela,
+                colunas,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for nome, tabela, _, _ in reversed(INDICES):
+            op.drop_index(nome, table_name=tabela, postgresql_concurrently=True, if_exists=True)
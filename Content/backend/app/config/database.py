@@ -1,3 +1,8 @@
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from .settings import settings
@@ -5,14 +10,108 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True
-)
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# Perfil do engine (pool, timeouts, echo) vindo do Settings
+# ─────────────────────────────────────────────
+def _connect_args(url: str) -> dict:
+    """statement_timeout por conexão, no formato de cada driver."""
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if not timeout:
+        return {}
+    driver = make_url(url).get_driver_name()
+    if driver == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(timeout)}}
+    # psycopg (3) aceita as opções do libpq
+    return {"options": f"-c statement_timeout={timeout}"}
+
+
+def criar_engine(url: str):
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO and settings.APP_ENV == "dev",
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args=_connect_args(url),
+    )
+
+
+engine = criar_engine(settings.DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+# Réplica somente leitura (opcional). Sem DATABASE_READ_URL, leituras vão ao primário.
+read_engine = criar_engine(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else None
+ReadSessionLocal = (
+    async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+    if read_engine is not None
+    else None
+)
+
 Base = declarative_base()
 
+
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+# ─────────────────────────────────────────────
+# Roteamento de leitura com tolerância a atraso
+#   A saúde da réplica é verificada no máximo a cada
+#   DB_REPLICA_CHECK_INTERVAL_SECONDS; se estiver fora do ar
+#   ou atrasada demais, as leituras caem para o primário.
+# ─────────────────────────────────────────────
+_replica_estado = {"ok": False, "verificado_em": 0.0, "lag": None}
+
+_SQL_LAG_REPLICA = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+async def _replica_disponivel() -> bool:
+    agora = time.monotonic()
+    if agora - _replica_estado["verificado_em"] < settings.DB_REPLICA_CHECK_INTERVAL_SECONDS:
+        return _replica_estado["ok"]
+
+    _replica_estado["verificado_em"] = agora
+    try:
+        async with read_engine.connect() as conn:
+            lag = float((await conn.execute(_SQL_LAG_REPLICA)).scalar() or 0)
+        _replica_estado["lag"] = lag
+        _replica_estado["ok"] = lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        if not _replica_estado["ok"]:
+            logger.warning("Réplica atrasada %.1fs; leituras indo para o primário.", lag)
+    except Exception as e:
+        _replica_estado["ok"] = False
+        _replica_estado["lag"] = None
+        logger.warning("Réplica indisponível (%s); leituras indo para o primário.", e)
+    return _replica_estado["ok"]
+
+
+async def get_read_db():
+    """Sessão para rotas GET: réplica quando saudável, primário caso contrário."""
+    if ReadSessionLocal is not None and await _replica_disponivel():
+        async with ReadSessionLocal() as session:
+            yield session
+    else:
+        async with AsyncSessionLocal() as session:
+            yield session
+
+
+def replica_stats() -> dict:
+    return {
+        "configurada": read_engine is not None,
+        "ok": _replica_estado["ok"],
+        "lag_segundos": _replica_estado["lag"],
+    }
@@ -0,0 +1,117 @@
+import importlib.util
+import logging
+
+import httpx
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# Clientes HTTP de longa duração (Asaas, Evolution...)
+# Um httpx.AsyncClient por integração: keep-alive entre chamadas, limites de
+# conexão e timeouts explícitos. Abertos e fechados no lifespan do FastAPI.
+# ─────────────────────────────────────────────
+def _http2() -> bool:
+    if not settings.HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning('HTTP2=true, mas o pacote h2 não está instalado (pip install "httpx[http2]"); usando HTTP/1.1.')
+        return False
+    return True
+
+
+def timeouts() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=settings.HTTP_CONNECT_TIMEOUT,
+        read=settings.HTTP_READ_TIMEOUT,
+        write=settings.HTTP_WRITE_TIMEOUT,
+        pool=settings.HTTP_POOL_TIMEOUT,
+    )
+
+
+def limites() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+class ClienteHTTP:
+    """
+    Cliente compartilhado de uma integração. `client` abre sob demanda, então
+    scripts e jobs fora do FastAPI também funcionam; no app, o lifespan abre
+    todos na subida e fecha na saída.
+    """
+
+    def __init__(self, nome: str, base_url: str, headers: dict, **kwargs):
+        self.nome = nome
+        self.base_url = base_url
+        self.headers = headers
+        self.kwargs = kwargs
+        self._client: httpx.AsyncClient | None = None
+        self.requisicoes = 0
+        self.conexoes_novas = 0
+        clientes_http.append(self)
+
+    async def _trace(self, evento: str, info: dict):
+        # Extensão "trace" do httpcore: conta handshakes (TCP) de verdade
+        if evento == "connection.connect_tcp.complete":
+            self.conexoes_novas += 1
+
+    async def _ao_enviar(self, request: httpx.Request):
+        self.requisicoes += 1
+        request.extensions["trace"] = self._trace
+
+    def abrir(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=timeouts(),
+                limits=limites(),
+                http2=_http2(),
+                event_hooks={"request": [self._ao_enviar]},
+                **self.kwargs,
+            )
+        return self._client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.abrir()
+
+    async def fechar(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "aberto": self._client is not None and not self._client.is_closed,
+            "requisicoes": self.requisicoes,
+            "conexoes_novas": self.conexoes_novas,
+        }
+
+
+clientes_http: list[ClienteHTTP] = []
+
+
+def abrir_clientes_http():
+    for cliente in clientes_http:
+        cliente.abrir()
+
+
+async def fechar_clientes_http():
+    for cliente in clientes_http:
+        await cliente.fechar()
+
+
+def clientes_http_stats() -> dict:
+    return {
+        "http2": settings.HTTP2,
+        "max_conexoes": settings.HTTP_MAX_CONNECTIONS,
+        "max_keepalive": settings.HTTP_MAX_KEEPALIVE,
+        **{cliente.nome: cliente.stats() for cliente in clientes_http},
+    }
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+from .database import engine, read_engine, Base
+from .settings import settings
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[2] / "alembic"
+
+# Chave fixa do pg_advisory_lock: só um worker migra por vez
+LOCK_MIGRACAO = 0x0B0D0_A1E3B1C
+
+
+def _alembic_config(sync_conn=None) -> Config:
+    # Sem arquivo .ini: o env.py não reconfigura o logging do app
+    cfg = Config()
+    cfg.set_main_option("script_location", str(ALEMBIC_DIR))
+    if sync_conn is not None:
+        cfg.attributes["connection"] = sync_conn
+    return cfg
+
+
+def revisao_head() -> str:
+    return ScriptDirectory.from_config(_alembic_config()).get_current_head()
+
+
+def _estado_banco(sync_conn) -> tuple[str | None, bool]:
+    """(revisão atual, banco tem tabelas do app)."""
+    atual = MigrationContext.configure(sync_conn).get_current_revision()
+    tabelas = set(inspect(sync_conn).get_table_names()) - {"alembic_version"}
+    return atual, bool(tabelas)
+
+
+def _migrar(sync_conn, head: str):
+    atual, tem_tabelas = _estado_banco(sync_conn)
+    # O Alembic precisa abrir a própria transação (autocommit_block depende disso)
+    sync_conn.commit()
+    if atual == head:
+        return "já estava no head"
+    cfg = _alembic_config(sync_conn)
+    if atual is None and not tem_tabelas:
+        # Banco vazio: as tabelas base não estão no histórico do Alembic,
+        # então cria tudo pelos models (que refletem o head) e carimba
+        Base.metadata.create_all(sync_conn)
+        sync_conn.commit()
+        command.stamp(cfg, head)
+        return "banco vazio criado e carimbado no head"
+    if atual is None:
+        raise RuntimeError(
+            "Banco com tabelas mas sem alembic_version. "
+            "Carimbe a revisão correspondente com `alembic stamp <rev>` antes de subir."
+        )
+    command.upgrade(cfg, head)
+    return f"migrado de {atual}"
+
+
+async def _esperar_lock(conn):
+    """
+    pg_try_advisory_lock em transações curtas. Um pg_advisory_lock bloqueante
+    deixaria a transação aberta, e o CREATE INDEX CONCURRENTLY do worker que
+    está migrando ficaria esperando por ela para sempre.
+    """
+    while True:
+        obtido = (await conn.execute(text("SELECT pg_try_advisory_lock(:chave)"), {"chave": LOCK_MIGRACAO})).scalar()
+        await conn.commit()
+        if obtido:
+            return
+        await asyncio.sleep(0.5)
+
+
+# ─────────────────────────────────────────────
+# Verificação de schema no startup
+#   Compara alembic_version com o head. Sem DB_MIGRATE_ON_STARTUP,
+#   qualquer diferença impede o worker de subir; com ele, migra
+#   segurando um advisory lock (os outros workers esperam e
+#   encontram o banco já no head).
+# ─────────────────────────────────────────────
+async def verificar_schema() -> str:
+    head = revisao_head()
+
+    async with engine.connect() as conn:
+        atual, _ = await conn.run_sync(_estado_banco)
+        await conn.rollback()
+        if atual == head:
+            return f"schema no head ({head})"
+
+        if not settings.DB_MIGRATE_ON_STARTUP:
+            raise RuntimeError(
+                f"Schema do banco em {atual or 'nenhuma revisão'}, esperado {head}. "
+                "Rode `alembic upgrade head` ou suba com DB_MIGRATE_ON_STARTUP=true."
+            )
+
+        # Migrações (índices CONCURRENTLY, backfills) podem passar do timeout padrão
+        await conn.execute(text("SET statement_timeout = 0"))
+        await conn.commit()
+        await _esperar_lock(conn)
+        try:
+            resultado = await conn.run_sync(_migrar, head)
+            await conn.commit()
+        finally:
+            await conn.rollback()
+            await conn.execute(text("SELECT pg_advisory_unlock(:chave)"), {"chave": LOCK_MIGRACAO})
+            await conn.execute(text("RESET statement_timeout"))
+            await conn.commit()
+    return f"schema {resultado} ({head})"
+
+
+async def _aquecer(eng, quantidade: int):
+    """Abre `quantidade` conexões ao mesmo tempo e devolve todas ao pool."""
+    async with AsyncExitStack() as pilha:
+        for _ in range(quantidade):
+            conn = await pilha.enter_async_context(eng.connect())
+            await conn.execute(text("SELECT 1"))
+
+
+async def aquecer_pool() -> int:
+    quantidade = min(settings.DB_POOL_PREWARM, settings.DB_POOL_SIZE)
+    if quantidade <= 0:
+        return 0
+    await _aquecer(engine, quantidade)
+    if read_engine is not None:
+        await _aquecer(read_engine, quantidade)
+    return quantidade
+
+
+async def inicializar_banco() -> dict:
+    """Checagem de schema + aquecimento do pool, com o tempo de cada etapa."""
+    inicio = time.perf_counter()
+    schema = await verificar_schema()
+    t_schema = time.perf_counter()
+    conexoes = await aquecer_pool()
+    t_pool = time.perf_counter()
+    return {
+        "schema": schema,
+        "schema_ms": round((t_schema - inicio) * 1000, 1),
+        "conexoes_aquecidas": conexoes,
+        "aquecimento_ms": round((t_pool - t_schema) * 1000, 1),
+    }
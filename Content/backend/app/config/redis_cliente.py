@@ -0,0 +1,44 @@
+import importlib.util
+import logging
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# Redis opcional, compartilhado pelos caches que precisam valer entre
+# processos (PIX...). REDIS_URL vazio = cada cache fica só em memória.
+# ─────────────────────────────────────────────
+_cliente = None
+_verificado = False
+
+
+def redis_cliente():
+    """redis.asyncio.Redis de REDIS_URL, ou None (não configurado / pacote ausente)."""
+    global _cliente, _verificado
+    if _cliente is not None or _verificado:
+        return _cliente
+    _verificado = True
+    if not settings.REDIS_URL:
+        return None
+    if importlib.util.find_spec("redis") is None:
+        logger.warning("REDIS_URL definido, mas o pacote redis não está instalado (pip install redis); usando cache em memória.")
+        return None
+    import redis.asyncio as redis
+
+    _cliente = redis.from_url(
+        settings.REDIS_URL,
+        socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_TIMEOUT_SECONDS,
+        decode_responses=True,
+    )
+    return _cliente
+
+
+async def fechar_redis():
+    global _cliente, _verificado
+    if _cliente is not None:
+        await _cliente.aclose()
+    _cliente = None
+    _verificado = False
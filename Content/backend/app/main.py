@@ -5,25 +5,73 @@ import sys
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from fastapi import FastAPI
+import secrets
+import time
+
+# Início do cold start do worker (imports + lifespan)
+_INICIO = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from app.config.database import engine, Base
-from app.routes import auth, alunos, pagamentos, presencas, dojos
+from app.config.database import engine, read_engine, replica_stats
+from app.config.migracoes import inicializar_banco
+from app.config.http_clientes import abrir_clientes_http, fechar_clientes_http, clientes_http_stats
+from app.config.redis_cliente import fechar_redis
+from app.routes import auth, alunos, pagamentos, presencas, dojos, eventos
+from app.services.auth_service import usuarios_cache, hash_pool_stats
+from app.services.notificacao_service import worker_notificacoes
+from app.services.webhook_service import consumidor_webhooks
+from app.services.cliente_asaas_service import clientes_asaas
+from app.services.pix_service import cache_pix
+from app.services.resumo_financeiro_service import cache_resumo_financeiro
+from app.services.chaveamento_service import cache_chaves
+from app.services.cobranca_service import worker_cobrancas_adiadas, parar_execucoes
+from app.services.resiliencia import integracoes_stats
+from app.config.settings import settings
 
 print(f"DEBUG: DATABASE_URL -> {engine.url}")
 
 
 # ─────────────────────────────────────────────
-# Lifespan: cria tabelas ao iniciar o servidor
+# Lifespan: confere a revisão do Alembic (ou migra sob advisory
+# lock), aquece o pool, abre os clientes HTTP das integrações e
+# sobe os workers (outbox de notificações, webhooks do Asaas,
+# cobranças adiadas)
 # ─────────────────────────────────────────────
+inicializacao: dict = {}
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("✅ Tabelas criadas / verificadas com sucesso.")
+    t_imports = time.perf_counter()
+    inicializacao.update(await inicializar_banco())
+    abrir_clientes_http()
+    if settings.OUTBOX_WORKER_ENABLED:
+        worker_notificacoes.iniciar()
+    if settings.WEBHOOK_WORKER_ENABLED:
+        consumidor_webhooks.iniciar()
+    if settings.BILLING_RETRY_WORKER_ENABLED:
+        worker_cobrancas_adiadas.iniciar()
+    inicializacao["imports_ms"] = round((t_imports - _INICIO) * 1000, 1)
+    inicializacao["cold_start_ms"] = round((time.perf_counter() - _INICIO) * 1000, 1)
+    print(
+        f"✅ {inicializacao['schema']}; {inicializacao['conexoes_aquecidas']} conexões aquecidas. "
+        f"Cold start: {inicializacao['cold_start_ms']} ms "
+        f"(imports {inicializacao['imports_ms']} ms, schema {inicializacao['schema_ms']} ms, "
+        f"pool {inicializacao['aquecimento_ms']} ms)"
+    )
     yield
+    await parar_execucoes()
+    await worker_cobrancas_adiadas.parar()
+    await consumidor_webhooks.parar()
+    await worker_notificacoes.parar()
+    await fechar_clientes_http()
+    await fechar_redis()
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
 
 
 # ─────────────────────────────────────────────
@@ -53,6 +101,7 @@ app.include_router(alunos.router)
 app.include_router(pagamentos.router)
 app.include_router(presencas.router)
 app.include_router(dojos.router)
+app.include_router(eventos.router)
 
 
 # ─────────────────────────────────────────────
@@ -60,4 +109,39 @@ app.include_router(dojos.router)
 # ─────────────────────────────────────────────
 @app.get("/health")
 async def health():
-    return {"status": "ok", "app": "BudoManager"}
\ No newline at end of file
+    return {"status": "ok", "app": "BudoManager"}
+
+
+# ─────────────────────────────────────────────
+# Métricas internas (caches, filas, integrações)
+#   Números do processo inteiro, de todos os dojos: protegidas por
+#   token de operação (METRICS_TOKEN), não pelo login dos usuários.
+# ─────────────────────────────────────────────
+def _exigir_token_metricas(x_metrics_token: str | None):
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_metrics_token or not secrets.compare_digest(x_metrics_token, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido.")
+
+
+@app.get("/metricas")
+async def metricas(x_metrics_token: str | None = Header(default=None)):
+    _exigir_token_metricas(x_metrics_token)
+    return {
+        "usuarios_cache": usuarios_cache.stats(),
+        "bcrypt_pool": hash_pool_stats(),
+        "replica": replica_stats(),
+        "inicializacao": inicializacao,
+        "clientes_http": clientes_http_stats(),
+        "resiliencia": integracoes_stats(),
+        "clientes_asaas": clientes_asaas.stats(),
+        "pix_cache": cache_pix.stats(),
+        "resumo_financeiro_cache": cache_resumo_financeiro.stats(),
+        "chaves_cache": cache_chaves.stats(),
+        "notificacoes": worker_notificacoes.stats(),
+        "webhooks_asaas": {**consumidor_webhooks.stats(), **await consumidor_webhooks.fila_stats()},
+        "cobrancas_adiadas": {
+            **worker_cobrancas_adiadas.stats(),
+            "pendentes": await worker_cobrancas_adiadas.pendentes(),
+        },
+    }
\ No newline at end of file
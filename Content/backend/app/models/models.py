@@ -1,6 +1,8 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, Float
+from sqlalchemy import (
+    Column, String, Integer, BigInteger, Boolean, DateTime, Date, ForeignKey, Text, Float, Index, UniqueConstraint, text
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.config.database import Base
@@ -17,7 +19,8 @@ class Evento(Base):
     # "interno" (exame/seminário) ou "publico" (campeonato/open)
     tipo = Column(String(50), default="interno")
     visivel_rede = Column(Boolean, default=False)
-    promovido = Column(Boolean, default=False)
+    # Chave do keyset do feed: NULL furaria a comparação de tupla do cursor
+    promovido = Column(Boolean, nullable=False, default=False, server_default="false")
 
     valor_inscricao = Column(Float, default=0.0)
     status = Column(String(20), default="aberto") # aberto, em_andamento, encerrado
@@ -31,6 +34,16 @@ class Evento(Base):
     categorias = relationship("CategoriaEvento", back_populates="evento", cascade="all, delete-orphan")
     inscritos = relationship("InscricaoEvento", back_populates="evento")
 
+    __table_args__ = (
+        Index("ix_eventos_dojo_id_data_evento_id", "dojo_id", "data_evento", "id"),
+        # Feed público: só eventos visíveis, promovidos primeiro
+        Index(
+            "ix_eventos_feed_id",
+            text("promovido DESC"), "data_evento", "id",
+            postgresql_where=text("visivel_rede"),
+        ),
+    )
+
 class CategoriaEvento(Base):
     __tablename__ = "categorias_evento"
 
@@ -43,6 +56,8 @@ class CategoriaEvento(Base):
     idade_min = Column(Integer, nullable=True)
     idade_max = Column(Integer, nullable=True)
     faixa_permitida = Column(String(100), nullable=True) # Ex: "Branca,Azul"
+    # Semente do sorteio da última chave gerada (refaz o mesmo sorteio)
+    semente_chave = Column(BigInteger, nullable=True)
 
     evento = relationship("Evento", back_populates="categorias")
     inscritos = relationship("InscricaoEvento", back_populates="categoria_rel")
@@ -61,6 +76,16 @@ class InscricaoEvento(Base):
     categoria_rel = relationship("CategoriaEvento", back_populates="inscritos")
     aluno = relationship("Aluno")
 
+    __table_args__ = (
+        Index("ix_inscricoes_evento_evento_id_aluno_id", "evento_id", "aluno_id"),
+        # Geração de chaves: inscritos pagos de uma categoria
+        Index(
+            "ix_inscricoes_evento_categoria_pagos",
+            "evento_id", "categoria_id",
+            postgresql_where=text("pago"),
+        ),
+    )
+
 
 class Dojo(Base):
     __tablename__ = "dojos"
@@ -115,12 +140,18 @@ class Aluno(Base):
     pagamentos = relationship("Pagamento", back_populates="aluno")
     presencas = relationship("Presenca", back_populates="aluno")
 
+    __table_args__ = (
+        Index("ix_alunos_dojo_id_nome_id", "dojo_id", "nome", "id"),
+    )
+
 
 
 class Pagamento(Base):
     __tablename__ = "pagamentos"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # Desnormalizado do aluno (como em presencas) para listar/paginar por dojo sem join
+    dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), nullable=False)
     aluno_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id"), nullable=False)
     valor = Column(Float, nullable=False)
     status = Column(String(20), default="pendente")
@@ -129,12 +160,50 @@ class Pagamento(Base):
     referencia_mes = Column(String(7), nullable=True)
 
     data_vencimento = Column(DateTime, nullable=True)
-
-    criado_em = Column(DateTime, default=datetime.utcnow)
+    # Asaas fora do ar na criação: a cobrança sai depois (WorkerCobrancasAdiadas)
+    cobranca_adiada = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    # Chave do keyset das listagens: NOT NULL pelo mesmo motivo de Evento.promovido
+    criado_em = Column(
+        DateTime, nullable=False, default=datetime.utcnow,
+        server_default=text("(now() at time zone 'utc')"),
+    )
     atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     aluno = relationship("Aluno", back_populates="pagamentos")
 
+    __table_args__ = (
+        Index("ix_pagamentos_aluno_id_criado_em_id", "aluno_id", "criado_em", "id"),
+        Index("ix_pagamentos_dojo_id_criado_em_id", "dojo_id", "criado_em", "id"),
+        # Lookup do webhook do Asaas
+        Index(
+            "ix_pagamentos_asaas_id",
+            "asaas_id",
+            postgresql_where=text("asaas_id IS NOT NULL"),
+        ),
+        # Régua de cobrança: só os em aberto, por vencimento (keyset com id)
+        Index(
+            "ix_pagamentos_data_vencimento_id_em_aberto",
+            "data_vencimento",
+            "id",
+            postgresql_where=text("status IN ('pendente', 'atraso')"),
+        ),
+        # Resumo financeiro por dojo (GROUP BY referencia_mes, status) sem ler a tabela
+        Index(
+            "ix_pagamentos_dojo_id_referencia_mes_status",
+            "dojo_id",
+            "referencia_mes",
+            "status",
+            postgresql_include=["valor"],
+        ),
+        # Fila das cobranças adiadas (quase sempre vazia)
+        Index(
+            "ix_pagamentos_cobranca_adiada",
+            "criado_em",
+            postgresql_where=text("cobranca_adiada"),
+        ),
+    )
+
 
 class Presenca(Base):
     __tablename__ = "presencas"
@@ -143,11 +212,59 @@ class Presenca(Base):
     dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), nullable=False)
     aluno_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id"), nullable=False)
     data = Column(DateTime, nullable=False)
+    # Dia da presença (data sem hora): chave da regra "uma presença por dia"
+    dia = Column(Date, nullable=False, default=lambda ctx: ctx.get_current_parameters()["data"].date())
     presente = Column(Boolean, default=True)
     criado_em = Column(DateTime, default=datetime.utcnow)
 
     aluno = relationship("Aluno", back_populates="presencas")
 
+    __table_args__ = (
+        Index("ix_presencas_aluno_id_data_id", "aluno_id", "data", "id"),
+        UniqueConstraint("aluno_id", "dia", name="uq_presencas_aluno_id_dia"),
+    )
+
+class PresencaDiaDojo(Base):
+    """Rollup diário por dojo, mantido a cada escrita de presença."""
+    __tablename__ = "presencas_dia_dojo"
+
+    dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    presentes = Column(Integer, nullable=False, default=0, server_default="0")
+    registros = Column(Integer, nullable=False, default=0, server_default="0")
+
+class PresencaSemanaAluno(Base):
+    """Rollup semanal por aluno (semana = segunda-feira)."""
+    __tablename__ = "presencas_semana_aluno"
+
+    aluno_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id", ondelete="CASCADE"), primary_key=True)
+    semana = Column(Date, primary_key=True)
+    dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), nullable=False)
+    presentes = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_presencas_semana_aluno_dojo_id_semana", "dojo_id", "semana"),
+    )
+
+class RiscoAluno(Base):
+    """Score de risco de evasão, reescrito pelo job scripts/calcular_risco."""
+    __tablename__ = "risco_alunos"
+
+    aluno_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id", ondelete="CASCADE"), primary_key=True)
+    dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), nullable=False)
+    score = Column(Float, nullable=False)  # 0 a 1
+    nivel = Column(String(10), nullable=False)  # baixo | medio | alto
+    # Fatores que explicam o score
+    queda_frequencia = Column(Float, nullable=False)
+    semanas_sem_treinar = Column(Integer, nullable=False)
+    sequencia_semanas = Column(Integer, nullable=False)
+    pagamentos_atrasados = Column(Integer, nullable=False)
+    calculado_em = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_risco_alunos_dojo_id_score", "dojo_id", text("score DESC")),
+    )
+
 class Graduacao(Base):
     __tablename__ = "graduacoes"
 
@@ -158,4 +275,169 @@ class Graduacao(Base):
     cor_hex = Column(String(7), nullable=True) # Para a UI brilhar com a cor da faixa
     aulas_necessarias = Column(Integer, default=0)
 
-    dojo = relationship("Dojo")
\ No newline at end of file
+    dojo = relationship("Dojo")
+
+    __table_args__ = (
+        Index("ix_graduacoes_dojo_id_ordem", "dojo_id", "ordem"),
+    )
+
+class HistoricoGraduacao(Base):
+    __tablename__ = "historico_graduacoes"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    aluno_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id", ondelete="CASCADE"), nullable=False)
+    dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), nullable=False)
+    graduacao_id = Column(UUID(as_uuid=True), ForeignKey("graduacoes.id"), nullable=False)
+    graduacao_anterior_id = Column(UUID(as_uuid=True), ForeignKey("graduacoes.id"), nullable=True)
+    data = Column(DateTime, nullable=False, default=datetime.utcnow)
+    registrado_por = Column(UUID(as_uuid=True), ForeignKey("usuarios.id"), nullable=True)
+
+    graduacao = relationship("Graduacao", foreign_keys=[graduacao_id])
+
+    __table_args__ = (
+        # Âncora "desde a última graduação": ORDER BY data DESC LIMIT 1 por aluno
+        Index("ix_historico_graduacoes_aluno_id_data", "aluno_id", "data"),
+    )
+
+class ContadorPresenca(Base):
+    """Aulas presentes desde a última graduação, mantido a cada escrita de presença."""
+    __tablename__ = "contadores_presenca"
+
+    aluno_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id", ondelete="CASCADE"), primary_key=True)
+    dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), nullable=False)
+    aulas_desde_graduacao = Column(Integer, nullable=False, default=0, server_default="0")
+    # Início da contagem (última graduação); NULL = desde o início
+    desde = Column(DateTime, nullable=True)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class NotificacaoOutbox(Base):
+    """
+    Outbox de notificações (WhatsApp): gravada na mesma transação da mudança
+    de negócio e drenada pelo worker (app/services/notificacao_service.py).
+    """
+    __tablename__ = "notificacoes_outbox"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), nullable=True)
+    canal = Column(String(20), nullable=False, default="whatsapp")
+    instancia = Column(String(50), nullable=False)  # instância da Evolution API
+    destino = Column(String(30), nullable=False)
+    mensagem = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="pendente")  # pendente | enviada | falhou
+    tentativas = Column(Integer, nullable=False, default=0, server_default="0")
+    # Próxima vez que o worker pode pegar a linha (backoff e lease de envio)
+    disponivel_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    ultimo_erro = Column(Text, nullable=True)
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    enviado_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Fila: só as pendentes, na ordem em que ficam disponíveis
+        Index(
+            "ix_notificacoes_outbox_disponivel_em",
+            "disponivel_em",
+            postgresql_where=text("status = 'pendente'"),
+        ),
+    )
+
+class EventoWebhookAsaas(Base):
+    """
+    Evento bruto recebido do Asaas. O webhook só grava (idempotente pelo
+    asaas_event_id) e responde; o consumidor em lote aplica as transições.
+    """
+    __tablename__ = "eventos_webhook_asaas"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # id do evento no Asaas (evt_...); retentativas chegam com o mesmo id
+    asaas_event_id = Column(String(100), nullable=False, unique=True)
+    evento = Column(String(50), nullable=True)
+    asaas_payment_id = Column(String(100), nullable=True)
+    payload = Column(Text, nullable=False)  # JSON original, para auditoria
+    status = Column(String(20), nullable=False, default="pendente")  # pendente | processado | ignorado
+    recebido_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    processado_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Fila do consumidor: só as pendentes, na ordem de chegada
+        Index(
+            "ix_eventos_webhook_asaas_recebido_em",
+            "recebido_em",
+            postgresql_where=text("status = 'pendente'"),
+        ),
+    )
+
+class LoteCobranca(Base):
+    """Cobrança mensal de um dojo inteiro (uma por dojo e mês; rodar de novo retoma)."""
+    __tablename__ = "lotes_cobranca"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    dojo_id = Column(UUID(as_uuid=True), ForeignKey("dojos.id"), nullable=False)
+    referencia_mes = Column(String(7), nullable=False)
+    valor = Column(Float, nullable=False)
+    vencimento = Column(Date, nullable=False)
+    status = Column(String(20), nullable=False, default="aberto")  # aberto | executando | concluido | com_falhas
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+    cobrados = Column(Integer, nullable=False, default=0, server_default="0")
+    falhas = Column(Integer, nullable=False, default=0, server_default="0")
+    ignorados = Column(Integer, nullable=False, default=0, server_default="0")
+    criado_por = Column(UUID(as_uuid=True), ForeignKey("usuarios.id"), nullable=True)
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("dojo_id", "referencia_mes", name="uq_lotes_cobranca_dojo_id_referencia_mes"),
+    )
+
+class ItemLoteCobranca(Base):
+    """Progresso por aluno de um lote: o que já foi cobrado não é cobrado de novo."""
+    __tablename__ = "itens_lote_cobranca"
+
+    lote_id = Column(UUID(as_uuid=True), ForeignKey("lotes_cobranca.id", ondelete="CASCADE"), primary_key=True)
+    aluno_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id", ondelete="CASCADE"), primary_key=True)
+    pagamento_id = Column(UUID(as_uuid=True), ForeignKey("pagamentos.id"), nullable=False)
+    status = Column(String(20), nullable=False, default="pendente")  # pendente | cobrado | falhou | ignorado
+    # > 0 = já houve chamada ao Asaas: antes de cobrar de novo, procura pela externalReference
+    tentativas = Column(Integer, nullable=False, default=0, server_default="0")
+    ultimo_erro = Column(Text, nullable=True)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class LembreteCobranca(Base):
+    """Lembrete da régua de cobrança já enfileirado: um por pagamento e etapa, nunca repete."""
+    __tablename__ = "lembretes_cobranca"
+
+    pagamento_id = Column(UUID(as_uuid=True), ForeignKey("pagamentos.id", ondelete="CASCADE"), primary_key=True)
+    # Dias em relação ao vencimento (-3 = três dias antes, 0 = no dia, 10 = dez dias de atraso)
+    etapa = Column(Integer, primary_key=True)
+    enfileirado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class LutaChave(Base):
+    """
+    Uma luta da chave de uma categoria. Resultado grava só esta linha e a
+    vaga da próxima luta (rodada + 1, posicao // 2); o JSON da chave é
+    montado na leitura.
+    """
+    __tablename__ = "lutas_chave"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    evento_id = Column(UUID(as_uuid=True), ForeignKey("eventos.id", ondelete="CASCADE"), nullable=False)
+    categoria_id = Column(UUID(as_uuid=True), ForeignKey("categorias_evento.id", ondelete="CASCADE"), nullable=False)
+    rodada = Column(Integer, nullable=False)  # 1 = primeira rodada
+    posicao = Column(Integer, nullable=False)  # 0-based dentro da rodada
+    atleta_a_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id"), nullable=True)
+    atleta_b_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id"), nullable=True)
+    # Número de cabeça de chave de cada lado (só na rodada 1; None = sorteado)
+    cabeca_a = Column(Integer, nullable=True)
+    cabeca_b = Column(Integer, nullable=True)
+    # Lado b vazio por bye (não por esperar o vencedor da rodada anterior)
+    bye = Column(Boolean, nullable=False, default=False, server_default="false")
+    vencedor_id = Column(UUID(as_uuid=True), ForeignKey("alunos.id"), nullable=True)
+    status = Column(String(20), nullable=False, default="aguardando")  # aguardando | pendente | finalizado
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Chave da categoria em ordem e a próxima luta de um vencedor
+        UniqueConstraint("evento_id", "categoria_id", "rodada", "posicao", name="uq_lutas_chave_posicao"),
+    )
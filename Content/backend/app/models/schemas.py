@@ -1,9 +1,16 @@
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, Dict, Any, List
-from datetime import datetime
+from typing import Optional, Dict, Any, List, Generic, TypeVar
+from datetime import date, datetime
 from uuid import UUID
 import re
 
+T = TypeVar("T")
+
+class Pagina(BaseModel, Generic[T]):
+    """Página de resultados com cursor opaco para a próxima (keyset)."""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 class GraduarRequest(BaseModel):
     nova_gradu_id: UUID
 
@@ -64,10 +71,23 @@ class InscricaoExternaRequest(BaseModel):
     email: EmailStr
     telefone: str
     categoria_id: UUID
+    cpf: Optional[str] = None  # obrigatório em evento pago (cliente no Asaas)
+
+    @field_validator('cpf', mode='before')
+    @classmethod
+    def limpar_cpf(cls, v):
+        if isinstance(v, str):
+            return re.sub(r'\D', '', v) or None
+        return v
 
 class GerarChaveRequest(BaseModel):
     categoria_id: UUID
     metodo: str = "simples" # simples (mata-mata) ou pontos
+    cabecas_de_chave: List[UUID] = []  # aluno_ids na ordem do ranking; o resto é sorteado
+    semente: Optional[int] = None  # reproduz o sorteio
+
+class ResultadoLutaRequest(BaseModel):
+    vencedor_id: UUID
 
 class PresencaItem(BaseModel):
     aluno_id: UUID
@@ -77,6 +97,19 @@ class PresencaBulk(BaseModel):
     data: datetime
     lista_presenca: List[PresencaItem]
 
+class PresencaBulkItemResultado(BaseModel):
+    aluno_id: UUID
+    status: str  # inserido | atualizado | inalterado | rejeitado
+    motivo: Optional[str] = None
+
+class PresencaBulkResponse(BaseModel):
+    message: str
+    inseridos: int
+    atualizados: int
+    inalterados: int
+    rejeitados: int
+    itens: List[PresencaBulkItemResultado]
+
 class AsaasWebhook(BaseModel):
     event: str
     payment: Dict[str, Any]
@@ -194,6 +227,31 @@ class AlunoResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ProgressoAlunoResponse(BaseModel):
+    id: UUID
+    nome: str
+    faixa_nome: Optional[str]
+    total_aulas: int
+    meta_aulas: int
+    progresso_percentual: float
+    pronto_para_exame: bool
+    ultima_graduacao: Optional[datetime]
+    proxima_faixa_id: Optional[UUID]
+    proxima_faixa_nome: Optional[str]
+
+
+class RiscoAlunoResponse(BaseModel):
+    id: UUID
+    nome: str
+    score: float
+    nivel: str
+    queda_frequencia: float
+    semanas_sem_treinar: int
+    sequencia_semanas: int
+    pagamentos_atrasados: int
+    calculado_em: datetime
+
+
 class PagamentoCreate(BaseModel):
     aluno_id: UUID
     valor: float
@@ -207,10 +265,48 @@ class PagamentoResponse(BaseModel):
     status: str
     metodo: Optional[str]
     referencia_mes: Optional[str]
+    # Asaas fora do ar na criação: a cobrança ainda vai ser enviada
+    cobranca_adiada: bool = False
     criado_em: datetime
     model_config = {"from_attributes": True}
 
 
+class LoteCobrancaCreate(BaseModel):
+    referencia_mes: str  # YYYY-MM
+    valor: float
+    dia_vencimento: int = 10
+
+    @field_validator('referencia_mes')
+    @classmethod
+    def validar_mes(cls, v):
+        if not re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', v):
+            raise ValueError('referencia_mes deve estar no formato YYYY-MM')
+        return v
+
+    @field_validator('valor')
+    @classmethod
+    def validar_valor(cls, v):
+        if v <= 0:
+            raise ValueError('valor deve ser maior que zero')
+        return v
+
+class LoteCobrancaResponse(BaseModel):
+    id: UUID
+    referencia_mes: str
+    valor: float
+    vencimento: date
+    status: str
+    total: int
+    cobrados: int
+    falhas: int
+    ignorados: int
+    iniciado_em: Optional[datetime]
+    concluido_em: Optional[datetime]
+    em_execucao: bool = False
+    execucao_iniciada: bool = False
+    model_config = {"from_attributes": True}
+
+
 class PresencaCreate(BaseModel):
     aluno_id: UUID
     data: datetime
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from app.config.database import get_db
-from app.models.models import Aluno, Usuario
-from app.models.schemas import AlunoCreate, AlunoUpdate, AlunoResponse
-from app.services.auth_service import get_current_user
+from app.config.database import get_db, get_read_db
+from app.models.models import Aluno, Graduacao
+from app.models.schemas import AlunoCreate, AlunoUpdate, AlunoResponse, Pagina, ProgressoAlunoResponse, RiscoAlunoResponse
+from app.services.auth_service import get_current_user, UsuarioAutenticado
 from app.services.asaas_service import AsaasService
-from app.services.graduacao_service import calcular_progresso_aluno
+from app.services.graduacao_service import calcular_progresso_aluno, registrar_graduacao, listar_progresso_dojo
+from app.services.risco_service import listar_riscos
+from app.services.paginacao import paginar, LIMITE_PADRAO, LIMITE_MAXIMO
 
 router = APIRouter(prefix="/alunos", tags=["Alunos"])
 
@@ -18,28 +20,35 @@ router = APIRouter(prefix="/alunos", tags=["Alunos"])
 async def graduar_aluno(
     aluno_id: str,
     nova_gradu_id: UUID,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     # 1. Buscar o aluno garantindo que pertence ao Dojo do professor
+    #    (FOR UPDATE: duas graduações simultâneas do mesmo aluno se serializam)
     result = await db.execute(
-        select(Aluno).where(Aluno.id == aluno_id, Aluno.dojo_id == usuario.dojo_id)
+        select(Aluno).where(Aluno.id == aluno_id, Aluno.dojo_id == usuario.dojo_id).with_for_update()
     )
     aluno = result.scalar_one_or_none()
 
     if not aluno:
         raise HTTPException(status_code=404, detail="Aluno nao encontrado.")
 
-    # 2. Atualizar a graduação
-    aluno.graduacao_id = nova_gradu_id
-    # Opcional: Aqui você pode inserir um registro em uma tabela 'HistoricoGraduacao'
+    result = await db.execute(
+        select(Graduacao).where(Graduacao.id == nova_gradu_id, Graduacao.dojo_id == usuario.dojo_id)
+    )
+    graduacao = result.scalar_one_or_none()
+    if not graduacao:
+        raise HTTPException(status_code=404, detail="Graduacao nao encontrada.")
+
+    # 2. Histórico + graduação atual + contador de aulas, num único commit
+    await registrar_graduacao(db, aluno, graduacao, registrado_por=usuario.id)
 
     await db.commit()
     return {"message": f"Aluno {aluno.nome} graduado com sucesso!"}
 
 @router.get("/meu-progresso")
 async def obter_meu_progresso(
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     # Segurança: Apenas usuários com role 'aluno' e aluno_id vinculado podem acessar
@@ -48,13 +57,73 @@ async def obter_meu_progresso(
 
     # Chama o serviço de gamificação que criamos anteriormente
     progresso = await calcular_progresso_aluno(str(usuario.aluno_id), db)
+    if progresso is None:
+        raise HTTPException(status_code=404, detail="Aluno nao encontrado.")
 
     return progresso
 
+@router.get("/progresso", response_model=List[ProgressoAlunoResponse])
+async def progresso_dojo(
+    ordenar: Literal["progresso", "aulas", "nome"] = "progresso",
+    crescente: bool = False,
+    pronto_para_exame: bool = False,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Progresso de todos os alunos ativos do dojo (ex: ?pronto_para_exame=true para a banca)."""
+    if usuario.role == "aluno":
+        raise HTTPException(status_code=403, detail="Acesso restrito ao professor.")
+
+    linhas = await listar_progresso_dojo(
+        db, usuario.dojo_id, ordenar=ordenar, crescente=crescente, somente_prontos=pronto_para_exame
+    )
+    return [
+        ProgressoAlunoResponse(
+            id=linha.aluno_id,
+            nome=linha.nome,
+            faixa_nome=linha.faixa_nome,
+            total_aulas=linha.total_aulas,
+            meta_aulas=linha.meta_aulas,
+            progresso_percentual=linha.progresso_percentual,
+            pronto_para_exame=linha.pronto_para_exame,
+            ultima_graduacao=linha.ultima_graduacao,
+            proxima_faixa_id=linha.proxima_graduacao_id,
+            proxima_faixa_nome=linha.proxima_graduacao,
+        )
+        for linha in linhas
+    ]
+
+@router.get("/risco", response_model=List[RiscoAlunoResponse])
+async def risco_dojo(
+    nivel: Optional[Literal["alto", "medio", "baixo"]] = None,
+    limit: int = Query(50, ge=1, le=LIMITE_MAXIMO),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Alunos com maior risco de evasão (calculado pelo job scripts.calcular_risco)."""
+    if usuario.role == "aluno":
+        raise HTTPException(status_code=403, detail="Acesso restrito ao professor.")
+
+    linhas = await listar_riscos(db, usuario.dojo_id, nivel=nivel, limit=limit)
+    return [
+        RiscoAlunoResponse(
+            id=risco.aluno_id,
+            nome=nome,
+            score=risco.score,
+            nivel=risco.nivel,
+            queda_frequencia=risco.queda_frequencia,
+            semanas_sem_treinar=risco.semanas_sem_treinar,
+            sequencia_semanas=risco.sequencia_semanas,
+            pagamentos_atrasados=risco.pagamentos_atrasados,
+            calculado_em=risco.calculado_em,
+        )
+        for risco, nome in linhas
+    ]
+
 @router.post("/", response_model=AlunoResponse, status_code=status.HTTP_201_CREATED)
 async def criar_aluno(
     dados: AlunoCreate,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     if dados.cpf:
@@ -71,30 +140,33 @@ async def criar_aluno(
         telefone=dados.telefone,
         email=dados.email,
         data_nascimento=dados.data_nascimento,
-        asaas_id=asaas_id
+        # asaas_id fica vazio: o cliente no Asaas é resolvido (e gravado) na primeira cobrança
     )
     db.add(aluno)
     await db.commit()
     return aluno
 
 
-@router.get("/", response_model=List[AlunoResponse])
+@router.get("/", response_model=Pagina[AlunoResponse])
 async def listar_alunos(
-    usuario: Usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    result = await db.execute(
-        select(Aluno)
-        .where(Aluno.dojo_id == usuario.dojo_id)
-        .order_by(Aluno.nome)
+    return await paginar(
+        db,
+        select(Aluno).where(Aluno.dojo_id == usuario.dojo_id),
+        [(Aluno.nome, False), (Aluno.id, False)],
+        limit,
+        cursor,
     )
-    return result.scalars().all()
 
 
 @router.get("/{aluno_id}", response_model=AlunoResponse)
 async def buscar_aluno(
     aluno_id: UUID,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
@@ -110,7 +182,7 @@ async def buscar_aluno(
 async def atualizar_aluno(
     aluno_id: UUID,
     dados: AlunoUpdate,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
@@ -130,7 +202,7 @@ async def atualizar_aluno(
 @router.delete("/{aluno_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def desativar_aluno(
     aluno_id: UUID,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
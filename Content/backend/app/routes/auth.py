@@ -7,7 +7,7 @@ from app.config.database import get_db
 from app.models.models import Usuario, Dojo, Graduacao, Aluno
 from app.models.schemas import UsuarioCreate, LoginRequest, AtivacaoConta
 from app.models.schemas import TokenResponse, UsuarioResponse, OnboardingCreate
-from app.services.auth_service import get_password_hash, verify_password, create_access_token
+from app.services.auth_service import get_password_hash_async, verify_password_async, create_access_token
 
 
 
@@ -42,6 +42,9 @@ async def ativar_conta_aluno(dados: AtivacaoConta, db: AsyncSession = Depends(ge
     if result_user.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Esta conta já foi ativada.")
 
+    # Hash fora do try: um 503 do pool de bcrypt não deve virar erro 500
+    senha_hash = await get_password_hash_async(dados.senha)
+
     try:
         # 3. Criar o Usuário com role 'aluno'
         novo_usuario = Usuario(
@@ -49,7 +52,7 @@ async def ativar_conta_aluno(dados: AtivacaoConta, db: AsyncSession = Depends(ge
             aluno_id=aluno.id,
             email=aluno.email,
             nome=aluno.nome,
-            senha_hash=get_password_hash(dados.senha),
+            senha_hash=senha_hash,
             role="aluno"
         )
         db.add(novo_usuario)
@@ -68,6 +71,8 @@ async def onboard_professor(dados: OnboardingCreate, db: AsyncSession = Depends(
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="E-mail já cadastrado.")
 
+    senha_hash = await get_password_hash_async(dados.admin_senha)
+
     try:
         # 2. Cria o Dojo
         novo_dojo = Dojo(
@@ -82,7 +87,7 @@ async def onboard_professor(dados: OnboardingCreate, db: AsyncSession = Depends(
         novo_usuario = Usuario(
             dojo_id=novo_dojo.id,
             email=dados.admin_email,
-            senha_hash=get_password_hash(dados.admin_senha),
+            senha_hash=senha_hash,
             nome=dados.admin_nome,
             role="professor"
         )
@@ -127,7 +132,7 @@ async def register(dados: UsuarioCreate, db: AsyncSession = Depends(get_db)):
     usuario = Usuario(
         dojo_id=dados.dojo_id,
         email=dados.email,
-        senha_hash=get_password_hash(dados.senha),
+        senha_hash=await get_password_hash_async(dados.senha),
         nome=dados.nome,
         role=dados.role,
     )
@@ -141,7 +146,7 @@ async def login(dados: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Usuario).where(Usuario.email == dados.email))
     usuario = result.scalar_one_or_none()
 
-    if not usuario or not verify_password(dados.senha, usuario.senha_hash):
+    if not usuario or not await verify_password_async(dados.senha, usuario.senha_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos.",
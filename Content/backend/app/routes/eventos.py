@@ -1,27 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-import random
-import json
+from sqlalchemy import select, update, func, case, or_
+from datetime import datetime
 
-from typing import List
+from typing import List, Optional
 
 from uuid import UUID
 
-from app.config.database import get_db
-from app.models.models import Evento, InscricaoEvento, Usuario, Aluno, CategoriaEvento
-from app.models.schemas import EventoCreate, EventoResponse, GerarChaveRequest, InscricaoRequest, InscricaoExternaRequest
-from app.services.auth_service import get_current_user
+from app.config.database import get_db, get_read_db
+from app.models.models import Evento, InscricaoEvento, Aluno, CategoriaEvento, LutaChave
+from app.models.schemas import EventoCreate, EventoResponse, GerarChaveRequest, ResultadoLutaRequest, InscricaoRequest, InscricaoExternaRequest, Pagina
+from app.services.auth_service import get_current_user, UsuarioAutenticado
 from app.services.asaas_service import asaas_service
-from app.services.evolution_service import evolution_service
+from app.services.cliente_asaas_service import clientes_asaas
+from app.services.chaveamento_service import cache_chaves, consulta_inscritos, gerar_chave, gravar_chave
+from app.services.notificacao_service import enfileirar_whatsapp
+from app.services.paginacao import paginar, LIMITE_PADRAO, LIMITE_MAXIMO
+from app.services.resiliencia import IntegracaoIndisponivel
 
 router = APIRouter(prefix="/eventos", tags=["Eventos"])
 
+
+def _pagamentos_indisponiveis(e: IntegracaoIndisponivel) -> HTTPException:
+    # Nada foi gravado (sem commit): a inscrição pode ser refeita do zero
+    return HTTPException(
+        status_code=503,
+        detail="Pagamentos temporariamente indisponíveis. Tente a inscrição novamente em instantes.",
+        headers={"Retry-After": e.retry_after()},
+    )
+
 @router.post("/{evento_id}/inscrever")
 async def inscrever_aluno_evento(
     evento_id: UUID,
     dados: InscricaoRequest,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     # 1. Verificar se é aluno e tem vínculo
@@ -68,15 +80,18 @@ async def inscrever_aluno_evento(
         aluno = result_al.scalar_one()
 
         if aluno.asaas_id:
-            cobranca = await asaas_service.criar_pagamento(
-                customer_id=aluno.asaas_id,
-                valor=evento.valor_inscricao,
-                vencimento=evento.data_evento.strftime("%Y-%m-%d")
-            )
+            try:
+                cobranca = await asaas_service.criar_pagamento(
+                    customer_id=aluno.asaas_id,
+                    valor=evento.valor_inscricao,
+                    vencimento=evento.data_evento.strftime("%Y-%m-%d")
+                )
+            except IntegracaoIndisponivel as e:
+                raise _pagamentos_indisponiveis(e)
             nova_inscricao.asaas_payment_id = cobranca.get("id")
 
             msg = f"Olá {aluno.nome}! Sua inscrição no evento {evento.titulo} foi recebida. Link para pagamento: {cobranca.get('invoiceUrl')}"
-            await evolution_service.enviar_mensagem(aluno.telefone, msg)
+            enfileirar_whatsapp(db, aluno.telefone, msg, dojo_id=evento.dojo_id)
 
     db.add(nova_inscricao)
     await db.commit()
@@ -107,26 +122,37 @@ async def inscrever_externo_evento(
     if not result_cat.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Categoria inválida.")
 
-    # 3. Criar ou Localizar Aluno (pelo e-mail/telefone)
+    if evento.valor_inscricao > 0 and not dados.cpf:
+        raise HTTPException(status_code=400, detail="CPF é obrigatório para inscrição em evento pago.")
+
+    # 3. Criar ou Localizar Aluno (pelo CPF, que é único, ou pelo e-mail/telefone)
     # Atletas externos são vinculados ao dojo do evento
-    result_al = await db.execute(
-        select(Aluno).where(
-            (Aluno.email == dados.email) | (Aluno.telefone == dados.telefone),
-            (Aluno.dojo_id == evento.dojo_id)
+    aluno = None
+    if dados.cpf:
+        result_al = await db.execute(select(Aluno).where(Aluno.cpf == dados.cpf))
+        aluno = result_al.scalar_one_or_none()
+    if not aluno:
+        result_al = await db.execute(
+            select(Aluno).where(
+                (Aluno.email == dados.email) | (Aluno.telefone == dados.telefone),
+                (Aluno.dojo_id == evento.dojo_id)
+            )
         )
-    )
-    aluno = result_al.scalar_one_or_none()
+        aluno = result_al.scalars().first()
 
     if not aluno:
         aluno = Aluno(
             nome=dados.nome,
             email=dados.email,
             telefone=dados.telefone,
+            cpf=dados.cpf,
             dojo_id=evento.dojo_id,
             ativo=False # Marcado como inativo pois é apenas um inscrito externo por enquanto
         )
         db.add(aluno)
         await db.flush()
+    elif not aluno.cpf and dados.cpf:
+        aluno.cpf = dados.cpf
 
     # 4. Verificar se já está inscrito
     result_ins = await db.execute(
@@ -148,20 +174,24 @@ async def inscrever_externo_evento(
 
     # 6. Cobrança e Notificação
     if evento.valor_inscricao > 0:
-        # Garantir cadastro no Asaas para o externo
-        if not aluno.asaas_id:
-            customer = await asaas_service.criar_cliente(aluno.nome, aluno.email, aluno.telefone)
-            aluno.asaas_id = customer.get("id")
-
-        cobranca = await asaas_service.criar_pagamento(
-            customer_id=aluno.asaas_id,
-            valor=evento.valor_inscricao,
-            vencimento=evento.data_evento.strftime("%Y-%m-%d")
-        )
+        try:
+            # Garantir cadastro no Asaas para o externo (coluna, cache ou busca/criação pelo CPF)
+            customer_id = await clientes_asaas.resolver(db, aluno)
+            if not customer_id:
+                # CPF recusado pelo Asaas (4xx) ou cadastro sem id: repetir não resolve
+                raise HTTPException(status_code=400, detail="O Asaas recusou o cadastro deste CPF.")
+
+            cobranca = await asaas_service.criar_pagamento(
+                customer_id=customer_id,
+                valor=evento.valor_inscricao,
+                vencimento=evento.data_evento.strftime("%Y-%m-%d")
+            )
+        except IntegracaoIndisponivel as e:
+            raise _pagamentos_indisponiveis(e)
         nova_inscricao.asaas_payment_id = cobranca.get("id")
 
         msg = f"Olá {aluno.nome}! Recebemos sua inscrição externa para o evento {evento.titulo}. Pague aqui: {cobranca.get('invoiceUrl')}"
-        await evolution_service.enviar_mensagem(aluno.telefone, msg)
+        enfileirar_whatsapp(db, aluno.telefone, msg, dojo_id=evento.dojo_id)
 
     db.add(nova_inscricao)
     await db.commit()
@@ -174,7 +204,7 @@ async def inscrever_externo_evento(
 @router.post("/", response_model=EventoResponse)
 async def criar_evento(
     dados: EventoCreate,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     dados_dict = dados.model_dump()
@@ -192,88 +222,174 @@ async def criar_evento(
     await db.refresh(novo_evento)
     return novo_evento
 
-@router.get("/meus", response_model=List[EventoResponse])
+@router.get("/meus", response_model=Pagina[EventoResponse])
 async def listar_meus_eventos(
-    usuario: Usuario = Depends(get_current_user),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     from sqlalchemy.orm import selectinload
-    result = await db.execute(
+    return await paginar(
+        db,
         select(Evento)
         .options(selectinload(Evento.categorias))
-        .where(Evento.dojo_id == usuario.dojo_id)
-        .order_by(Evento.data_evento.desc())
+        .where(Evento.dojo_id == usuario.dojo_id),
+        [(Evento.data_evento, True), (Evento.id, True)],
+        limit,
+        cursor,
     )
-    return result.scalars().all()
 
-@router.get("/feed")
-async def feed_eventos_publicos(db: AsyncSession = Depends(get_db)):
+@router.get("/feed", response_model=Pagina[EventoResponse])
+async def feed_eventos_publicos(
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
     from sqlalchemy.orm import selectinload
-    result = await db.execute(
+    return await paginar(
+        db,
         select(Evento)
         .options(selectinload(Evento.categorias))
-        .where(Evento.visivel_rede == True)
-        .order_by(Evento.promovido.desc(), Evento.data_evento.asc())
+        .where(Evento.visivel_rede == True),
+        [(Evento.promovido, True), (Evento.data_evento, False), (Evento.id, False)],
+        limit,
+        cursor,
     )
-    return result.scalars().all()
 
 @router.post("/{evento_id}/gerar-chaves")
 async def gerar_chaves_competicao(
     evento_id: UUID,
     config: GerarChaveRequest,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    # 1. Busca inscritos confirmados na categoria específica
-    result = await db.execute(
-        select(InscricaoEvento)
-        .where(
-            InscricaoEvento.evento_id == evento_id,
-            InscricaoEvento.categoria_id == config.categoria_id,
-            InscricaoEvento.pago == True
-        )
+    if usuario.role != "professor":
+        raise HTTPException(status_code=403, detail="Acesso restrito ao professor.")
+
+    # 1. Evento do dojo, travado: duas gerações da mesma categoria não se misturam
+    result_evento = await db.execute(
+        select(Evento)
+        .where(Evento.id == evento_id, Evento.dojo_id == usuario.dojo_id)
+        .with_for_update()
     )
-    inscritos = result.scalars().all()
-
-    if len(inscritos) < 2:
-        raise HTTPException(status_code=400, detail="Mínimo de 2 inscritos pagos nesta categoria para gerar chaves.")
-
-    # 2. Algoritmo de Chaveamento (Mata-mata)
-    # Busca nomes para facilitar a visualização no JSON
-    participantes = []
-    for i in inscritos:
-        res_al = await db.execute(select(Aluno.nome).where(Aluno.id == i.aluno_id))
-        nome = res_al.scalar()
-        participantes.append({"id": str(i.aluno_id), "nome": nome})
-    
-    random.shuffle(participantes)
-
-    lutas = []
-    for i in range(0, len(participantes), 2):
-        if i + 1 < len(participantes):
-            lutas.append({
-                "atleta_a": participantes[i], 
-                "atleta_b": participantes[i+1], 
-                "vencedor": None,
-                "status": "pendente"
-            })
-        else:
-            # Bye (passa direto)
-            lutas.append({
-                "atleta_a": participantes[i], 
-                "atleta_b": {"id": "BYE", "nome": "---"}, 
-                "vencedor": participantes[i],
-                "status": "finalizado"
-            })
-
-    # 3. Atualiza o JSON das chaves no evento
-    result_evento = await db.execute(select(Evento).where(Evento.id == evento_id))
-    evento = result_evento.scalar_one()
-    
-    chaves_atuais = json.loads(evento.chaves_json) if evento.chaves_json else {}
-    chaves_atuais[str(config.categoria_id)] = {"rodada_1": lutas}
-    
-    evento.chaves_json = json.dumps(chaves_atuais)
+    evento = result_evento.scalar_one_or_none()
+    if not evento:
+        raise HTTPException(status_code=404, detail="Evento não encontrado.")
+
+    # 2. Inscritos pagos da categoria com nome e dojo (uma consulta) e chave completa
+    inscritos = (await db.execute(consulta_inscritos(evento_id, config.categoria_id))).all()
+    try:
+        chave = gerar_chave(inscritos, config.cabecas_de_chave, config.semente)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 3. Uma linha por luta em lutas_chave (substitui a chave anterior da categoria)
+    await gravar_chave(db, evento_id, config.categoria_id, chave)
 
     await db.commit()
-    return {"message": "Chaves geradas para a categoria!", "estrutura": lutas}
\ No newline at end of file
+    await cache_chaves.invalidar(evento_id)
+    chaves = await cache_chaves.obter(evento_id)
+    return {"message": "Chaves geradas para a categoria!", "estrutura": chaves.get(str(config.categoria_id))}
+
+@router.get("/{evento_id}/chaves")
+async def ver_chaves(
+    evento_id: UUID,
+    categoria_id: Optional[UUID] = None,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Chaves de evento do próprio dojo ou publicado na rede
+    visivel = (await db.execute(
+        select(Evento.id).where(
+            Evento.id == evento_id,
+            or_(Evento.dojo_id == usuario.dojo_id, Evento.visivel_rede == True),
+        )
+    )).scalar_one_or_none()
+    if not visivel:
+        raise HTTPException(status_code=404, detail="Evento não encontrado.")
+
+    # Montadas a partir de lutas_chave e guardadas em cache até o próximo resultado
+    chaves = await cache_chaves.obter(evento_id)
+    if categoria_id:
+        return chaves.get(str(categoria_id))
+    return chaves
+
+@router.post("/{evento_id}/lutas/{luta_id}/resultado")
+async def registrar_resultado_luta(
+    evento_id: UUID,
+    luta_id: UUID,
+    dados: ResultadoLutaRequest,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if usuario.role != "professor":
+        raise HTTPException(status_code=403, detail="Acesso restrito ao professor.")
+
+    evento = (await db.execute(
+        select(Evento.id).where(Evento.id == evento_id, Evento.dojo_id == usuario.dojo_id)
+    )).scalar_one_or_none()
+    if not evento:
+        raise HTTPException(status_code=404, detail="Evento não encontrado.")
+
+    # 1. Trava só esta luta: as outras áreas de luta seguem gravando em paralelo
+    luta = (await db.execute(
+        select(LutaChave)
+        .where(LutaChave.id == luta_id, LutaChave.evento_id == evento_id)
+        .with_for_update()
+    )).scalar_one_or_none()
+    if not luta:
+        raise HTTPException(status_code=404, detail="Luta não encontrada.")
+    if luta.bye or not luta.atleta_a_id or not luta.atleta_b_id:
+        raise HTTPException(status_code=409, detail="A luta ainda não tem os dois atletas.")
+    if dados.vencedor_id not in (luta.atleta_a_id, luta.atleta_b_id):
+        raise HTTPException(status_code=400, detail="O vencedor precisa ser um dos atletas da luta.")
+
+    # 2. Vencedor na vaga da próxima luta (rodada + 1, posicao // 2), enquanto ela não foi disputada.
+    #    O UPDATE trava a linha da próxima; o resultado da luta irmã espera e vê esta vaga preenchida.
+    proxima_id = None
+    if dados.vencedor_id != luta.vencedor_id:
+        total_rodadas = (await db.execute(
+            select(func.max(LutaChave.rodada))
+            .where(LutaChave.evento_id == evento_id, LutaChave.categoria_id == luta.categoria_id)
+        )).scalar()
+        if luta.rodada < total_rodadas:
+            vaga, outra = (
+                (LutaChave.atleta_a_id, LutaChave.atleta_b_id) if luta.posicao % 2 == 0
+                else (LutaChave.atleta_b_id, LutaChave.atleta_a_id)
+            )
+            proxima_id = (await db.execute(
+                update(LutaChave)
+                .where(
+                    LutaChave.evento_id == evento_id,
+                    LutaChave.categoria_id == luta.categoria_id,
+                    LutaChave.rodada == luta.rodada + 1,
+                    LutaChave.posicao == luta.posicao // 2,
+                    LutaChave.status != "finalizado",
+                )
+                .values({
+                    vaga: dados.vencedor_id,
+                    LutaChave.status: case((outra.is_not(None), "pendente"), else_="aguardando"),
+                    LutaChave.atualizado_em: datetime.utcnow(),
+                })
+                .returning(LutaChave.id),
+                execution_options={"synchronize_session": False},
+            )).scalar()
+            if proxima_id is None:
+                await db.rollback()
+                raise HTTPException(
+                    status_code=409,
+                    detail="A próxima luta já foi disputada. Corrija o resultado dela antes.",
+                )
+
+        luta.vencedor_id = dados.vencedor_id
+        luta.status = "finalizado"
+        await db.commit()
+        await cache_chaves.invalidar(evento_id)
+
+    return {
+        "message": "Resultado registrado!",
+        "luta_id": str(luta_id),
+        "vencedor_id": str(dados.vencedor_id),
+        "proxima_luta_id": str(proxima_id) if proxima_id else None,
+    }
@@ -1,24 +1,36 @@
-﻿from fastapi import APIRouter, HTTPException, status, Depends
+﻿import logging
+import uuid
+
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 
-from app.config.database import get_db
-from app.models.models import Pagamento, Aluno, Usuario
-from app.models.schemas import PagamentoCreate, PagamentoResponse
-from app.services.auth_service import get_current_user
+from app.config.database import get_db, get_read_db
+from app.models.models import Pagamento, Aluno, LoteCobranca
+from app.models.schemas import PagamentoCreate, PagamentoResponse, Pagina, LoteCobrancaCreate, LoteCobrancaResponse
+from app.services.auth_service import get_current_user, UsuarioAutenticado
 from app.services.asaas_service import asaas_service
+from app.services.cliente_asaas_service import clientes_asaas
+from app.services.pix_service import cache_pix
+from app.services.resumo_financeiro_service import cache_resumo_financeiro, resumo_financeiro
 from app.services.evolution_service import evolution_service
-from app.services.asaas_service import AsaasService
+from app.services.notificacao_service import enfileirar_whatsapp
+from app.services.webhook_service import registrar_evento, consumidor_webhooks
+from app.services.cobranca_service import abrir_lote, iniciar_execucao, em_execucao
+from app.services.resiliencia import IntegracaoIndisponivel
+from app.services.paginacao import paginar, LIMITE_PADRAO, LIMITE_MAXIMO
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/pagamentos", tags=["Pagamentos"])
 
-asaas = AsaasService()
 
 @router.get("/{pagamento_id}/pix")
 async def obter_pix_pagamento(
     pagamento_id: str,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     # 1. Busca o pagamento e valida se pertence ao aluno logado
@@ -27,28 +39,65 @@ async def obter_pix_pagamento(
     )
     pagamento = result.scalar_one_or_none()
 
-    if not pagamento:
+    if not pagamento or not pagamento.asaas_id:
         raise HTTPException(status_code=404, detail="Pagamento não encontrado.")
+    if pagamento.status in ("pago", "cancelado"):
+        # Vale mesmo se a invalidação do webhook não chegou a este processo
+        await cache_pix.invalidar([pagamento.asaas_id])
+        raise HTTPException(status_code=409, detail="Este pagamento não está mais em aberto.")
 
-    # 2. Busca o QR Code no Asaas Service
+    # 2. QR Code do cache (ou do Asaas, uma chamada por cobrança por vez)
     try:
-        pix_info = await asaas.obter_qrcode_pix(pagamento.asaas_id)
+        pix_info = await cache_pix.obter(pagamento.asaas_id)
         return pix_info
+    except IntegracaoIndisponivel as e:
+        # Responde na hora em vez de segurar o worker esperando o Asaas
+        raise HTTPException(
+            status_code=503,
+            detail="PIX temporariamente indisponível. Tente novamente em instantes.",
+            headers={"Retry-After": e.retry_after()},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail="Erro ao buscar dados do PIX.")
 
-@router.get("/meus")
+# ─────────────────────────────────────────────
+# GET /pagamentos/resumo — Totais do dojo por mês e status
+#   Agregado no banco e guardado em cache por dojo; pagamentos novos,
+#   lotes, webhooks e conciliação invalidam. Uma chamada barata para
+#   o dashboard, qualquer que seja o tamanho do histórico.
+# ─────────────────────────────────────────────
+@router.get("/resumo")
+async def obter_resumo_financeiro(
+    desde: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Mês de referência inicial (YYYY-MM)"),
+    ate: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Mês de referência final (YYYY-MM)"),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+):
+    """
+    Recebido, em aberto (pendente + atraso), em atraso e cancelado por
+    referencia_mes, com quantidade e valor de cada status.
+    """
+    if usuario.role == "aluno":
+        raise HTTPException(status_code=403, detail="Acesso restrito ao professor.")
+    return await resumo_financeiro(usuario.dojo_id, desde, ate)
+
+
+@router.get("/meus", response_model=Pagina[PagamentoResponse])
 async def listar_meus_pagamentos(
-    usuario: Usuario = Depends(get_current_user),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     if usuario.role != "aluno" or not usuario.aluno_id:
         raise HTTPException(status_code=403, detail="Apenas alunos podem acessar esta rota.")
 
-    result = await db.execute(
-        select(Pagamento).where(Pagamento.aluno_id == usuario.aluno_id).order_by(Pagamento.vencimento.desc())
+    return await paginar(
+        db,
+        select(Pagamento).where(Pagamento.aluno_id == usuario.aluno_id),
+        [(Pagamento.criado_em, True), (Pagamento.id, True)],
+        limit,
+        cursor,
     )
-    return result.scalars().all()
 
 # ─────────────────────────────────────────────
 # POST /pagamentos — Cria cobrança (Asaas + BD)
@@ -56,7 +105,7 @@ async def listar_meus_pagamentos(
 @router.post("/", response_model=PagamentoResponse, status_code=status.HTTP_201_CREATED)
 async def criar_pagamento(
     dados: PagamentoCreate,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     # Busca o aluno
@@ -67,129 +116,138 @@ async def criar_pagamento(
     if not aluno:
         raise HTTPException(status_code=404, detail="Aluno não encontrado.")
 
-    # Cria cliente no Asaas (se tiver CPF)
-    asaas_customer_id = None
-    if aluno.cpf:
-        cliente_existente = await asaas_service.buscar_cliente_por_cpf(aluno.cpf)
-        if cliente_existente:
-            asaas_customer_id = cliente_existente["id"]
-        else:
-            novo_cliente = await asaas_service.criar_cliente(aluno.nome, aluno.cpf)
-            asaas_customer_id = novo_cliente.get("id")
-
-    # Cria cobrança no Asaas
+    # Cliente e cobrança no Asaas. Se o Asaas não atender (lento, fora do ar,
+    # circuito aberto), o pagamento é gravado do mesmo jeito e a cobrança sai
+    # depois pelo WorkerCobrancasAdiadas, achada pela externalReference.
+    pagamento_id = uuid.uuid4()
     asaas_payment_id = None
-    if asaas_customer_id and dados.referencia_mes:
-        # Usa último dia do mês como vencimento
-        vencimento = f"{dados.referencia_mes}-28"
-        pagamento_asaas = await asaas_service.criar_pagamento(
-            customer_id=asaas_customer_id,
-            valor=dados.valor,
-            vencimento=vencimento,
-        )
-        asaas_payment_id = pagamento_asaas.get("id")
+    cobranca_adiada = False
+    try:
+        # Coluna do aluno, cache ou busca/criação (se tiver CPF)
+        asaas_customer_id = await clientes_asaas.resolver(db, aluno)
+        if asaas_customer_id and dados.referencia_mes:
+            # Usa último dia do mês como vencimento
+            vencimento = f"{dados.referencia_mes}-28"
+            pagamento_asaas = await asaas_service.criar_pagamento(
+                customer_id=asaas_customer_id,
+                valor=dados.valor,
+                vencimento=vencimento,
+                referencia_externa=str(pagamento_id),
+            )
+            asaas_payment_id = pagamento_asaas.get("id")
+    except IntegracaoIndisponivel as e:
+        cobranca_adiada = bool(dados.referencia_mes and (aluno.asaas_id or aluno.cpf))
+        logger.warning("Cobrança do pagamento %s adiada: %s", pagamento_id, e)
 
     # Salva no banco local
     pagamento = Pagamento(
+        id=pagamento_id,
+        dojo_id=aluno.dojo_id,
         aluno_id=dados.aluno_id,
         valor=dados.valor,
         metodo=dados.metodo,
         referencia_mes=dados.referencia_mes,
         asaas_id=asaas_payment_id,
+        cobranca_adiada=cobranca_adiada,
         status="pendente",
     )
     db.add(pagamento)
-    await db.commit()
 
-    # Envia notificação WhatsApp de cobrança pendente
+    # Notificação WhatsApp de cobrança pendente: vai para a outbox na mesma
+    # transação; o worker envia depois (com retry), sem segurar a resposta
     if aluno.telefone:
         mensagem = evolution_service.template_cobranca_pendente(
             nome_aluno=aluno.nome,
             valor=dados.valor,
             vencimento=dados.referencia_mes or "em breve",
         )
-        try:
-            await evolution_service.enviar_mensagem(aluno.telefone, mensagem)
-        except Exception:
-            pass  # Não bloqueia a criação se o WhatsApp falhar
+        enfileirar_whatsapp(db, aluno.telefone, mensagem, dojo_id=usuario.dojo_id)
 
+    await db.commit()
+    await cache_resumo_financeiro.invalidar([aluno.dojo_id])
     return pagamento
 
 
 # ─────────────────────────────────────────────
-# GET /pagamentos — Lista pagamentos do dojo
+# POST /pagamentos/lotes — Cobrança mensal do dojo inteiro
+#   Cria os pagamentos que faltam e as cobranças no Asaas
+#   em segundo plano. Chamar de novo para o mesmo mês
+#   retoma o lote sem cobrar ninguém duas vezes.
 # ─────────────────────────────────────────────
-@router.get("/", response_model=List[PagamentoResponse])
-async def listar_pagamentos(
-    usuario: Usuario = Depends(get_current_user),
+@router.post("/lotes", response_model=LoteCobrancaResponse, status_code=status.HTTP_202_ACCEPTED)
+async def criar_lote_cobranca(
+    dados: LoteCobrancaCreate,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if usuario.role == "aluno":
+        raise HTTPException(status_code=403, detail="Acesso restrito ao professor.")
+
+    lote = await abrir_lote(
+        db, usuario.dojo_id, dados.referencia_mes, dados.valor, dados.dia_vencimento, criado_por=usuario.id
+    )
+    # False: o lote já estava rodando neste processo (a chamada não iniciou outra execução)
+    iniciada = iniciar_execucao(lote.id)
+    return LoteCobrancaResponse.model_validate(lote).model_copy(
+        update={"em_execucao": em_execucao(lote.id), "execucao_iniciada": iniciada}
+    )
+
+
+@router.get("/lotes/{lote_id}", response_model=LoteCobrancaResponse)
+async def obter_lote_cobranca(
+    lote_id: UUID,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    if usuario.role == "aluno":
+        raise HTTPException(status_code=403, detail="Acesso restrito ao professor.")
+
     result = await db.execute(
-        select(Pagamento)
-        .join(Aluno, Pagamento.aluno_id == Aluno.id)
-        .where(Aluno.dojo_id == usuario.dojo_id)
-        .order_by(Pagamento.criado_em.desc())
+        select(LoteCobranca).where(LoteCobranca.id == lote_id, LoteCobranca.dojo_id == usuario.dojo_id)
+    )
+    lote = result.scalar_one_or_none()
+    if not lote:
+        raise HTTPException(status_code=404, detail="Lote não encontrado.")
+    return LoteCobrancaResponse.model_validate(lote).model_copy(update={"em_execucao": em_execucao(lote.id)})
+
+
+# ─────────────────────────────────────────────
+# GET /pagamentos — Lista pagamentos do dojo
+# ─────────────────────────────────────────────
+@router.get("/", response_model=Pagina[PagamentoResponse])
+async def listar_pagamentos(
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # Mais recentes primeiro; índice (dojo_id, criado_em, id)
+    return await paginar(
+        db,
+        select(Pagamento).where(Pagamento.dojo_id == usuario.dojo_id),
+        [(Pagamento.criado_em, True), (Pagamento.id, True)],
+        limit,
+        cursor,
     )
-    return result.scalars().all()
 
 
 # ─────────────────────────────────────────────
 # POST /pagamentos/webhook — Webhook do Asaas
 #   Chamado automaticamente pelo Asaas quando
-#   um pagamento muda de status.
+#   um pagamento muda de status. Só grava o evento
+#   e responde; o ConsumidorWebhooks aplica em lote.
 # ─────────────────────────────────────────────
 @router.post("/webhook", status_code=status.HTTP_200_OK)
 async def webhook_asaas(payload: dict, db: AsyncSession = Depends(get_db)):
     """
     Recebe notificações do Asaas sobre mudanças de pagamento.
-    Atualiza o status no banco e envia WhatsApp se necessário.
+    Idempotente pelo id do evento: retentativas do Asaas respondem 200 sem
+    reprocessar. Status e WhatsApp ficam com o consumidor (webhook_service).
     """
-    evento = payload.get("event")
-    pagamento_data = payload.get("payment", {})
-    asaas_id = pagamento_data.get("id")
-
-    if not asaas_id:
-        return {"status": "ignorado"}
-
-    # Busca o pagamento local pelo ID do Asaas
-    result = await db.execute(
-        select(Pagamento).where(Pagamento.asaas_id == asaas_id)
-    )
-    pagamento = result.scalar_one_or_none()
-
-    if not pagamento:
-        return {"status": "pagamento não encontrado"}
-
-    # Mapeia eventos do Asaas para nossos status
-    mapa_status = {
-        "PAYMENT_RECEIVED": "pago",
-        "PAYMENT_CONFIRMED": "pago",
-        "PAYMENT_OVERDUE":   "atraso",
-        "PAYMENT_DELETED":   "cancelado",
-    }
-
-    novo_status = mapa_status.get(evento)
-    if novo_status:
-        pagamento.status = novo_status
-
-        # Busca o aluno para enviar WhatsApp
-        result = await db.execute(select(Aluno).where(Aluno.id == pagamento.aluno_id))
-        aluno = result.scalar_one_or_none()
-
-        if aluno and aluno.telefone:
-            if novo_status == "pago":
-                mensagem = evolution_service.template_pagamento_confirmado(aluno.nome, pagamento.valor)
-            elif novo_status == "atraso":
-                mensagem = evolution_service.template_cobranca_atraso(aluno.nome, pagamento.valor, dias_atraso=1)
-            else:
-                mensagem = None
-
-            if mensagem:
-                try:
-                    await evolution_service.enviar_mensagem(aluno.telefone, mensagem)
-                except Exception:
-                    pass
-
-        await db.commit()
-
-    return {"status": "processado", "evento": evento}
\ No newline at end of file
+    novo = await registrar_evento(db, payload)
+    if novo:
+        consumidor_webhooks.recebidos += 1
+        consumidor_webhooks.acordar()
+    else:
+        consumidor_webhooks.duplicados += 1
+    return {"status": "recebido" if novo else "duplicado", "evento": payload.get("event")}
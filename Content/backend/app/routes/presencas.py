@@ -1,15 +1,20 @@
-﻿from fastapi import APIRouter, HTTPException, status, Depends
+﻿from fastapi import APIRouter, HTTPException, status, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 
-from app.config.database import get_db
-from app.models.models import Presenca, Aluno, Usuario
-from app.models.schemas import PresencaCreate, PresencaResponse
-from app.services.auth_service import get_current_user
+from app.config.database import get_db, get_read_db
 from app.models.models import Presenca, Aluno
-from app.models.schemas import PresencaBulk
+from app.models.schemas import PresencaCreate, PresencaResponse, Pagina
+from app.services.auth_service import get_current_user, UsuarioAutenticado
+from app.services.presenca_service import registrar_checkin, registrar_chamada
+from app.services.graduacao_service import contar_aulas_desde_graduacao
+from app.services.estatisticas_service import resumo_aluno, frequencia_alunos, tendencia_turma, dias_mais_cheios
+from app.services.paginacao import paginar, LIMITE_PADRAO, LIMITE_MAXIMO
+from app.models.models import Presenca, Aluno
+from app.models.schemas import PresencaBulk, PresencaBulkResponse
 
 router = APIRouter(prefix="/presencas", tags=["Presenças"])
 
@@ -18,62 +23,49 @@ router = APIRouter(prefix="/presencas", tags=["Presenças"])
 # POST /presencas — Registra presença
 # ─────────────────────────────────────────────
 
-@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+@router.post("/bulk", response_model=PresencaBulkResponse, status_code=status.HTTP_201_CREATED)
 async def registrar_presenca_em_massa(
     dados: PresencaBulk,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        for item in dados.lista_presenca:
-            # 1. Criar o registo de presença
-            nova_presenca = Presenca(
-                dojo_id=usuario.dojo_id,
-                aluno_id=item.aluno_id,
-                data=dados.data,
-                presente=item.presente
-            )
-            db.add(nova_presenca)
-
+        # Validação no dojo + upsert em lote (sem um objeto ORM por aluno)
+        itens = await registrar_chamada(db, usuario.dojo_id, dados.data, dados.lista_presenca)
         await db.commit()
-        return {"message": "Chamada realizada com sucesso!"}
     except Exception:
         await db.rollback()
         raise HTTPException(status_code=500, detail="Erro ao registar presenças.")
 
+    contagem = {"inserido": 0, "atualizado": 0, "inalterado": 0, "rejeitado": 0}
+    for item in itens:
+        contagem[item["status"]] += 1
+
+    return {
+        "message": "Chamada realizada com sucesso!",
+        "inseridos": contagem["inserido"],
+        "atualizados": contagem["atualizado"],
+        "inalterados": contagem["inalterado"],
+        "rejeitados": contagem["rejeitado"],
+        "itens": itens,
+    }
+
 @router.post("/", response_model=PresencaResponse, status_code=status.HTTP_201_CREATED)
 async def registrar_presenca(
     dados: PresencaCreate,
-    usuario: Usuario = Depends(get_current_user),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    # Verifica se o aluno existe e pertence ao dojo
-    result = await db.execute(
-        select(Aluno).where(Aluno.id == dados.aluno_id, Aluno.dojo_id == usuario.dojo_id)
+    # Valida o dojo, checa duplicata (aluno_id, dia) e insere numa única query
+    aluno_existe, presenca = await registrar_checkin(
+        db, usuario.dojo_id, dados.aluno_id, dados.data, dados.presente
     )
-    aluno = result.scalar_one_or_none()
-    if not aluno:
+    if not aluno_existe:
         raise HTTPException(status_code=404, detail="Aluno não encontrado.")
-
-    # Verifica duplicata na mesma data
-    data_dia = dados.data.date()
-    result = await db.execute(
-        select(Presenca).where(
-            Presenca.aluno_id == dados.aluno_id,
-            func.date(Presenca.data) == data_dia,
-        )
-    )
-    if result.scalar_one_or_none():
+    if presenca is None:
         raise HTTPException(status_code=400, detail="Presença já registrada para esta data.")
 
-    presenca = Presenca(
-        aluno_id=dados.aluno_id,
-        data=dados.data,
-        presente=dados.presente,
-    )
-    db.add(presenca)
     await db.commit()
-
     return presenca
 
 
@@ -84,46 +76,34 @@ async def registrar_presenca(
 # ─────────────────────────────────────────────
 @router.post("/qrcode/{aluno_id}", response_model=PresencaResponse, status_code=status.HTTP_201_CREATED)
 async def checkin_qrcode(
-    aluno_id: str,
-    usuario: Usuario = Depends(get_current_user),
+    aluno_id: UUID,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    # Verifica aluno
-    result = await db.execute(
-        select(Aluno).where(Aluno.id == aluno_id, Aluno.dojo_id == usuario.dojo_id)
+    # Check-in na porta do dojo: uma ida ao banco
+    aluno_existe, presenca = await registrar_checkin(
+        db, usuario.dojo_id, aluno_id, datetime.utcnow()
     )
-    aluno = result.scalar_one_or_none()
-    if not aluno:
+    if not aluno_existe:
         raise HTTPException(status_code=404, detail="Aluno não encontrado.")
-
-    agora = datetime.utcnow()
-
-    # Verifica duplicata hoje
-    result = await db.execute(
-        select(Presenca).where(
-            Presenca.aluno_id == aluno_id,
-            func.date(Presenca.data) == agora.date(),
-        )
-    )
-    if result.scalar_one_or_none():
+    if presenca is None:
         raise HTTPException(status_code=400, detail="Presença já registrada hoje.")
 
-    presenca = Presenca(aluno_id=aluno_id, data=agora, presente=True)
-    db.add(presenca)
     await db.commit()
-
     return presenca
 
 
 # ─────────────────────────────────────────────
 # GET /presencas/aluno/{aluno_id} — Histórico de presença
 # ─────────────────────────────────────────────
-@router.get("/aluno/{aluno_id}", response_model=List[PresencaResponse])
+@router.get("/aluno/{aluno_id}", response_model=Pagina[PresencaResponse])
 async def historico_presenca(
-    aluno_id: str,
+    aluno_id: UUID,
     dias: int = 30,  # Últimos 30 dias por padrão
-    usuario: Usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
     # Verifica aluno
     result = await db.execute(
@@ -134,12 +114,13 @@ async def historico_presenca(
 
     data_limite = datetime.utcnow() - timedelta(days=dias)
 
-    result = await db.execute(
-        select(Presenca)
-        .where(Presenca.aluno_id == aluno_id, Presenca.data >= data_limite)
-        .order_by(Presenca.data.desc())
+    return await paginar(
+        db,
+        select(Presenca).where(Presenca.aluno_id == aluno_id, Presenca.data >= data_limite),
+        [(Presenca.data, True), (Presenca.id, True)],
+        limit,
+        cursor,
     )
-    return result.scalars().all()
 
 
 # ─────────────────────────────────────────────
@@ -147,37 +128,66 @@ async def historico_presenca(
 # ─────────────────────────────────────────────
 @router.get("/resumo/{aluno_id}")
 async def resumo_presenca(
-    aluno_id: str,
-    usuario: Usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    aluno_id: UUID,
+    semanas: int = Query(4, ge=1, le=52),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Retorna total de presenças no último mês e % de frequência."""
+    """
+    Presenças nas últimas `semanas` (semana atual inclusa) e % de frequência
+    sobre as aulas que o dojo realmente deu no período. Lê só os rollups.
+    """
     result = await db.execute(
-        select(Aluno).where(Aluno.id == aluno_id, Aluno.dojo_id == usuario.dojo_id)
+        select(Aluno.id).where(Aluno.id == aluno_id, Aluno.dojo_id == usuario.dojo_id)
     )
     if not result.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Aluno não encontrado.")
 
-    data_limite = datetime.utcnow() - timedelta(days=30)
+    resumo = await resumo_aluno(db, usuario.dojo_id, aluno_id, semanas)
 
-    # Total de presenças registradas
-    result = await db.execute(
-        select(func.count(Presenca.id)).where(
-            Presenca.aluno_id == aluno_id,
-            Presenca.data >= data_limite,
-            Presenca.presente == True,
-        )
-    )
-    total_presencas = result.scalar()
+    # Aulas desde a última graduação (ancorado no histórico de graduações)
+    aulas_desde_graduacao = await contar_aulas_desde_graduacao(db, aluno_id)
 
-    # Aulas esperadas (aproximação: ~4 aulas por semana)
-    aulas_esperadas = 16
+    return {"aluno_id": aluno_id, **resumo, "aulas_desde_graduacao": aulas_desde_graduacao}
 
-    porcentagem = min((total_presencas / aulas_esperadas) * 100, 100) if aulas_esperadas > 0 else 0
 
-    return {
-        "aluno_id": aluno_id,
-        "total_presencas_30dias": total_presencas,
-        "aulas_esperadas": aulas_esperadas,
-        "porcentagem_frequencia": round(porcentagem, 1),
-    }
\ No newline at end of file
+# ─────────────────────────────────────────────
+# Dashboard do dojo — lê só os rollups (presencas_dia_dojo e
+# presencas_semana_aluno), custo independe do tamanho do histórico
+# ─────────────────────────────────────────────
+def _somente_professor(usuario: UsuarioAutenticado):
+    if usuario.role == "aluno":
+        raise HTTPException(status_code=403, detail="Acesso restrito ao professor.")
+
+
+@router.get("/dashboard/frequencia")
+async def dashboard_frequencia(
+    semanas: int = Query(8, ge=1, le=104),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Frequência de cada aluno ativo sobre as aulas dadas no período."""
+    _somente_professor(usuario)
+    return await frequencia_alunos(db, usuario.dojo_id, semanas)
+
+
+@router.get("/dashboard/tendencia")
+async def dashboard_tendencia(
+    dias: int = Query(90, ge=7, le=730),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Presentes por dia de aula (tendência da turma)."""
+    _somente_professor(usuario)
+    return await tendencia_turma(db, usuario.dojo_id, dias)
+
+
+@router.get("/dashboard/dias-semana")
+async def dashboard_dias_semana(
+    semanas: int = Query(12, ge=1, le=104),
+    usuario: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Dias da semana mais cheios (média de presentes por aula)."""
+    _somente_professor(usuario)
+    return await dias_mais_cheios(db, usuario.dojo_id, semanas)
@@ -1,5 +1,22 @@
 ﻿import httpx
+
 from app.config.settings import settings
+from app.config.http_clientes import ClienteHTTP
+from app.services.resiliencia import Integracao
+
+# Tempo máximo de cada chamada, por endpoint (RESILIENCE_TIMEOUTS sobrescreve).
+# O que segura requisição de usuário (PIX, criação de cobrança) desiste cedo;
+# a listagem paginada só roda em job e pode esperar mais.
+LIMITES_ASAAS = {
+    "clientes.criar": 8.0,
+    "clientes.buscar": 5.0,
+    "pagamentos.criar": 8.0,
+    "pagamentos.buscar": 5.0,
+    "pagamentos.pix": 4.0,
+    "pagamentos.listar": 20.0,
+    "pagamentos.por_referencia": 5.0,
+    "assinaturas.criar": 8.0,
+}
 
 
 class AsaasService:
@@ -15,6 +32,16 @@ class AsaasService:
             "app_token": settings.ASAAS_API_KEY,
             "Content-Type": "application/json",
         }
+        # Um cliente por instância, reaproveitado entre chamadas (ver app/config/http_clientes.py)
+        self.http = ClienteHTTP("asaas", self.base_url, self.headers)
+        # Disjuntor, limite de simultâneas e tempos (ver app/services/resiliencia.py)
+        self.integracao = Integracao("asaas", LIMITES_ASAAS, settings.ASAAS_MAX_CONCURRENCY)
+
+    async def _requisicao(self, endpoint: str, metodo: str, url: str, **kwargs) -> httpx.Response:
+        """Levanta IntegracaoIndisponivel se o Asaas não atender (timeout, 5xx, circuito aberto)."""
+        return await self.integracao.chamar(
+            endpoint, lambda: self.http.client.request(metodo, url, **kwargs)
+        )
 
     # ─────────────────────────────────────────
     # Cliente (Cliente no Asaas = Aluno no BudoManager)
@@ -22,22 +49,20 @@ class AsaasService:
     async def criar_cliente(self, nome: str, cpf: str) -> dict:
         """Cria um cliente no Asaas."""
         payload = {"name": nome, "cpfCnpj": cpf}
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/customers",
-                json=payload,
-                headers=self.headers,
-            )
+        response = await self._requisicao(
+            "clientes.criar", "POST", "/customers",
+            json=payload,
+        )
         return response.json()
 
     async def buscar_cliente_por_cpf(self, cpf: str) -> dict | None:
         """Busca cliente pelo CPF no Asaas."""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/customers",
-                params={"cpfCnpj": cpf},
-                headers=self.headers,
-            )
+        response = await self._requisicao(
+            "clientes.buscar", "GET", "/customers",
+            params={"cpfCnpj": cpf},
+        )
+        # Erro não pode virar "não existe": criaria um cliente duplicado
+        response.raise_for_status()
         data = response.json()
         items = data.get("data", [])
         return items[0] if items else None
@@ -45,12 +70,15 @@ class AsaasService:
     # ─────────────────────────────────────────
     # Pagamento (cobrança única)
     # ─────────────────────────────────────────
-    async def criar_pagamento(self, customer_id: str, valor: float, vencimento: str) -> dict:
+    async def criar_pagamento(
+        self, customer_id: str, valor: float, vencimento: str, referencia_externa: str | None = None
+    ) -> dict:
         """
         Cria uma cobrança no Asaas.
         - customer_id: ID do cliente no Asaas
         - valor: valor em reais (ex: 149.00)
         - vencimento: data no formato YYYY-MM-DD
+        - referencia_externa: nosso id (externalReference), para achar a cobrança depois
         """
         payload = {
             "customer": customer_id,
@@ -58,23 +86,48 @@ class AsaasService:
             "value": valor,
             "dueDate": vencimento,
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/payments",
-                json=payload,
-                headers=self.headers,
-            )
+        if referencia_externa:
+            payload["externalReference"] = referencia_externa
+        response = await self._requisicao(
+            "pagamentos.criar", "POST", "/payments",
+            json=payload,
+        )
         return response.json()
 
     async def buscar_pagamento(self, payment_id: str) -> dict:
         """Busca status de um pagamento pelo ID."""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/payments/{payment_id}",
-                headers=self.headers,
-            )
+        response = await self._requisicao("pagamentos.buscar", "GET", f"/payments/{payment_id}")
         return response.json()
 
+    async def obter_qrcode_pix(self, payment_id: str) -> dict:
+        """QR Code PIX da cobrança (encodedImage, payload, expirationDate)."""
+        response = await self._requisicao("pagamentos.pix", "GET", f"/payments/{payment_id}/pixQrCode")
+        response.raise_for_status()
+        return response.json()
+
+    async def listar_pagamentos(self, offset: int = 0, limit: int = 100, **filtros) -> dict:
+        """
+        Uma página da listagem de cobranças (máx. 100 por página).
+        Filtros no formato da API, ex: {"status": "OVERDUE", "dueDate[ge]": "2026-10-01"}.
+        Devolve o envelope inteiro (data, hasMore, totalCount...).
+        """
+        response = await self._requisicao(
+            "pagamentos.listar", "GET", "/payments",
+            params={**filtros, "offset": offset, "limit": limit},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def buscar_pagamento_por_referencia(self, referencia_externa: str) -> dict | None:
+        """Busca a cobrança criada com esta externalReference (se houver)."""
+        response = await self._requisicao(
+            "pagamentos.por_referencia", "GET", "/payments",
+            params={"externalReference": referencia_externa},
+        )
+        response.raise_for_status()
+        items = response.json().get("data", [])
+        return items[0] if items else None
+
     # ─────────────────────────────────────────
     # Assinatura (recorrência mensal)
     # ─────────────────────────────────────────
@@ -90,12 +143,10 @@ class AsaasService:
             "nextDueDate": None,  # Vai ser preenchido automaticamente pelo Asaas
             "cycle": 1,           # 1 = mensal
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/subscriptions",
-                json=payload,
-                headers=self.headers,
-            )
+        response = await self._requisicao(
+            "assinaturas.criar", "POST", "/subscriptions",
+            json=payload,
+        )
         return response.json()
 
 
@@ -1,18 +1,76 @@
+import asyncio
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from uuid import UUID
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event
+from sqlalchemy.orm import Session, object_session
 
 from app.config.settings import settings
 from app.config.database import get_db
 from app.models.models import Usuario
+from app.services.cache import TTLCache
 
 # Configuração
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+
+# ─────────────────────────────────────────────
+# Cache de usuários autenticados
+#   Evita um SELECT em usuarios a cada request autenticado.
+#   Guarda apenas um snapshot leve (não a entidade ORM).
+# ─────────────────────────────────────────────
+@dataclass(frozen=True)
+class UsuarioAutenticado:
+    id: UUID
+    dojo_id: UUID
+    role: str
+    aluno_id: UUID | None
+    ativo: bool
+
+
+usuarios_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+
+def invalidar_usuario_cache(user_id) -> None:
+    usuarios_cache.invalidate(str(user_id))
+
+
+_PENDENTES = "usuarios_cache_invalidar"
+
+
+@event.listens_for(Usuario, "after_update")
+@event.listens_for(Usuario, "after_delete")
+def _usuario_alterado(mapper, connection, target):
+    # Qualquer alteração (ex: desativação, troca de role) derruba o snapshot,
+    # mas só depois do commit: no flush, um request concorrente ainda lê a
+    # linha antiga e regravaria o snapshot velho no cache
+    session = object_session(target)
+    if session is None:
+        invalidar_usuario_cache(target.id)
+        return
+    session.info.setdefault(_PENDENTES, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_apos_commit(session):
+    for user_id in session.info.pop(_PENDENTES, ()):
+        invalidar_usuario_cache(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_apos_rollback(session):
+    session.info.pop(_PENDENTES, None)
+
+
 # ─────────────────────────────────────────────
 # Funções utilitárias (Usando bcrypt diretamente)
 # ─────────────────────────────────────────────
@@ -32,6 +90,54 @@ def get_password_hash(senha: str) -> str:
     hash_bytes = bcrypt.hashpw(senha.encode('utf-8'), salt)
     return hash_bytes.decode('utf-8')
 
+
+# ─────────────────────────────────────────────
+# Versões assíncronas (usar nas rotas)
+#   bcrypt leva ~100-300 ms de CPU por chamada. Rodar inline
+#   trava o event loop inteiro; aqui ele roda num pool de
+#   threads dedicado, com limite de concorrência e de fila.
+# ─────────────────────────────────────────────
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt",
+)
+_hash_semaforo = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+_hash_na_fila = 0
+
+
+async def _executar_hash(func, *args):
+    global _hash_na_fila
+    if _hash_na_fila >= settings.PASSWORD_HASH_MAX_QUEUE:
+        # Melhor recusar rápido do que acumular logins esperando indefinidamente
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente em instantes.",
+        )
+
+    _hash_na_fila += 1
+    try:
+        async with _hash_semaforo:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_na_fila -= 1
+
+
+async def verify_password_async(senha_plana: str, senha_hash: str) -> bool:
+    return await _executar_hash(verify_password, senha_plana, senha_hash)
+
+
+async def get_password_hash_async(senha: str) -> str:
+    return await _executar_hash(get_password_hash, senha)
+
+
+def hash_pool_stats() -> dict:
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "na_fila": _hash_na_fila,
+        "max_fila": settings.PASSWORD_HASH_MAX_QUEUE,
+    }
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -44,7 +150,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
-) -> Usuario:
+) -> UsuarioAutenticado:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token inválido ou expirado.",
@@ -58,10 +164,25 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    result = await db.execute(select(Usuario).where(Usuario.id == user_id))
-    usuario = result.scalar_one_or_none()
+    usuario = usuarios_cache.get(user_id)
+    if usuario is not None:
+        return usuario
+
+    result = await db.execute(
+        select(Usuario.id, Usuario.dojo_id, Usuario.role, Usuario.aluno_id, Usuario.ativo)
+        .where(Usuario.id == user_id)
+    )
+    row = result.one_or_none()
 
-    if usuario is None or not usuario.ativo:
+    if row is None or not row.ativo:
         raise credentials_exception
 
+    usuario = UsuarioAutenticado(
+        id=row.id,
+        dojo_id=row.dojo_id,
+        role=row.role,
+        aluno_id=row.aluno_id,
+        ativo=row.ativo,
+    )
+    usuarios_cache.set(user_id, usuario)
     return usuario
\ No newline at end of file
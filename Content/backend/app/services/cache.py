@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Cache em memória (por processo) com limite de tamanho (LRU) e expiração por TTL.
+    Mantém contadores de acertos/erros para medir quanto trabalho o cache evita.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._dados: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave: Hashable, default: Any = None) -> Any:
+        item = self._dados.get(chave)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            # Expirou: remove e conta como erro
+            del self._dados[chave]
+            self.misses += 1
+            return default
+
+        self._dados.move_to_end(chave)
+        self.hits += 1
+        return valor
+
+    def set(self, chave: Hashable, valor: Any, ttl: float | None = None) -> None:
+        self._dados[chave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+        self._dados.move_to_end(chave)
+        # Descarta os menos usados quando passa do limite
+        while len(self._dados) > self.maxsize:
+            self._dados.popitem(last=False)
+
+    def invalidate(self, chave: Hashable) -> None:
+        self._dados.pop(chave, None)
+
+    def clear(self) -> None:
+        self._dados.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "tamanho": len(self._dados),
+            "max": self.maxsize,
+            "ttl_segundos": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesce chamadas simultâneas com a mesma chave: a primeira executa,
+    as outras esperam o mesmo resultado (ou a mesma exceção). Nada é
+    guardado depois que termina; combine com um cache para isso.
+    """
+
+    def __init__(self):
+        self._em_voo: dict[Hashable, asyncio.Future] = {}
+        self.execucoes = 0
+        self.coalescidas = 0
+
+    @staticmethod
+    def _descartar_erro(voo: asyncio.Future):
+        # Se todos os interessados foram cancelados, ninguém lê a exceção
+        if not voo.cancelled():
+            voo.exception()
+
+    async def executar(self, chave: Hashable, fabrica: Callable[[], Awaitable[Any]]) -> Any:
+        voo = self._em_voo.get(chave)
+        if voo is not None:
+            self.coalescidas += 1
+        else:
+            self.execucoes += 1
+            voo = asyncio.ensure_future(fabrica())
+            self._em_voo[chave] = voo
+            voo.add_done_callback(lambda _: self._em_voo.pop(chave, None))
+            voo.add_done_callback(self._descartar_erro)
+        # shield: um chamador cancelado não derruba a chamada dos outros
+        return await asyncio.shield(voo)
+
+    def stats(self) -> dict:
+        return {"em_voo": len(self._em_voo), "execucoes": self.execucoes, "coalescidas": self.coalescidas}
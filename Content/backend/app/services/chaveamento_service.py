@@ -0,0 +1,491 @@
+import json
+import logging
+import random
+from collections import Counter, defaultdict
+from uuid import UUID
+
+from sqlalchemy import select, delete, insert, update
+from sqlalchemy.orm import aliased
+
+from app.config.database import AsyncSessionLocal
+from app.config.redis_cliente import redis_cliente
+from app.config.settings import settings
+from app.models.models import Aluno, CategoriaEvento, Dojo, Evento, InscricaoEvento, LutaChave
+from app.services.cache import TTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+BYE = {"id": "BYE", "nome": "---"}
+
+PREFIXO_REDIS = "chaves_evento:"
+
+FORMATO = "eliminatoria_simples"
+
+
+def consulta_inscritos(evento_id: UUID, categoria_id: UUID):
+    """
+    Inscritos pagos da categoria com nome e dojo, numa consulta só
+    (ix_inscricoes_evento_categoria_pagos + PK de alunos e dojos).
+    """
+    return (
+        select(InscricaoEvento.aluno_id, Aluno.nome, Aluno.dojo_id, Dojo.nome.label("dojo"))
+        .join(Aluno, Aluno.id == InscricaoEvento.aluno_id)
+        .join(Dojo, Dojo.id == Aluno.dojo_id)
+        .where(
+            InscricaoEvento.evento_id == evento_id,
+            InscricaoEvento.categoria_id == categoria_id,
+            InscricaoEvento.pago == True,
+        )
+    )
+
+
+def ordem_sementes(tamanho: int) -> list[int]:
+    """
+    Semente de cada posição da chave (1-based), no padrão dos campeonatos:
+    8 -> [1, 8, 4, 5, 2, 7, 3, 6]. A semente s enfrenta tamanho + 1 - s na
+    primeira rodada e as duas primeiras só se cruzam na final.
+    """
+    ordem = [1]
+    while len(ordem) < tamanho:
+        total = len(ordem) * 2
+        ordem = [x for s in ordem for x in (s, total + 1 - s)]
+    return ordem
+
+
+def nome_rodada(rodada: int, total: int) -> str:
+    faltam = total - rodada
+    nomes = {0: "Final", 1: "Semifinal", 2: "Quartas de final", 3: "Oitavas de final"}
+    return nomes.get(faltam, f"Rodada {rodada}")
+
+
+# ─────────────────────────────────────────────
+# Distribuição nas posições
+#   A chave é uma árvore binária numerada como heap: raiz 1, filhos de k
+#   em 2k e 2k + 1, posição p na folha tamanho + p. Dois atletas nas
+#   posições p e q só se enfrentam na rodada (p ^ q).bit_length(). Cada
+#   atleta desce da raiz escolhendo o lado com menos gente do seu dojo
+#   (entre os que têm posição livre da sua faixa de sementes):
+#   companheiros de dojo ficam em metades, depois quartos, diferentes, e
+#   só se cruzam o mais tarde possível. O(log n) por atleta.
+# ─────────────────────────────────────────────
+class _Distribuicao:
+    def __init__(self, tamanho: int, rng: random.Random):
+        self.tamanho = tamanho
+        self.rng = rng
+        self.por_dojo: dict = defaultdict(dict)  # dojo_id -> {nó: atletas colocados abaixo}
+        self.livres = [0] * (2 * tamanho)  # nó -> posições livres da faixa atual abaixo
+
+    def abrir_faixa(self, posicoes: list[int]):
+        self.livres = [0] * (2 * self.tamanho)
+        for posicao in posicoes:
+            no = self.tamanho + posicao
+            while no:
+                self.livres[no] += 1
+                no >>= 1
+
+    def marcar(self, posicao: int, dojo_id, faixa: bool = True):
+        contagem = self.por_dojo[dojo_id]
+        no = self.tamanho + posicao
+        while no:
+            contagem[no] = contagem.get(no, 0) + 1
+            if faixa:
+                self.livres[no] -= 1
+            no >>= 1
+
+    def escolher(self, dojo_id) -> int:
+        contagem = self.por_dojo[dojo_id]
+        livres = self.livres
+        no = 1
+        while no < self.tamanho:
+            esquerda, direita = 2 * no, 2 * no + 1
+            if not livres[direita]:
+                no = esquerda
+            elif not livres[esquerda]:
+                no = direita
+            else:
+                # Menos companheiros de dojo; depois mais vagas; depois sorteio
+                criterio_e = (contagem.get(esquerda, 0), -livres[esquerda])
+                criterio_d = (contagem.get(direita, 0), -livres[direita])
+                if criterio_e == criterio_d:
+                    no = esquerda if self.rng.random() < 0.5 else direita
+                else:
+                    no = esquerda if criterio_e < criterio_d else direita
+        posicao = no - self.tamanho
+        self.marcar(posicao, dojo_id)
+        return posicao
+
+
+def _faixas(sementes: range, byes: int) -> list[list[int]]:
+    """
+    Sementes que podem trocar de posição entre si sem mudar quem enfrenta
+    quem no ranking: 1 | 2 | 3-4 | 5-8 | ..., separando ainda as que
+    recebem bye das que não recebem.
+    """
+    faixas: list[list[int]] = []
+    anterior = None
+    for semente in sementes:
+        chave = ((semente - 1).bit_length(), semente <= byes)
+        if chave != anterior:
+            faixas.append([])
+            anterior = chave
+        faixas[-1].append(semente)
+    return faixas
+
+
+def distribuir(atletas: list[dict], cabecas: int, rng: random.Random) -> list[dict | None]:
+    """
+    Posições da primeira rodada (None = bye). `atletas` vem na ordem das
+    sementes; as `cabecas` primeiras ficam exatamente na posição da sua
+    semente, as demais são sorteio e podem trocar dentro da faixa para
+    separar dojos. Os byes vão para os adversários das melhores sementes,
+    espalhados pela chave, e nunca dois na mesma luta.
+    """
+    total = len(atletas)
+    tamanho = 1 << (total - 1).bit_length()
+    byes = tamanho - total
+    posicao_da_semente = {s: p for p, s in enumerate(ordem_sementes(tamanho))}
+    posicoes: list[dict | None] = [None] * tamanho
+    distribuicao = _Distribuicao(tamanho, rng)
+
+    for semente, atleta in enumerate(atletas[:cabecas], start=1):
+        posicao = posicao_da_semente[semente]
+        posicoes[posicao] = atleta
+        distribuicao.marcar(posicao, atleta["dojo_id"], faixa=False)
+
+    tamanho_dojo = Counter(a["dojo_id"] for a in atletas)
+    proximo = cabecas
+    for faixa in _faixas(range(cabecas + 1, total + 1), byes):
+        grupo = atletas[proximo:proximo + len(faixa)]
+        proximo += len(faixa)
+        # Dojos maiores primeiro: são os que mais precisam de espaço
+        grupo.sort(key=lambda a: (-tamanho_dojo[a["dojo_id"]], str(a["dojo_id"])))
+        distribuicao.abrir_faixa([posicao_da_semente[s] for s in faixa])
+        for atleta in grupo:
+            posicoes[distribuicao.escolher(atleta["dojo_id"])] = atleta
+    return posicoes
+
+
+# ─────────────────────────────────────────────
+# Montagem das rodadas
+#   Todas as rodadas saem prontas, cada luta com o id da luta para onde o
+#   vencedor vai ("proxima": luta e lado). Luta com bye já sai finalizada e
+#   o atleta aparece na rodada 2; as demais vagas ficam None até o
+#   resultado. Compatível com quem lê só "rodada_1".
+# ─────────────────────────────────────────────
+def id_luta(rodada: int, posicao: int) -> str:
+    return f"{rodada}-{posicao}"
+
+
+def montar_rodadas(posicoes: list[dict | None]) -> list[list[dict]]:
+    niveis = len(posicoes).bit_length() - 1
+    rodadas: list[list[dict]] = []
+    vagas = posicoes
+    for rodada in range(1, niveis + 1):
+        lutas = []
+        proximas: list[dict | None] = []
+        for posicao in range(len(vagas) // 2):
+            atleta_a, atleta_b = vagas[2 * posicao], vagas[2 * posicao + 1]
+            vencedor = None
+            if rodada == 1:
+                # Bye nunca enfrenta bye: só o lado b pode estar vazio
+                if atleta_b is None:
+                    atleta_b, vencedor = BYE, atleta_a
+            status = "finalizado" if vencedor else "pendente" if atleta_a and atleta_b else "aguardando"
+            lutas.append({
+                "id": id_luta(rodada, posicao),
+                "rodada": rodada,
+                "posicao": posicao,
+                "atleta_a": atleta_a,
+                "atleta_b": atleta_b,
+                "vencedor": vencedor,
+                "status": status,
+                "proxima": {
+                    "luta": id_luta(rodada + 1, posicao // 2),
+                    "lado": "a" if posicao % 2 == 0 else "b",
+                } if rodada < niveis else None,
+            })
+            proximas.append(vencedor)
+        rodadas.append(lutas)
+        vagas = proximas
+    return rodadas
+
+
+def _chave(rodadas: list[list[dict]], semente: int | None) -> dict:
+    tamanho = 2 * len(rodadas[0])
+    byes = sum(1 for luta in rodadas[0] if luta["atleta_b"] is BYE)
+    chave = {
+        "formato": FORMATO,
+        "inscritos": tamanho - byes,
+        "tamanho": tamanho,
+        "byes": byes,
+        "semente": semente,
+        "rodadas": [
+            {"chave": f"rodada_{numero}", "nome": nome_rodada(numero, len(rodadas)), "lutas": len(lutas)}
+            for numero, lutas in enumerate(rodadas, start=1)
+        ],
+    }
+    for numero, lutas in enumerate(rodadas, start=1):
+        chave[f"rodada_{numero}"] = lutas
+    return chave
+
+
+def gerar_chave(
+    inscritos,
+    cabecas_de_chave: list[UUID] | None = None,
+    semente: int | None = None,
+) -> dict:
+    """
+    Chave de eliminatória simples de uma categoria. `inscritos`: linhas de
+    consulta_inscritos (aluno_id, nome, dojo_id, dojo); `cabecas_de_chave`:
+    aluno_ids na ordem do ranking; os demais são sorteados (`semente`
+    reproduz o sorteio; sem ela, uma é escolhida e volta na chave).
+    Levanta ValueError se houver menos de 2 inscritos ou cabeça de chave
+    que não está entre eles.
+    """
+    if len(inscritos) < 2:
+        raise ValueError("Mínimo de 2 inscritos pagos nesta categoria para gerar chaves.")
+    if semente is None:
+        semente = random.SystemRandom().randrange(2 ** 31)
+    rng = random.Random(semente)
+    atletas = {
+        linha.aluno_id: {
+            "id": str(linha.aluno_id),
+            "nome": linha.nome,
+            "dojo_id": str(linha.dojo_id),
+            "dojo": linha.dojo,
+        }
+        for linha in inscritos
+    }
+
+    cabecas = list(dict.fromkeys(cabecas_de_chave or []))
+    fora = [str(c) for c in cabecas if c not in atletas]
+    if fora:
+        raise ValueError(f"Cabeças de chave sem inscrição paga na categoria: {', '.join(fora)}")
+    escolhidos = set(cabecas)
+    for numero, aluno_id in enumerate(cabecas, start=1):
+        atletas[aluno_id]["cabeca_de_chave"] = numero
+    sorteados = [a for aluno_id, a in atletas.items() if aluno_id not in escolhidos]
+    rng.shuffle(sorteados)
+
+    posicoes = distribuir([atletas[c] for c in cabecas] + sorteados, len(cabecas), rng)
+    return _chave(montar_rodadas(posicoes), semente)
+
+
+# ─────────────────────────────────────────────
+# Lutas gravadas (lutas_chave)
+#   A chave gerada vira uma linha por luta; o resultado de uma luta mexe
+#   só na linha dela e na vaga da próxima. O JSON por categoria é montado
+#   na leitura, com nomes e dojos num join só, e fica em cache por evento.
+# ─────────────────────────────────────────────
+def _aluno_id(atleta: dict | None) -> UUID | None:
+    return None if atleta is None or atleta is BYE else UUID(atleta["id"])
+
+
+def linhas_lutas(evento_id: UUID, categoria_id: UUID, chave: dict) -> list[dict]:
+    """Linhas de lutas_chave de uma chave de gerar_chave."""
+    return [
+        {
+            "evento_id": evento_id,
+            "categoria_id": categoria_id,
+            "rodada": luta["rodada"],
+            "posicao": luta["posicao"],
+            "atleta_a_id": _aluno_id(luta["atleta_a"]),
+            "atleta_b_id": _aluno_id(luta["atleta_b"]),
+            "cabeca_a": (luta["atleta_a"] or {}).get("cabeca_de_chave"),
+            "cabeca_b": (luta["atleta_b"] or {}).get("cabeca_de_chave"),
+            "bye": luta["atleta_b"] is BYE,
+            "vencedor_id": _aluno_id(luta["vencedor"]),
+            "status": luta["status"],
+        }
+        for rodada in chave["rodadas"]
+        for luta in chave[rodada["chave"]]
+    ]
+
+
+async def gravar_chave(db, evento_id: UUID, categoria_id: UUID, chave: dict):
+    """Troca as lutas da categoria pelas da chave nova (sem commit)."""
+    await db.execute(
+        delete(LutaChave).where(LutaChave.evento_id == evento_id, LutaChave.categoria_id == categoria_id)
+    )
+    await db.execute(insert(LutaChave), linhas_lutas(evento_id, categoria_id, chave))
+    # Com a semente e as cabeças de chave gravadas, o sorteio pode ser refeito igual
+    await db.execute(
+        update(CategoriaEvento).where(CategoriaEvento.id == categoria_id).values(semente_chave=chave["semente"])
+    )
+
+
+def consulta_lutas(evento_id: UUID):
+    """Lutas do evento em ordem de categoria, rodada e posição (uq_lutas_chave_posicao)."""
+    atleta_a, atleta_b = aliased(Aluno), aliased(Aluno)
+    dojo_a, dojo_b = aliased(Dojo), aliased(Dojo)
+    return (
+        select(
+            LutaChave.id,
+            LutaChave.categoria_id,
+            LutaChave.rodada,
+            LutaChave.posicao,
+            LutaChave.atleta_a_id,
+            LutaChave.atleta_b_id,
+            LutaChave.cabeca_a,
+            LutaChave.cabeca_b,
+            LutaChave.bye,
+            LutaChave.vencedor_id,
+            LutaChave.status,
+            atleta_a.nome.label("nome_a"),
+            atleta_a.dojo_id.label("dojo_id_a"),
+            dojo_a.nome.label("dojo_a"),
+            atleta_b.nome.label("nome_b"),
+            atleta_b.dojo_id.label("dojo_id_b"),
+            dojo_b.nome.label("dojo_b"),
+            CategoriaEvento.semente_chave,
+        )
+        .join(CategoriaEvento, CategoriaEvento.id == LutaChave.categoria_id)
+        .outerjoin(atleta_a, atleta_a.id == LutaChave.atleta_a_id)
+        .outerjoin(dojo_a, dojo_a.id == atleta_a.dojo_id)
+        .outerjoin(atleta_b, atleta_b.id == LutaChave.atleta_b_id)
+        .outerjoin(dojo_b, dojo_b.id == atleta_b.dojo_id)
+        .where(LutaChave.evento_id == evento_id)
+        .order_by(LutaChave.categoria_id, LutaChave.rodada, LutaChave.posicao)
+    )
+
+
+def _atleta(aluno_id, nome, dojo_id, dojo, cabecas: dict) -> dict | None:
+    if aluno_id is None:
+        return None
+    atleta = {"id": str(aluno_id), "nome": nome, "dojo_id": str(dojo_id), "dojo": dojo}
+    if aluno_id in cabecas:
+        atleta["cabeca_de_chave"] = cabecas[aluno_id]
+    return atleta
+
+
+def montar_chaves(linhas) -> dict[str, dict]:
+    """Linhas de consulta_lutas -> {categoria_id: chave}, no formato de gerar_chave."""
+    por_categoria: dict[str, list] = defaultdict(list)
+    for linha in linhas:
+        por_categoria[str(linha.categoria_id)].append(linha)
+
+    chaves = {}
+    for categoria_id, lutas in por_categoria.items():
+        ids = {(l.rodada, l.posicao): str(l.id) for l in lutas}
+        total = max(l.rodada for l in lutas)
+        # Número de cabeça de chave fica na luta da rodada 1; vale para o atleta em todas
+        cabecas = {l.atleta_a_id: l.cabeca_a for l in lutas if l.cabeca_a}
+        cabecas.update({l.atleta_b_id: l.cabeca_b for l in lutas if l.cabeca_b})
+        rodadas: list[list[dict]] = [[] for _ in range(total)]
+        for l in lutas:
+            atleta_a = _atleta(l.atleta_a_id, l.nome_a, l.dojo_id_a, l.dojo_a, cabecas)
+            atleta_b = BYE if l.bye else _atleta(l.atleta_b_id, l.nome_b, l.dojo_id_b, l.dojo_b, cabecas)
+            vencedor = atleta_a if l.vencedor_id and l.vencedor_id == l.atleta_a_id else (
+                atleta_b if l.vencedor_id else None
+            )
+            rodadas[l.rodada - 1].append({
+                "id": str(l.id),
+                "rodada": l.rodada,
+                "posicao": l.posicao,
+                "atleta_a": atleta_a,
+                "atleta_b": atleta_b,
+                "vencedor": vencedor,
+                "status": l.status,
+                "proxima": {
+                    "luta": ids[(l.rodada + 1, l.posicao // 2)],
+                    "lado": "a" if l.posicao % 2 == 0 else "b",
+                } if l.rodada < total else None,
+            })
+        chaves[categoria_id] = _chave(rodadas, lutas[0].semente_chave)
+    return chaves
+
+
+# ─────────────────────────────────────────────
+# Cache das chaves por evento (chave: evento_id)
+#   Mesmo esquema do resumo financeiro: Redis quando configurado, memória
+#   local senão; gerar-chaves e resultado de luta chamam invalidar() depois
+#   do commit. Categorias ainda só no Evento.chaves_json antigo (sem linhas
+#   em lutas_chave) aparecem como estavam.
+# ─────────────────────────────────────────────
+class CacheChaves:
+    def __init__(self):
+        self.local = TTLCache(maxsize=settings.BRACKET_CACHE_MAX_SIZE, ttl=settings.BRACKET_CACHE_TTL_SECONDS)
+        self.em_voo = SingleFlight()
+        self.geracoes: dict[UUID, int] = defaultdict(int)
+        self.hits_redis = 0
+        self.misses_redis = 0
+        self.erros_redis = 0
+        self.calculos = 0
+        self.descartados = 0
+        self.invalidacoes = 0
+
+    async def _ler(self, evento_id: UUID) -> dict | None:
+        redis = redis_cliente()
+        if redis is None:
+            return self.local.get(evento_id)
+        try:
+            valor = await redis.get(PREFIXO_REDIS + str(evento_id))
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Redis indisponível nas chaves do evento: %s", e)
+            return self.local.get(evento_id)
+        if valor is None:
+            self.misses_redis += 1
+            return None
+        self.hits_redis += 1
+        return json.loads(valor)
+
+    async def _gravar(self, evento_id: UUID, chaves: dict):
+        redis = redis_cliente()
+        if redis is None:
+            self.local.set(evento_id, chaves)
+            return
+        try:
+            await redis.set(PREFIXO_REDIS + str(evento_id), json.dumps(chaves), ex=settings.BRACKET_CACHE_TTL_SECONDS)
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Redis indisponível nas chaves do evento: %s", e)
+            self.local.set(evento_id, chaves)
+
+    async def _calcular(self, evento_id: UUID, geracao: int) -> dict:
+        self.calculos += 1
+        async with AsyncSessionLocal() as db:
+            legado = (await db.execute(select(Evento.chaves_json).where(Evento.id == evento_id))).scalar()
+            chaves = {**(json.loads(legado) if legado else {}), **montar_chaves(
+                (await db.execute(consulta_lutas(evento_id))).all()
+            )}
+        if self.geracoes[evento_id] == geracao:
+            await self._gravar(evento_id, chaves)
+        else:
+            self.descartados += 1
+        return chaves
+
+    async def obter(self, evento_id: UUID) -> dict:
+        chaves = await self._ler(evento_id)
+        if chaves is not None:
+            return chaves
+        geracao = self.geracoes[evento_id]
+        return await self.em_voo.executar((evento_id, geracao), lambda: self._calcular(evento_id, geracao))
+
+    async def invalidar(self, evento_id: UUID):
+        self.invalidacoes += 1
+        self.geracoes[evento_id] += 1
+        self.local.invalidate(evento_id)
+        redis = redis_cliente()
+        if redis is None:
+            return
+        try:
+            await redis.delete(PREFIXO_REDIS + str(evento_id))
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Não foi possível invalidar as chaves do evento no Redis: %s", e)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis" if redis_cliente() is not None else "memoria",
+            "memoria": self.local.stats(),
+            "redis": {"hits": self.hits_redis, "misses": self.misses_redis, "erros": self.erros_redis},
+            "single_flight": self.em_voo.stats(),
+            "calculos": self.calculos,
+            "descartados_por_invalidacao": self.descartados,
+            "invalidacoes": self.invalidacoes,
+        }
+
+
+# Instância usada pelas rotas de chaves e de resultado de luta
+cache_chaves = CacheChaves()
@@ -0,0 +1,98 @@
+import logging
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.models.models import Aluno
+from app.services.asaas_service import AsaasService, asaas_service
+from app.services.cache import TTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_cpf(cpf: str) -> str:
+    return "".join(c for c in cpf if c.isdigit())
+
+
+# ─────────────────────────────────────────────
+# Resolução do cliente do Asaas de um aluno, do mais barato ao mais caro:
+#   1. Aluno.asaas_id (coluna local)
+#   2. cache em memória CPF -> id do cliente
+#   3. busca por CPF no Asaas e, se não houver, cria o cliente
+# No passo 3, resoluções simultâneas do mesmo CPF esperam a mesma
+# requisição (single-flight): nunca dois clientes para um CPF.
+# 5xx/429/timeout sobem como IntegracaoIndisponivel (tentar de novo);
+# 4xx (CPF malformado, chave inválida) é recusa e vira None.
+# ─────────────────────────────────────────────
+class ResolvedorClientesAsaas:
+    def __init__(self, asaas: AsaasService):
+        self.asaas = asaas
+        self.cache = TTLCache(
+            maxsize=settings.ASAAS_CUSTOMER_CACHE_MAX_SIZE,
+            ttl=settings.ASAAS_CUSTOMER_CACHE_TTL_SECONDS,
+        )
+        self.em_voo = SingleFlight()
+        self.pela_coluna = 0
+        self.buscas = 0
+        self.criados = 0
+        self.recusados = 0
+
+    async def _buscar_ou_criar(self, cpf: str, nome: str) -> str | None:
+        self.buscas += 1
+        try:
+            existente = await self.asaas.buscar_cliente_por_cpf(cpf)
+        except httpx.HTTPStatusError as e:
+            self.recusados += 1
+            logger.warning("Asaas recusou a busca do cliente por CPF: HTTP %s", e.response.status_code)
+            return None
+        if existente:
+            cliente_id = existente["id"]
+        else:
+            self.criados += 1
+            cliente_id = (await self.asaas.criar_cliente(nome, cpf)).get("id")
+        if cliente_id:
+            self.cache.set(cpf, cliente_id)
+        return cliente_id
+
+    async def resolver_cpf(self, cpf: str, nome: str) -> str | None:
+        """Passos 2 e 3 (sem banco). None = o Asaas recusou o CPF ou não devolveu id."""
+        cpf = normalizar_cpf(cpf)
+        cliente_id = self.cache.get(cpf)
+        if cliente_id:
+            return cliente_id
+        return await self.em_voo.executar(cpf, lambda: self._buscar_ou_criar(cpf, nome))
+
+    async def resolver(self, db: AsyncSession, aluno: Aluno) -> str | None:
+        """
+        Id do cliente do aluno no Asaas, gravando em Aluno.asaas_id quando
+        vier do cache ou do Asaas (o commit fica com quem chamou).
+        None = aluno sem CPF, CPF recusado ou o Asaas não devolveu id.
+        """
+        if aluno.asaas_id:
+            self.pela_coluna += 1
+            return aluno.asaas_id
+        if not aluno.cpf:
+            return None
+        cliente_id = await self.resolver_cpf(aluno.cpf, aluno.nome)
+        if cliente_id:
+            aluno.asaas_id = cliente_id
+        return cliente_id
+
+    @property
+    def chamadas_asaas(self) -> int:
+        return self.buscas + self.criados
+
+    def stats(self) -> dict:
+        return {
+            "pela_coluna": self.pela_coluna,
+            "cache": self.cache.stats(),
+            "single_flight": self.em_voo.stats(),
+            "buscas_asaas": self.buscas,
+            "criados_asaas": self.criados,
+            "recusados_asaas": self.recusados,
+        }
+
+
+# Instância usada pelas rotas e pela cobrança em lote
+clientes_asaas = ResolvedorClientesAsaas(asaas_service)
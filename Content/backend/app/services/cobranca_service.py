@@ -0,0 +1,504 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time
+from uuid import UUID
+
+import httpx
+from sqlalchemy import select, update, insert, exists, func, literal, values, column, text, String, Text
+from sqlalchemy.dialects.postgresql import insert as pg_insert, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import engine, AsyncSessionLocal
+from app.config.settings import settings
+from app.models.models import Aluno, Pagamento, LoteCobranca, ItemLoteCobranca
+from app.services.asaas_service import asaas_service
+from app.services.cliente_asaas_service import clientes_asaas
+from app.services.evolution_service import evolution_service
+from app.services.fila_worker import WorkerFila
+from app.services.notificacao_service import enfileirar_whatsapp, worker_notificacoes
+from app.services.resiliencia import IntegracaoIndisponivel
+from app.services.resumo_financeiro_service import cache_resumo_financeiro
+
+logger = logging.getLogger(__name__)
+
+
+class LoteEmExecucao(Exception):
+    """Outro processo (ou task) já está rodando este lote."""
+
+
+def vencimento_do_mes(referencia_mes: str, dia: int) -> date:
+    ano, mes = (int(parte) for parte in referencia_mes.split("-"))
+    return date(ano, mes, min(max(dia, 1), 28))
+
+
+# ─────────────────────────────────────────────
+# Abertura do lote e criação dos pagamentos locais (só banco)
+# ─────────────────────────────────────────────
+async def abrir_lote(
+    db: AsyncSession,
+    dojo_id: UUID,
+    referencia_mes: str,
+    valor: float,
+    dia_vencimento: int,
+    criado_por: UUID | None = None,
+) -> LoteCobranca:
+    """Um lote por dojo e mês: se já existe, devolve o existente (para retomar)."""
+    await db.execute(
+        pg_insert(LoteCobranca)
+        .values(
+            id=uuid.uuid4(),
+            dojo_id=dojo_id,
+            referencia_mes=referencia_mes,
+            valor=valor,
+            vencimento=vencimento_do_mes(referencia_mes, dia_vencimento),
+            status="aberto",
+            criado_por=criado_por,
+            criado_em=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(constraint="uq_lotes_cobranca_dojo_id_referencia_mes")
+    )
+    result = await db.execute(
+        select(LoteCobranca).where(
+            LoteCobranca.dojo_id == dojo_id, LoteCobranca.referencia_mes == referencia_mes
+        )
+    )
+    lote = result.scalar_one()
+    await db.commit()
+    return lote
+
+
+async def preparar_itens(db: AsyncSession, lote: LoteCobranca) -> int:
+    """
+    Cria, num único INSERT, o Pagamento de cada aluno ativo que ainda não tem
+    um para o mês, e o item do lote apontando para ele. Não faz commit.
+    """
+    agora = datetime.utcnow()
+    ja_tem = exists().where(Pagamento.aluno_id == Aluno.id, Pagamento.referencia_mes == lote.referencia_mes)
+    novos = (
+        insert(Pagamento)
+        .from_select(
+            ["id", "dojo_id", "aluno_id", "valor", "status", "referencia_mes", "data_vencimento", "criado_em", "atualizado_em"],
+            select(
+                func.gen_random_uuid(),
+                Aluno.dojo_id,
+                Aluno.id,
+                literal(lote.valor),
+                literal("pendente"),
+                literal(lote.referencia_mes),
+                literal(datetime.combine(lote.vencimento, dt_time()), Pagamento.data_vencimento.type),
+                literal(agora, Pagamento.criado_em.type),
+                literal(agora, Pagamento.atualizado_em.type),
+            ).where(Aluno.dojo_id == lote.dojo_id, Aluno.ativo == True, ~ja_tem),
+        )
+        .returning(Pagamento.id, Pagamento.aluno_id)
+        .cte("novos")
+    )
+    result = await db.execute(
+        pg_insert(ItemLoteCobranca)
+        .from_select(
+            ["lote_id", "aluno_id", "pagamento_id", "status", "tentativas", "atualizado_em"],
+            select(
+                literal(lote.id, PG_UUID(as_uuid=True)),
+                novos.c.aluno_id,
+                novos.c.id,
+                literal("pendente"),
+                literal(0),
+                literal(agora, ItemLoteCobranca.atualizado_em.type),
+            ),
+        )
+        .on_conflict_do_nothing(),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
+
+
+# ─────────────────────────────────────────────
+# Execução: etapas de BILLING_CHUNK_SIZE alunos; em cada etapa marca a
+# tentativa, chama o Asaas com no máximo `concorrencia` requisições
+# simultâneas e grava tudo de uma vez. Se o processo cair no meio, os
+# itens com tentativa marcada são conferidos pela externalReference antes
+# de cobrar de novo: nenhuma cobrança em dobro.
+# ─────────────────────────────────────────────
+@dataclass
+class Resultado:
+    status: str  # cobrado | falhou | ignorado
+    asaas_payment_id: str | None = None
+    cliente_id: str | None = None  # cliente resolvido agora (grava no aluno)
+    erro: str | None = None
+
+
+def _erro_asaas(resposta: dict) -> str:
+    erros = resposta.get("errors") or []
+    return "; ".join(e.get("description", str(e)) for e in erros) or "resposta sem id"
+
+
+class ExecucaoLote:
+    def __init__(
+        self, lote_id: UUID, concorrencia: int | None = None, asaas=asaas_service, clientes=clientes_asaas
+    ):
+        self.lote_id = lote_id
+        self.asaas = asaas
+        self.clientes = clientes
+        self.semaforo = asyncio.Semaphore(concorrencia or settings.BILLING_CONCURRENCY)
+        self.chamadas_asaas = 0
+        self.recuperadas = 0
+
+    async def _cobrar(self, item) -> Resultado:
+        async with self.semaforo:
+            try:
+                if item.tentativas > 0:
+                    self.chamadas_asaas += 1
+                    existente = await self.asaas.buscar_pagamento_por_referencia(str(item.pagamento_id))
+                    if existente:
+                        self.recuperadas += 1
+                        return Resultado("cobrado", asaas_payment_id=existente["id"])
+
+                cliente = item.asaas_cliente
+                novo_cliente = None
+                if not cliente:
+                    if not item.cpf:
+                        return Resultado("ignorado", erro="Aluno sem CPF nem cliente no Asaas.")
+                    cliente = novo_cliente = await self.clientes.resolver_cpf(item.cpf, item.nome)
+                    if not cliente:
+                        return Resultado("falhou", erro="Não foi possível criar o cliente no Asaas.")
+
+                self.chamadas_asaas += 1
+                cobranca = await self.asaas.criar_pagamento(
+                    customer_id=cliente,
+                    valor=item.valor,
+                    vencimento=item.data_vencimento.strftime("%Y-%m-%d"),
+                    referencia_externa=str(item.pagamento_id),
+                )
+                if not cobranca.get("id"):
+                    return Resultado("falhou", cliente_id=novo_cliente, erro=_erro_asaas(cobranca))
+                return Resultado("cobrado", asaas_payment_id=cobranca["id"], cliente_id=novo_cliente)
+            except Exception as e:
+                return Resultado("falhou", erro=f"{type(e).__name__}: {e}"[:500])
+
+    async def _proximos(self, db: AsyncSession, depois_de: UUID | None) -> list:
+        stmt = (
+            select(
+                ItemLoteCobranca.aluno_id,
+                ItemLoteCobranca.pagamento_id,
+                ItemLoteCobranca.tentativas,
+                Aluno.nome,
+                Aluno.cpf,
+                Aluno.telefone,
+                Aluno.asaas_id.label("asaas_cliente"),
+                Pagamento.valor,
+                Pagamento.data_vencimento,
+            )
+            .join(Aluno, Aluno.id == ItemLoteCobranca.aluno_id)
+            .join(Pagamento, Pagamento.id == ItemLoteCobranca.pagamento_id)
+            .where(ItemLoteCobranca.lote_id == self.lote_id, ItemLoteCobranca.status != "cobrado")
+            .order_by(ItemLoteCobranca.aluno_id)
+            .limit(settings.BILLING_CHUNK_SIZE)
+        )
+        if depois_de is not None:
+            stmt = stmt.where(ItemLoteCobranca.aluno_id > depois_de)
+        return (await db.execute(stmt)).all()
+
+    async def _gravar(self, db: AsyncSession, dojo_id: UUID, itens: list, resultados: list[Resultado]):
+        """Uma etapa inteira em três UPDATE ... FROM (VALUES ...) e na outbox."""
+        uuid_ = PG_UUID(as_uuid=True)
+        cobrados = [(i, r) for i, r in zip(itens, resultados) if r.status == "cobrado"]
+        if cobrados:
+            lista = values(column("id", uuid_), column("asaas_id", String), name="cobrados").data(
+                [(i.pagamento_id, r.asaas_payment_id) for i, r in cobrados]
+            )
+            await db.execute(
+                update(Pagamento)
+                .where(Pagamento.id == lista.c.id)
+                .values(asaas_id=lista.c.asaas_id, atualizado_em=datetime.utcnow()),
+                execution_options={"synchronize_session": False},
+            )
+
+        clientes = [(i.aluno_id, r.cliente_id) for i, r in zip(itens, resultados) if r.cliente_id]
+        if clientes:
+            lista = values(column("id", uuid_), column("asaas_id", String), name="clientes").data(clientes)
+            await db.execute(
+                update(Aluno)
+                .where(Aluno.id == lista.c.id, Aluno.asaas_id.is_(None))
+                .values(asaas_id=lista.c.asaas_id),
+                execution_options={"synchronize_session": False},
+            )
+
+        lista = values(
+            column("aluno_id", uuid_), column("status", String), column("erro", Text), name="itens"
+        ).data([(i.aluno_id, r.status, r.erro) for i, r in zip(itens, resultados)])
+        await db.execute(
+            update(ItemLoteCobranca)
+            .where(ItemLoteCobranca.lote_id == self.lote_id, ItemLoteCobranca.aluno_id == lista.c.aluno_id)
+            .values(status=lista.c.status, ultimo_erro=lista.c.erro, atualizado_em=datetime.utcnow()),
+            execution_options={"synchronize_session": False},
+        )
+
+        for item, _ in cobrados:
+            if item.telefone:
+                mensagem = evolution_service.template_cobranca_pendente(
+                    nome_aluno=item.nome,
+                    valor=item.valor,
+                    vencimento=item.data_vencimento.strftime("%d/%m/%Y"),
+                )
+                enfileirar_whatsapp(db, item.telefone, mensagem, dojo_id=dojo_id)
+
+    async def _executar(self) -> dict:
+        inicio = time.perf_counter()
+        # Contador do resolvedor é do processo: vale como estimativa se houver outros lotes rodando
+        chamadas_clientes = self.clientes.chamadas_asaas
+        async with AsyncSessionLocal() as db:
+            lote = await db.get(LoteCobranca, self.lote_id)
+            if lote is None:
+                raise ValueError("Lote não encontrado.")
+            dojo_id = lote.dojo_id
+            novos = await preparar_itens(db, lote)
+            lote.status = "executando"
+            lote.iniciado_em = datetime.utcnow()
+            lote.concluido_em = None
+            await db.commit()
+        if novos:
+            await cache_resumo_financeiro.invalidar([dojo_id])
+
+        processados = 0
+        ultimo = None
+        while True:
+            async with AsyncSessionLocal() as db:
+                itens = await self._proximos(db, ultimo)
+                if not itens:
+                    break
+                ultimo = itens[-1].aluno_id
+                # Tentativa marcada ANTES de chamar o Asaas
+                await db.execute(
+                    update(ItemLoteCobranca)
+                    .where(
+                        ItemLoteCobranca.lote_id == self.lote_id,
+                        ItemLoteCobranca.aluno_id.in_([item.aluno_id for item in itens]),
+                    )
+                    .values(tentativas=ItemLoteCobranca.tentativas + 1),
+                    execution_options={"synchronize_session": False},
+                )
+                await db.commit()
+
+            resultados = await asyncio.gather(*[self._cobrar(item) for item in itens])
+
+            async with AsyncSessionLocal() as db:
+                await self._gravar(db, dojo_id, itens, resultados)
+                await db.commit()
+            worker_notificacoes.acordar()
+            processados += len(itens)
+
+        async with AsyncSessionLocal() as db:
+            contagem = dict((await db.execute(
+                select(ItemLoteCobranca.status, func.count())
+                .where(ItemLoteCobranca.lote_id == self.lote_id)
+                .group_by(ItemLoteCobranca.status)
+            )).all())
+            lote = await db.get(LoteCobranca, self.lote_id)
+            lote.total = sum(contagem.values())
+            lote.cobrados = contagem.get("cobrado", 0)
+            lote.falhas = contagem.get("falhou", 0)
+            lote.ignorados = contagem.get("ignorado", 0)
+            lote.status = "com_falhas" if lote.falhas else "concluido"
+            lote.concluido_em = datetime.utcnow()
+            await db.commit()
+            resumo = {
+                "lote_id": self.lote_id,
+                "status": lote.status,
+                "total": lote.total,
+                "cobrados": lote.cobrados,
+                "falhas": lote.falhas,
+                "ignorados": lote.ignorados,
+            }
+
+        duracao = time.perf_counter() - inicio
+        return {
+            **resumo,
+            "novos_pagamentos": novos,
+            "processados_nesta_execucao": processados,
+            "recuperados_por_referencia": self.recuperadas,
+            "chamadas_asaas": self.chamadas_asaas + self.clientes.chamadas_asaas - chamadas_clientes,
+            "duracao_s": round(duracao, 2),
+            "cobrancas_por_segundo": round(processados / duracao, 1) if duracao else None,
+        }
+
+    async def executar(self) -> dict:
+        """Trava o lote no cluster inteiro (advisory lock) durante a execução."""
+        chave = self.lote_id.int & 0x7FFF_FFFF_FFFF_FFFF
+        async with engine.connect() as trava:
+            livre = (await trava.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": chave})).scalar()
+            await trava.commit()
+            if not livre:
+                raise LoteEmExecucao(str(self.lote_id))
+            try:
+                return await self._executar()
+            finally:
+                await trava.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": chave})
+                await trava.commit()
+
+
+# ─────────────────────────────────────────────
+# Execução em segundo plano (rota POST /pagamentos/lotes)
+# ─────────────────────────────────────────────
+_execucoes: dict[UUID, asyncio.Task] = {}
+
+
+def em_execucao(lote_id: UUID) -> bool:
+    task = _execucoes.get(lote_id)
+    return task is not None and not task.done()
+
+
+def iniciar_execucao(lote_id: UUID) -> bool:
+    """False se o lote já está rodando neste processo."""
+    if em_execucao(lote_id):
+        return False
+
+    async def rodar():
+        try:
+            resumo = await ExecucaoLote(lote_id).executar()
+            logger.info("Lote de cobrança %s: %s", lote_id, resumo)
+        except LoteEmExecucao:
+            logger.info("Lote de cobrança %s já está em execução em outro processo.", lote_id)
+        except Exception:
+            logger.exception("Falha no lote de cobrança %s; rode de novo para retomar.", lote_id)
+
+    _execucoes[lote_id] = asyncio.create_task(rodar(), name=f"lote-cobranca-{lote_id}")
+    _execucoes[lote_id].add_done_callback(lambda _: _execucoes.pop(lote_id, None))
+    return True
+
+
+async def parar_execucoes():
+    """
+    Shutdown: cancela os lotes em andamento e espera saírem (libera o
+    advisory lock). O lote fica em "executando" e retoma na próxima
+    chamada sem cobrar ninguém duas vezes.
+    """
+    tarefas = list(_execucoes.values())
+    for task in tarefas:
+        task.cancel()
+    if tarefas:
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        logger.info("%d lote(s) de cobrança interrompido(s) no shutdown.", len(tarefas))
+
+
+# ─────────────────────────────────────────────
+# Cobranças adiadas: POST /pagamentos com o Asaas fora do ar grava o
+# Pagamento com cobranca_adiada e responde; este worker cria a cobrança
+# depois. As linhas ficam travadas (FOR UPDATE SKIP LOCKED) durante as
+# chamadas, então dois processos nunca cobram o mesmo pagamento, e a
+# externalReference (= Pagamento.id) acha a cobrança se uma tentativa
+# anterior chegou ao Asaas. Com o disjuntor aberto, nem consulta a fila.
+# ─────────────────────────────────────────────
+def fila_adiadas(limite: int):
+    """Mais antigas primeiro, pelo índice parcial; pula as travadas por outro processo."""
+    return (
+        select(Pagamento, Aluno)
+        .join(Aluno, Aluno.id == Pagamento.aluno_id)
+        .where(Pagamento.cobranca_adiada)
+        .order_by(Pagamento.criado_em)
+        .limit(limite)
+        .with_for_update(of=Pagamento, skip_locked=True)
+    )
+
+
+class WorkerCobrancasAdiadas(WorkerFila):
+    nome = "worker-cobrancas-adiadas"
+
+    def __init__(self, asaas=asaas_service, clientes=clientes_asaas):
+        super().__init__()
+        self.asaas = asaas
+        self.clientes = clientes
+        self.cobradas = 0
+        self.recuperadas = 0
+        self.descartadas = 0
+        self.adiados = 0
+
+    @property
+    def tamanho_lote(self) -> int:
+        return settings.BILLING_RETRY_BATCH_SIZE
+
+    @property
+    def intervalo(self) -> float:
+        return settings.BILLING_RETRY_INTERVAL_SECONDS
+
+    async def _cobrar(self, db: AsyncSession, pagamento: Pagamento, aluno: Aluno) -> str | None:
+        """Id da cobrança no Asaas; None = não há como cobrar (sai da fila)."""
+        existente = await self.asaas.buscar_pagamento_por_referencia(str(pagamento.id))
+        if existente:
+            self.recuperadas += 1
+            return existente["id"]
+        cliente = await self.clientes.resolver(db, aluno)
+        if not cliente:
+            logger.warning(
+                "Cobrança adiada %s descartada: aluno sem CPF, CPF recusado ou sem cliente no Asaas.", pagamento.id
+            )
+            return None
+        # Mesma regra da rota POST /pagamentos quando não há data gravada
+        if pagamento.data_vencimento:
+            vencimento = pagamento.data_vencimento.strftime("%Y-%m-%d")
+        else:
+            vencimento = f"{pagamento.referencia_mes}-28"
+        cobranca = await self.asaas.criar_pagamento(
+            customer_id=cliente,
+            valor=pagamento.valor,
+            vencimento=vencimento,
+            referencia_externa=str(pagamento.id),
+        )
+        if not cobranca.get("id"):
+            logger.warning("Cobrança adiada %s recusada pelo Asaas: %s", pagamento.id, _erro_asaas(cobranca))
+        return cobranca.get("id")
+
+    async def processar_lote(self) -> int:
+        if not self.asaas.integracao.disjuntor.disponivel():
+            self.adiados += 1
+            return 0
+        processados = 0
+        async with AsyncSessionLocal() as db:
+            linhas = (await db.execute(fila_adiadas(self.tamanho_lote))).all()
+            for pagamento, aluno in linhas:
+                try:
+                    asaas_id = await self._cobrar(db, pagamento, aluno)
+                except IntegracaoIndisponivel as e:
+                    # Caiu de novo: o resto do lote espera a próxima rodada
+                    logger.info("Cobranças adiadas: %s; tentando depois.", e)
+                    break
+                except httpx.HTTPStatusError as e:
+                    # 4xx (5xx/429 já viram IntegracaoIndisponivel): repetir não adianta
+                    logger.warning(
+                        "Cobrança adiada %s descartada: Asaas respondeu HTTP %s.",
+                        pagamento.id, e.response.status_code,
+                    )
+                    asaas_id = None
+                except Exception:
+                    logger.exception("Falha na cobrança adiada %s; tentando depois.", pagamento.id)
+                    continue
+                pagamento.asaas_id = asaas_id
+                pagamento.cobranca_adiada = False
+                if asaas_id:
+                    self.cobradas += 1
+                else:
+                    self.descartadas += 1
+                processados += 1
+            await db.commit()
+        return processados
+
+    async def pendentes(self) -> int:
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(
+                select(func.count()).select_from(Pagamento).where(Pagamento.cobranca_adiada)
+            )).scalar_one()
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "cobradas": self.cobradas,
+            "recuperadas_por_referencia": self.recuperadas,
+            "descartadas": self.descartadas,
+            "lotes_adiados_disjuntor": self.adiados,
+        }
+
+
+# Instância usada pelo lifespan da API
+worker_cobrancas_adiadas = WorkerCobrancasAdiadas()
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import AsyncIterator
+
+from sqlalchemy import select, update, func, values, column, String
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from app.config.database import AsyncSessionLocal
+from app.config.settings import settings
+from app.models.models import Pagamento
+from app.services.asaas_service import asaas_service
+from app.services.notificacao_service import worker_notificacoes
+from app.services.pix_service import cache_pix
+from app.services.resumo_financeiro_service import cache_resumo_financeiro
+from app.services.webhook_service import avisar_mudancas_status
+
+# Status da cobrança no Asaas -> status local. Os demais (estornos,
+# chargeback...) não têm equivalente aqui e só aparecem no resumo.
+MAPA_STATUS_ASAAS = {
+    "PENDING": "pendente",
+    "RECEIVED": "pago",
+    "CONFIRMED": "pago",
+    "RECEIVED_IN_CASH": "pago",
+    "OVERDUE": "atraso",
+}
+
+# Máximo aceito pelo Asaas por página
+LIMITE_PAGINA = 100
+
+# Campo de data usado no filtro de período
+CAMPOS_DATA = {"vencimento": "dueDate", "criacao": "dateCreated", "pagamento": "paymentDate"}
+
+
+def filtros_asaas(
+    desde: date | None = None,
+    ate: date | None = None,
+    campo_data: str = "vencimento",
+    status_asaas: str | None = None,
+) -> dict:
+    campo = CAMPOS_DATA[campo_data]
+    filtros = {}
+    if desde:
+        filtros[f"{campo}[ge]"] = desde.isoformat()
+    if ate:
+        filtros[f"{campo}[le]"] = ate.isoformat()
+    if status_asaas:
+        filtros["status"] = status_asaas
+    return filtros
+
+
+# ─────────────────────────────────────────────
+# Conciliação de status com o Asaas
+#   Lê a listagem de cobranças página a página (100 por chamada, a próxima
+#   já pedida enquanto a atual é comparada), compara em memória com as
+#   linhas locais pelo asaas_id e grava as correções em lotes de
+#   RECONCILE_BATCH_SIZE com UPDATE ... FROM (VALUES ...). O UPDATE só
+#   vale se o status local ainda for o que foi comparado: um webhook
+#   aplicado no meio do caminho ganha.
+# ─────────────────────────────────────────────
+class Conciliacao:
+    def __init__(self, filtros: dict, aplicar: bool = True, asaas=asaas_service):
+        self.filtros = filtros
+        self.aplicar = aplicar
+        self.asaas = asaas
+        self.paginas = 0
+        self.remotos = 0
+        self.sem_local = 0
+        self.iguais = 0
+        self.sem_mapeamento: Counter = Counter()
+        self.transicoes: Counter = Counter()
+        self.corrigidos = 0
+        self.alterados_no_meio = 0
+        self.avisos = 0
+
+    async def _paginas(self) -> AsyncIterator[list[dict]]:
+        proxima = asyncio.ensure_future(self.asaas.listar_pagamentos(0, LIMITE_PAGINA, **self.filtros))
+        try:
+            while proxima is not None:
+                pagina = await proxima
+                self.paginas += 1
+                dados = pagina.get("data", [])
+                proxima = None
+                if pagina.get("hasMore") and dados:
+                    offset = pagina.get("offset", 0) + len(dados)
+                    proxima = asyncio.ensure_future(
+                        self.asaas.listar_pagamentos(offset, LIMITE_PAGINA, **self.filtros)
+                    )
+                yield dados
+        finally:
+            if proxima is not None:
+                proxima.cancel()
+
+    async def _comparar(self, db, cobrancas: list[dict]) -> list[tuple]:
+        """(id local, status local visto, status novo) de cada divergência da página."""
+        remotos = {}
+        for cobranca in cobrancas:
+            novo = MAPA_STATUS_ASAAS.get(cobranca.get("status"))
+            if novo is None:
+                self.sem_mapeamento[cobranca.get("status")] += 1
+            else:
+                remotos[cobranca["id"]] = novo
+        if not remotos:
+            return []
+
+        locais = (await db.execute(
+            select(Pagamento.id, Pagamento.asaas_id, Pagamento.status)
+            .where(Pagamento.asaas_id.in_(list(remotos)))
+        )).all()
+        self.sem_local += len(remotos) - len({p.asaas_id for p in locais})
+
+        divergencias = []
+        for pagamento in locais:
+            atual = pagamento.status or "pendente"
+            novo = remotos[pagamento.asaas_id]
+            if atual == novo:
+                self.iguais += 1
+            else:
+                divergencias.append((pagamento.id, atual, novo))
+                self.transicoes[f"{atual}->{novo}"] += 1
+        return divergencias
+
+    async def _gravar(self, db, correcoes: list[tuple]):
+        lista = values(
+            column("id", PG_UUID(as_uuid=True)), column("visto", String), column("novo", String), name="correcoes"
+        ).data(correcoes)
+        atualizados = (await db.execute(
+            update(Pagamento)
+            .where(Pagamento.id == lista.c.id, func.coalesce(Pagamento.status, "pendente") == lista.c.visto)
+            .values(status=lista.c.novo, atualizado_em=datetime.utcnow())
+            .returning(
+                Pagamento.aluno_id,
+                Pagamento.dojo_id,
+                Pagamento.valor,
+                Pagamento.status,
+                Pagamento.asaas_id,
+                Pagamento.data_vencimento,
+            ),
+            execution_options={"synchronize_session": False},
+        )).all()
+        self.avisos += await avisar_mudancas_status(db, atualizados)
+        await db.commit()
+        await cache_pix.invalidar([p.asaas_id for p in atualizados if p.status == "pago"])
+        await cache_resumo_financeiro.invalidar(p.dojo_id for p in atualizados)
+        self.corrigidos += len(atualizados)
+        self.alterados_no_meio += len(correcoes) - len(atualizados)
+
+    async def executar(self) -> dict:
+        inicio = time.perf_counter()
+        pendentes: list[tuple] = []
+        async with AsyncSessionLocal() as db:
+            async for cobrancas in self._paginas():
+                self.remotos += len(cobrancas)
+                pendentes += await self._comparar(db, cobrancas)
+                # Fecha a transação de leitura entre páginas (não segura snapshot)
+                await db.commit()
+                if self.aplicar and len(pendentes) >= settings.RECONCILE_BATCH_SIZE:
+                    await self._gravar(db, pendentes)
+                    pendentes = []
+            if self.aplicar and pendentes:
+                await self._gravar(db, pendentes)
+        if self.avisos:
+            worker_notificacoes.acordar()
+
+        return {
+            "filtros": self.filtros,
+            "aplicado": self.aplicar,
+            "chamadas_asaas": self.paginas,
+            "cobrancas_no_asaas": self.remotos,
+            "sem_pagamento_local": self.sem_local,
+            "iguais": self.iguais,
+            "divergentes": sum(self.transicoes.values()),
+            "corrigidos": self.corrigidos,
+            "alterados_no_meio": self.alterados_no_meio,
+            "transicoes": dict(self.transicoes),
+            "status_sem_mapeamento": dict(self.sem_mapeamento),
+            "avisos_enfileirados": self.avisos,
+            "duracao_s": round(time.perf_counter() - inicio, 2),
+        }
@@ -0,0 +1,234 @@
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import select, func, and_, bindparam, literal, Integer, Float, cast, extract
+from sqlalchemy.dialects.postgresql import insert as pg_insert, UUID as PG_UUID, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Aluno, Presenca, PresencaDiaDojo, PresencaSemanaAluno
+
+DIAS_SEMANA = ["segunda", "terça", "quarta", "quinta", "sexta", "sábado", "domingo"]
+
+
+def hoje() -> date:
+    # Presenças são gravadas em UTC (datetime.utcnow)
+    return datetime.utcnow().date()
+
+
+def inicio_semana(dia: date) -> date:
+    return dia - timedelta(days=dia.weekday())
+
+
+# ─────────────────────────────────────────────
+# Manutenção incremental (chamada pelo presenca_service na mesma transação)
+# ─────────────────────────────────────────────
+async def atualizar_rollups(
+    db: AsyncSession,
+    dojo_id: UUID,
+    data: datetime,
+    deltas: dict,
+    inseridos: int,
+):
+    """
+    deltas: variação de presentes por aluno; inseridos: linhas novas em presencas.
+    Um upsert na linha do dia do dojo e um na semana de cada aluno.
+    """
+    dia = data.date()
+    presentes = sum(deltas.values())
+    if presentes or inseridos:
+        stmt = pg_insert(PresencaDiaDojo).values(
+            dojo_id=dojo_id, dia=dia, presentes=presentes, registros=inseridos
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dojo_id", "dia"],
+            set_={
+                "presentes": PresencaDiaDojo.presentes + stmt.excluded.presentes,
+                "registros": PresencaDiaDojo.registros + stmt.excluded.registros,
+            },
+        )
+        await db.execute(stmt)
+
+    deltas = {aluno_id: delta for aluno_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    ids = sorted(deltas)
+    lista = func.unnest(
+        bindparam("semana_alunos", ids, type_=ARRAY(PG_UUID(as_uuid=True))),
+        bindparam("semana_deltas", [deltas[aluno_id] for aluno_id in ids], type_=ARRAY(Integer)),
+    ).table_valued("aluno_id", "delta").render_derived(name="deltas")
+
+    stmt = pg_insert(PresencaSemanaAluno).from_select(
+        ["aluno_id", "semana", "dojo_id", "presentes"],
+        select(
+            lista.c.aluno_id,
+            literal(inicio_semana(dia), PresencaSemanaAluno.semana.type),
+            literal(dojo_id, PG_UUID(as_uuid=True)),
+            lista.c.delta,
+        ),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["aluno_id", "semana"],
+        set_={"presentes": PresencaSemanaAluno.presentes + stmt.excluded.presentes},
+    )
+    await db.execute(stmt)
+
+
+async def recalcular_rollups(db: AsyncSession, dojo_id: UUID | None = None) -> tuple[int, int]:
+    """Reconstrói os rollups a partir das presenças brutas."""
+    apagar_dias = PresencaDiaDojo.__table__.delete()
+    apagar_semanas = PresencaSemanaAluno.__table__.delete()
+    por_dia = (
+        select(
+            Presenca.dojo_id,
+            Presenca.dia,
+            func.count().filter(Presenca.presente == True),
+            func.count(),
+        )
+        .group_by(Presenca.dojo_id, Presenca.dia)
+    )
+    semana = cast(func.date_trunc("week", Presenca.dia), PresencaSemanaAluno.semana.type)
+    por_semana = (
+        select(Presenca.aluno_id, semana, Aluno.dojo_id, func.count())
+        .join(Aluno, Aluno.id == Presenca.aluno_id)
+        .where(Presenca.presente == True)
+        .group_by(Presenca.aluno_id, semana, Aluno.dojo_id)
+    )
+    if dojo_id is not None:
+        apagar_dias = apagar_dias.where(PresencaDiaDojo.dojo_id == dojo_id)
+        apagar_semanas = apagar_semanas.where(PresencaSemanaAluno.dojo_id == dojo_id)
+        por_dia = por_dia.where(Presenca.dojo_id == dojo_id)
+        por_semana = por_semana.where(Aluno.dojo_id == dojo_id)
+
+    await db.execute(apagar_dias)
+    await db.execute(apagar_semanas)
+
+    dias = await db.execute(
+        pg_insert(PresencaDiaDojo).from_select(["dojo_id", "dia", "presentes", "registros"], por_dia),
+        execution_options={"preserve_rowcount": True},
+    )
+    semanas = await db.execute(
+        pg_insert(PresencaSemanaAluno).from_select(["aluno_id", "semana", "dojo_id", "presentes"], por_semana),
+        execution_options={"preserve_rowcount": True},
+    )
+    return dias.rowcount, semanas.rowcount
+
+
+# ─────────────────────────────────────────────
+# Leituras do dashboard: só os rollups, nunca a tabela presencas
+# ─────────────────────────────────────────────
+async def aulas_do_dojo(db: AsyncSession, dojo_id: UUID, desde: date) -> int:
+    """Aulas dadas = dias com pelo menos um presente."""
+    result = await db.execute(
+        select(func.count()).where(
+            PresencaDiaDojo.dojo_id == dojo_id,
+            PresencaDiaDojo.dia >= desde,
+            PresencaDiaDojo.presentes > 0,
+        )
+    )
+    return result.scalar()
+
+
+def consulta_presencas_30dias(aluno_id, desde: date):
+    """
+    Presenças do aluno a partir de `desde` direto em presencas: o rollup é
+    semanal e não fecha 30 dias. Faixa de no máximo ~30 linhas no índice
+    único (aluno_id, dia).
+    """
+    return select(func.count()).where(
+        Presenca.aluno_id == aluno_id,
+        Presenca.dia >= desde,
+        Presenca.presente.is_(True),
+    )
+
+
+async def resumo_aluno(db: AsyncSession, dojo_id: UUID, aluno_id, semanas: int = 4) -> dict:
+    desde = inicio_semana(hoje()) - timedelta(weeks=semanas - 1)
+    result = await db.execute(
+        select(func.coalesce(func.sum(PresencaSemanaAluno.presentes), 0)).where(
+            PresencaSemanaAluno.aluno_id == aluno_id,
+            PresencaSemanaAluno.semana >= desde,
+        )
+    )
+    presentes = result.scalar()
+    aulas = await aulas_do_dojo(db, dojo_id, desde)
+    # Campo antigo, com o significado antigo (últimos 30 dias), enquanto os
+    # clientes migram para total_presencas (janela de semanas)
+    presentes_30dias = (await db.execute(consulta_presencas_30dias(aluno_id, hoje() - timedelta(days=30)))).scalar()
+    return {
+        "desde": desde,
+        "total_presencas": presentes,
+        "total_presencas_30dias": presentes_30dias,
+        "aulas_esperadas": aulas,
+        "porcentagem_frequencia": round(min(presentes / aulas * 100, 100), 1) if aulas else 0,
+    }
+
+
+async def frequencia_alunos(db: AsyncSession, dojo_id: UUID, semanas: int) -> dict:
+    desde = inicio_semana(hoje()) - timedelta(weeks=semanas - 1)
+    aulas = await aulas_do_dojo(db, dojo_id, desde)
+
+    presentes = func.coalesce(func.sum(PresencaSemanaAluno.presentes), 0)
+    result = await db.execute(
+        select(Aluno.id, Aluno.nome, presentes.label("presentes"))
+        .outerjoin(
+            PresencaSemanaAluno,
+            and_(PresencaSemanaAluno.aluno_id == Aluno.id, PresencaSemanaAluno.semana >= desde),
+        )
+        .where(Aluno.dojo_id == dojo_id, Aluno.ativo == True)
+        .group_by(Aluno.id, Aluno.nome)
+        .order_by(presentes.desc(), Aluno.nome)
+    )
+    return {
+        "desde": desde,
+        "aulas_dadas": aulas,
+        "alunos": [
+            {
+                "aluno_id": row.id,
+                "nome": row.nome,
+                "presentes": row.presentes,
+                "porcentagem_frequencia": round(min(row.presentes / aulas * 100, 100), 1) if aulas else 0,
+            }
+            for row in result
+        ],
+    }
+
+
+async def tendencia_turma(db: AsyncSession, dojo_id: UUID, dias: int) -> list[dict]:
+    desde = hoje() - timedelta(days=dias - 1)
+    result = await db.execute(
+        select(PresencaDiaDojo.dia, PresencaDiaDojo.presentes, PresencaDiaDojo.registros)
+        .where(PresencaDiaDojo.dojo_id == dojo_id, PresencaDiaDojo.dia >= desde)
+        .order_by(PresencaDiaDojo.dia)
+    )
+    return [{"dia": row.dia, "presentes": row.presentes, "registros": row.registros} for row in result]
+
+
+async def dias_mais_cheios(db: AsyncSession, dojo_id: UUID, semanas: int) -> list[dict]:
+    desde = hoje() - timedelta(weeks=semanas)
+    dia_semana = extract("isodow", PresencaDiaDojo.dia)
+    media = cast(func.avg(PresencaDiaDojo.presentes), Float)
+    result = await db.execute(
+        select(
+            dia_semana.label("dia_semana"),
+            func.count().label("aulas"),
+            func.sum(PresencaDiaDojo.presentes).label("presentes"),
+            media.label("media"),
+        )
+        .where(
+            PresencaDiaDojo.dojo_id == dojo_id,
+            PresencaDiaDojo.dia >= desde,
+            PresencaDiaDojo.presentes > 0,
+        )
+        .group_by(dia_semana)
+        .order_by(media.desc())
+    )
+    return [
+        {
+            "dia_semana": DIAS_SEMANA[int(row.dia_semana) - 1],
+            "aulas": row.aulas,
+            "presentes": row.presentes,
+            "media_presentes": round(row.media, 1),
+        }
+        for row in result
+    ]
@@ -1,5 +1,11 @@
-﻿import httpx
-from app.config.settings import settings
+﻿from app.config.settings import settings
+from app.config.http_clientes import ClienteHTTP
+from app.services.resiliencia import Integracao
+
+# Tempo máximo por endpoint (RESILIENCE_TIMEOUTS sobrescreve)
+LIMITES_EVOLUTION = {
+    "mensagens.enviar": 10.0,
+}
 
 
 class EvolutionService:
@@ -14,14 +20,21 @@ class EvolutionService:
             "apikey": settings.EVOLUTION_API_KEY,
             "Content-Type": "application/json",
         }
+        # Um cliente por instância, reaproveitado entre chamadas (ver app/config/http_clientes.py)
+        self.http = ClienteHTTP("evolution", self.base_url, self.headers)
+        self.integracao = Integracao("evolution", LIMITES_EVOLUTION, settings.EVOLUTION_MAX_CONCURRENCY)
 
-    async def enviar_mensagem(self, numero: str, mensagem: str, instancia: str = "budomanager") -> dict:
+    async def enviar_mensagem(self, numero: str, mensagem: str, instancia: str | None = None) -> dict:
         """
         Envia uma mensagem de texto via WhatsApp.
         - numero: número do aluno no formato 55XXXXXXXXXXXX (com código do país)
         - mensagem: texto da mensagem
-        - instancia: nome da instância Evolution configurada
+        - instancia: nome da instância Evolution configurada (padrão: EVOLUTION_INSTANCE)
+        Levanta httpx.HTTPError se a Evolution recusar, ou IntegracaoIndisponivel
+        se não atender; as rotas não chamam isto direto, e sim a outbox (ver
+        notificacao_service).
         """
+        instancia = instancia or settings.EVOLUTION_INSTANCE
         # Normaliza o número (remove caracteres não numéricos)
         numero_limpo = "".join(filter(str.isdigit, numero))
         if not numero_limpo.startswith("55"):
@@ -32,12 +45,11 @@ class EvolutionService:
             "message": mensagem,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/message/sendText/{instancia}",
-                json=payload,
-                headers=self.headers,
-            )
+        response = await self.integracao.chamar(
+            "mensagens.enviar",
+            lambda: self.http.client.post(f"/message/sendText/{instancia}", json=payload),
+        )
+        response.raise_for_status()
         return response.json()
 
     # ─────────────────────────────────────────
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# Laço comum dos workers de fila em tabela (outbox, webhooks...)
+#   Subclasses implementam processar_lote() e dizem o tamanho do lote e o
+#   intervalo de espera; lote cheio emenda o próximo sem esperar. Faltou
+#   um dos três? A subclasse nem instancia (TypeError na criação).
+# ─────────────────────────────────────────────
+class WorkerFila(ABC):
+    nome = "worker"
+
+    def __init__(self):
+        self._parar = asyncio.Event()
+        self._acordar = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.lotes = 0
+        self.ultimo_lote_em: datetime | None = None
+
+    @property
+    @abstractmethod
+    def tamanho_lote(self) -> int:
+        ...
+
+    @property
+    @abstractmethod
+    def intervalo(self) -> float:
+        ...
+
+    @abstractmethod
+    async def processar_lote(self) -> int:
+        """Processa até tamanho_lote itens e devolve quantos pegou."""
+
+    async def _rodar_lote(self) -> int:
+        processados = await self.processar_lote()
+        if processados:
+            self.lotes += 1
+            self.ultimo_lote_em = datetime.utcnow()
+        return processados
+
+    async def rodar(self):
+        while not self._parar.is_set():
+            try:
+                processados = await self._rodar_lote()
+            except Exception:
+                logger.exception("Falha no %s; tentando de novo.", self.nome)
+                processados = 0
+            if processados < self.tamanho_lote:
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), timeout=self.intervalo)
+                except asyncio.TimeoutError:
+                    pass
+                self._acordar.clear()
+
+    def acordar(self):
+        """Chegou trabalho novo neste processo: não espera o intervalo."""
+        self._acordar.set()
+
+    def iniciar(self):
+        self._parar.clear()
+        self._task = asyncio.create_task(self.rodar(), name=self.nome)
+
+    async def parar(self):
+        """Termina o lote em andamento e sai."""
+        self._parar.set()
+        self._acordar.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "rodando": self._task is not None and not self._task.done(),
+            "lotes": self.lotes,
+            "ultimo_lote_em": self.ultimo_lote_em,
+        }
@@ -1,26 +1,226 @@
+from datetime import datetime
+from uuid import UUID
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.models.models import Aluno, Presenca, Graduacao
+from sqlalchemy import select, func, and_, or_, true, literal, cast, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
+from app.models.models import Aluno, Presenca, Graduacao, ContadorPresenca, HistoricoGraduacao
+
+# Meta quando a próxima faixa não define aulas_necessarias (ou não existe)
+META_PADRAO = 24
+
+
+def data_ultima_graduacao(aluno_id):
+    """Subquery escalar: data da última graduação do aluno (índice aluno_id, data; LIMIT 1)."""
+    return (
+        select(HistoricoGraduacao.data)
+        .where(HistoricoGraduacao.aluno_id == aluno_id)
+        .order_by(HistoricoGraduacao.data.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def consulta_progresso():
+    """
+    SELECT do progresso por aluno: contador desde a última graduação +
+    meta da próxima faixa (menor ordem acima da atual, no mesmo dojo).
+    Percentual e pronto_para_exame já saem calculados do banco.
+    Quem chama filtra (um aluno, um dojo...).
+    """
+    atual = aliased(Graduacao)
+    proxima = (
+        select(Graduacao.id, Graduacao.nome, Graduacao.aulas_necessarias)
+        .where(
+            Graduacao.dojo_id == Aluno.dojo_id,
+            Graduacao.ordem > func.coalesce(atual.ordem, -1),
+        )
+        .order_by(Graduacao.ordem)
+        .limit(1)
+        .lateral("proxima")
+    )
+    total = func.coalesce(ContadorPresenca.aulas_desde_graduacao, 0)
+    meta = func.coalesce(func.nullif(proxima.c.aulas_necessarias, 0), META_PADRAO)
+    return (
+        select(
+            Aluno.id.label("aluno_id"),
+            Aluno.nome,
+            func.coalesce(atual.nome, Aluno.faixa_atual).label("faixa_nome"),
+            total.label("total_aulas"),
+            meta.label("meta_aulas"),
+            cast(func.least(total * 100.0 / meta, 100), Float).label("progresso_percentual"),
+            (total >= meta).label("pronto_para_exame"),
+            data_ultima_graduacao(Aluno.id).label("ultima_graduacao"),
+            proxima.c.id.label("proxima_graduacao_id"),
+            proxima.c.nome.label("proxima_graduacao"),
+        )
+        .select_from(Aluno)
+        .outerjoin(ContadorPresenca, ContadorPresenca.aluno_id == Aluno.id)
+        .outerjoin(atual, atual.id == Aluno.graduacao_id)
+        .outerjoin(proxima, true())
+    )
+
+
+def _progresso(row) -> dict:
+    return {
+        "total_aulas": row.total_aulas,
+        "meta_aulas": row.meta_aulas,
+        "ultima_graduacao": row.ultima_graduacao,
+        "proxima_graduacao": row.proxima_graduacao,
+        "progresso_percentual": row.progresso_percentual,
+        "pronto_para_exame": row.pronto_para_exame,
+    }
+
 
 async def calcular_progresso_aluno(aluno_id: str, db: AsyncSession):
-    # 1. Buscar o aluno e sua graduao atual
-    aluno = await db.get(Aluno, aluno_id)
+    # Leitura O(1): contador mantido a cada presença (ver presenca_service)
+    result = await db.execute(consulta_progresso().where(Aluno.id == aluno_id))
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return _progresso(row)
+
+
+async def listar_progresso_dojo(
+    db: AsyncSession,
+    dojo_id: UUID,
+    ordenar: str = "progresso",
+    crescente: bool = False,
+    somente_prontos: bool = False,
+) -> list:
+    """Progresso de todos os alunos ativos do dojo numa única consulta (ordenada e filtrada no banco)."""
+    progresso = consulta_progresso().where(Aluno.dojo_id == dojo_id, Aluno.ativo == True).subquery()
+
+    chave = {
+        "progresso": progresso.c.progresso_percentual,
+        "aulas": progresso.c.total_aulas,
+        "nome": progresso.c.nome,
+    }[ordenar]
+    stmt = select(progresso).order_by(
+        chave.asc() if crescente else chave.desc(),
+        progresso.c.nome,
+        progresso.c.aluno_id,
+    )
+    if somente_prontos:
+        stmt = stmt.where(progresso.c.pronto_para_exame)
+
+    result = await db.execute(stmt)
+    return result.all()
 
-    # 2. Contar presenas desde a ltima graduao ou desde o incio
+
+async def contar_aulas_desde_graduacao(db: AsyncSession, aluno_id) -> int:
+    """Conta direto nas presenças, só a partir da última graduação (range scan em aluno_id, data)."""
+    desde = func.coalesce(data_ultima_graduacao(aluno_id), literal(datetime.min, Presenca.data.type))
     result = await db.execute(
+        select(func.count(Presenca.id)).where(
+            Presenca.aluno_id == aluno_id,
+            Presenca.data >= desde,
+            Presenca.presente == True,
+        )
+    )
+    return result.scalar()
+
+
+# ─────────────────────────────────────────────
+# Graduação: histórico + faixa atual + contador, na mesma transação
+# ─────────────────────────────────────────────
+async def registrar_graduacao(
+    db: AsyncSession,
+    aluno: Aluno,
+    graduacao: Graduacao,
+    registrado_por: UUID | None = None,
+    data: datetime | None = None,
+) -> HistoricoGraduacao:
+    """Não faz commit: quem chama confirma tudo junto (ou nada)."""
+    data = data or datetime.utcnow()
+    historico = HistoricoGraduacao(
+        aluno_id=aluno.id,
+        dojo_id=aluno.dojo_id,
+        graduacao_id=graduacao.id,
+        graduacao_anterior_id=aluno.graduacao_id,
+        data=data,
+        registrado_por=registrado_por,
+    )
+    db.add(historico)
+
+    aluno.graduacao_id = graduacao.id
+    aluno.faixa_atual = graduacao.nome
+    await db.flush()
+
+    await reiniciar_contador(db, aluno.id, aluno.dojo_id, data)
+    return historico
+
+
+# ─────────────────────────────────────────────
+# Manutenção dos contadores de aulas desde a graduação
+# ─────────────────────────────────────────────
+async def reiniciar_contador(db: AsyncSession, aluno_id: UUID, dojo_id: UUID, desde: datetime):
+    """Nova graduação: a contagem recomeça em `desde` (range scan no índice aluno_id, data)."""
+    aulas = (
         select(func.count(Presenca.id))
-        .where(Presenca.aluno_id == aluno_id)
-        .where(Presenca.presente == True)
-        # Idealmente filtrar por data > data_ultima_graduacao
+        .where(Presenca.aluno_id == aluno_id, Presenca.data >= desde, Presenca.presente == True)
+        .scalar_subquery()
     )
-    total_aulas = result.scalar()
+    stmt = pg_insert(ContadorPresenca).values(
+        aluno_id=aluno_id,
+        dojo_id=dojo_id,
+        aulas_desde_graduacao=aulas,
+        desde=desde,
+        atualizado_em=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["aluno_id"],
+        set_={
+            "aulas_desde_graduacao": stmt.excluded.aulas_desde_graduacao,
+            "desde": stmt.excluded.desde,
+            "atualizado_em": stmt.excluded.atualizado_em,
+        },
+    )
+    await db.execute(stmt)
 
-    # 3. Lgica de Gamificao: Definir meta (ex: 24 aulas para a prxima faixa)
-    meta_aulas = 24
-    progresso = (total_aulas / meta_aulas) * 100
 
-    return {
-        "total_aulas": total_aulas,
-        "progresso_percentual": min(progresso, 100),
-        "pronto_para_exame": total_aulas >= meta_aulas
-    }
\ No newline at end of file
+async def recalcular_contadores(db: AsyncSession, dojo_id: UUID | None = None) -> int:
+    """Recalcula os contadores a partir das presenças brutas, ancorados no histórico de graduações."""
+    ultima = (
+        select(HistoricoGraduacao.data.label("desde"))
+        .where(HistoricoGraduacao.aluno_id == Aluno.id)
+        .order_by(HistoricoGraduacao.data.desc())
+        .limit(1)
+        .lateral("ultima")
+    )
+    contagem = (
+        select(
+            Aluno.id,
+            Aluno.dojo_id,
+            ultima.c.desde,
+            func.count(Presenca.id).filter(Presenca.presente == True),
+            literal(datetime.utcnow(), ContadorPresenca.atualizado_em.type),
+        )
+        .select_from(Aluno)
+        .outerjoin(ultima, true())
+        .outerjoin(
+            Presenca,
+            and_(
+                Presenca.aluno_id == Aluno.id,
+                or_(ultima.c.desde.is_(None), Presenca.data >= ultima.c.desde),
+            ),
+        )
+        .group_by(Aluno.id, Aluno.dojo_id, ultima.c.desde)
+    )
+    if dojo_id is not None:
+        contagem = contagem.where(Aluno.dojo_id == dojo_id)
+
+    stmt = pg_insert(ContadorPresenca).from_select(
+        ["aluno_id", "dojo_id", "desde", "aulas_desde_graduacao", "atualizado_em"], contagem
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["aluno_id"],
+        set_={
+            "desde": stmt.excluded.desde,
+            "aulas_desde_graduacao": stmt.excluded.aulas_desde_graduacao,
+            "atualizado_em": stmt.excluded.atualizado_em,
+        },
+    )
+    result = await db.execute(stmt, execution_options={"preserve_rowcount": True})
+    return result.rowcount
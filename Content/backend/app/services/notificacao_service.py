@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import select, update, bindparam, func, String, Text, DateTime
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import AsyncSessionLocal
+from app.config.settings import settings
+from app.models.models import NotificacaoOutbox
+from app.services.evolution_service import evolution_service
+from app.services.fila_worker import WorkerFila
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# Escrita: mesma transação da mudança de negócio
+# ─────────────────────────────────────────────
+def enfileirar_whatsapp(
+    db: AsyncSession,
+    telefone: str | None,
+    mensagem: str,
+    dojo_id: UUID | None = None,
+    instancia: str | None = None,
+) -> NotificacaoOutbox | None:
+    """
+    Grava a mensagem na outbox; sai junto com o commit de quem chamou (ou
+    some junto com o rollback). O envio fica com o WorkerNotificacoes.
+    """
+    if not telefone:
+        return None
+    notificacao = NotificacaoOutbox(
+        dojo_id=dojo_id,
+        canal="whatsapp",
+        instancia=instancia or settings.EVOLUTION_INSTANCE,
+        destino=telefone,
+        mensagem=mensagem,
+        status="pendente",
+        tentativas=0,
+        disponivel_em=datetime.utcnow(),
+    )
+    db.add(notificacao)
+    return notificacao
+
+
+# ─────────────────────────────────────────────
+# Limite de taxa por instância da Evolution (token bucket)
+# ─────────────────────────────────────────────
+class LimiteTaxa:
+    def __init__(self, por_segundo: float, rajada: int):
+        self.por_segundo = por_segundo
+        self.rajada = max(rajada, 1)
+        self.tokens = float(self.rajada)
+        self.atualizado = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def aguardar(self):
+        if self.por_segundo <= 0:
+            return
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self.tokens = min(self.rajada, self.tokens + (agora - self.atualizado) * self.por_segundo)
+                self.atualizado = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.por_segundo)
+
+
+def lease() -> float:
+    """Reserva longa o bastante para um lote inteiro passar pelo limite de taxa."""
+    taxa = settings.WHATSAPP_RATE_PER_SECOND
+    drenagem = settings.OUTBOX_BATCH_SIZE / taxa if taxa > 0 else 0
+    return settings.OUTBOX_LEASE_SECONDS + drenagem
+
+
+def backoff(tentativas: int) -> float:
+    """Exponencial com jitter: base, 2x base, 4x base... até o teto."""
+    atraso = min(
+        settings.OUTBOX_BACKOFF_BASE_SECONDS * 2 ** max(tentativas - 1, 0),
+        settings.OUTBOX_BACKOFF_MAX_SECONDS,
+    )
+    return atraso * random.uniform(0.8, 1.2)
+
+
+# ─────────────────────────────────────────────
+# Worker: reserva um lote (FOR UPDATE SKIP LOCKED), envia fora da
+# transação e registra o resultado. Entrega "ao menos uma vez": se o
+# processo cair no meio do envio, a reserva expira e a linha volta à fila.
+# ─────────────────────────────────────────────
+class WorkerNotificacoes(WorkerFila):
+    nome = "worker-notificacoes"
+
+    def __init__(self, enviar=None):
+        super().__init__()
+        self.enviar = enviar or evolution_service.enviar_mensagem
+        # Com a Evolution fora (disjuntor aberto), nem reserva: não gasta tentativas
+        self.integracao = None if enviar else evolution_service.integracao
+        self.adiados = 0
+        self.limites: dict[str, LimiteTaxa] = {}
+        self.enviadas = 0
+        self.falhas = 0
+        self.descartadas = 0
+
+    @property
+    def tamanho_lote(self) -> int:
+        return settings.OUTBOX_BATCH_SIZE
+
+    @property
+    def intervalo(self) -> float:
+        return settings.OUTBOX_POLL_INTERVAL_SECONDS
+
+    def _limite(self, instancia: str) -> LimiteTaxa:
+        if instancia not in self.limites:
+            self.limites[instancia] = LimiteTaxa(settings.WHATSAPP_RATE_PER_SECOND, settings.WHATSAPP_RATE_BURST)
+        return self.limites[instancia]
+
+    async def reservar_lote(self) -> list:
+        """
+        Transação curta: trava as próximas pendentes sem esperar por outros
+        workers e empurra disponivel_em para frente (lease) antes do envio.
+        """
+        agora = datetime.utcnow()
+        fila = (
+            select(NotificacaoOutbox.id)
+            .where(NotificacaoOutbox.status == "pendente", NotificacaoOutbox.disponivel_em <= agora)
+            .order_by(NotificacaoOutbox.disponivel_em)
+            .limit(settings.OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(NotificacaoOutbox)
+                .where(NotificacaoOutbox.id.in_(fila.scalar_subquery()))
+                .values(
+                    tentativas=NotificacaoOutbox.tentativas + 1,
+                    disponivel_em=agora + timedelta(seconds=lease()),
+                )
+                .returning(
+                    NotificacaoOutbox.id,
+                    NotificacaoOutbox.instancia,
+                    NotificacaoOutbox.destino,
+                    NotificacaoOutbox.mensagem,
+                    NotificacaoOutbox.tentativas,
+                ),
+                execution_options={"synchronize_session": False},
+            )
+            itens = result.all()
+            await db.commit()
+        return itens
+
+    async def _enviar(self, item) -> str | None:
+        await self._limite(item.instancia).aguardar()
+        try:
+            await self.enviar(item.destino, item.mensagem, item.instancia)
+            return None
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"[:500]
+
+    async def _registrar(self, itens: list, erros: list):
+        agora = datetime.utcnow()
+        enviadas = [item.id for item, erro in zip(itens, erros) if erro is None]
+        falhas = [(item, erro) for item, erro in zip(itens, erros) if erro is not None]
+
+        async with AsyncSessionLocal() as db:
+            if enviadas:
+                await db.execute(
+                    update(NotificacaoOutbox)
+                    .where(NotificacaoOutbox.id.in_(enviadas))
+                    .values(status="enviada", enviado_em=agora, ultimo_erro=None),
+                    execution_options={"synchronize_session": False},
+                )
+            if falhas:
+                # Um UPDATE ... FROM unnest(...) para todas as falhas do lote
+                lista = func.unnest(
+                    bindparam("falha_ids", [item.id for item, _ in falhas], type_=ARRAY(PG_UUID(as_uuid=True))),
+                    bindparam("falha_status", [
+                        "falhou" if item.tentativas >= settings.OUTBOX_MAX_ATTEMPTS else "pendente"
+                        for item, _ in falhas
+                    ], type_=ARRAY(String)),
+                    bindparam("falha_disponivel", [
+                        agora + timedelta(seconds=backoff(item.tentativas)) for item, _ in falhas
+                    ], type_=ARRAY(DateTime)),
+                    bindparam("falha_erros", [erro for _, erro in falhas], type_=ARRAY(Text)),
+                ).table_valued("id", "status", "disponivel_em", "erro").render_derived(name="falhas")
+                await db.execute(
+                    update(NotificacaoOutbox)
+                    .where(NotificacaoOutbox.id == lista.c.id)
+                    .values(status=lista.c.status, disponivel_em=lista.c.disponivel_em, ultimo_erro=lista.c.erro),
+                    execution_options={"synchronize_session": False},
+                )
+            await db.commit()
+
+        descartadas = sum(1 for item, _ in falhas if item.tentativas >= settings.OUTBOX_MAX_ATTEMPTS)
+        self.enviadas += len(enviadas)
+        self.falhas += len(falhas)
+        self.descartadas += descartadas
+        if descartadas:
+            logger.error("%d notificação(ões) desistidas após %d tentativas.", descartadas, settings.OUTBOX_MAX_ATTEMPTS)
+
+    async def processar_lote(self) -> int:
+        if self.integracao is not None and not self.integracao.disjuntor.disponivel():
+            self.adiados += 1
+            return 0
+        itens = await self.reservar_lote()
+        if not itens:
+            return 0
+        erros = await asyncio.gather(*[self._enviar(item) for item in itens])
+        await self._registrar(itens, erros)
+        return len(itens)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "enviadas": self.enviadas,
+            "falhas": self.falhas,
+            "descartadas": self.descartadas,
+            "lotes_adiados_disjuntor": self.adiados,
+        }
+
+
+# Instância usada pelo lifespan da API
+worker_notificacoes = WorkerNotificacoes()
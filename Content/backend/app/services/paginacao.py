@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import datetime, date
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+
+# ─────────────────────────────────────────────
+# Cursor opaco: base64 dos valores das chaves de ordenação
+# do último item da página
+# ─────────────────────────────────────────────
+def _serializar(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, UUID):
+        return str(valor)
+    return valor
+
+
+def _desserializar(valor, coluna):
+    if valor is None:
+        return None
+    tipo = coluna.type.python_type
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    if tipo is UUID:
+        return UUID(valor)
+    return tipo(valor)
+
+
+def encode_cursor(valores: list) -> str:
+    bruto = json.dumps([_serializar(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, chaves: list) -> list:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(bruto)
+        if not isinstance(valores, list) or len(valores) != len(chaves):
+            raise ValueError
+        return [_desserializar(v, coluna) for v, (coluna, _) in zip(valores, chaves)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+
+
+def _depois_do_cursor(chaves: list, valores: list):
+    """
+    Condição "vem depois do cursor" na ordem das chaves.
+    Mesma direção em todas as chaves vira comparação de tupla (usa o índice
+    composto direto); direções mistas viram a expansão OR equivalente.
+    """
+    direcoes = {desc for _, desc in chaves}
+    colunas = [coluna for coluna, _ in chaves]
+
+    if len(direcoes) == 1:
+        if direcoes.pop():
+            return tuple_(*colunas) < tuple_(*valores)
+        return tuple_(*colunas) > tuple_(*valores)
+
+    # literal() tipado: comparar colunas booleanas com True/False cru não é aceito
+    valores = [literal(v, coluna.type) for v, coluna in zip(valores, colunas)]
+    condicoes = []
+    for i, (coluna, desc) in enumerate(chaves):
+        iguais = [colunas[j] == valores[j] for j in range(i)]
+        passo = coluna < valores[i] if desc else coluna > valores[i]
+        condicoes.append(and_(*iguais, passo))
+    return or_(*condicoes)
+
+
+def consulta_keyset(stmt, chaves: list, limit: int, cursor: str | None = None):
+    """Aplica cursor, ORDER BY e LIMIT (limit + 1, para saber se há próxima página)."""
+    if cursor:
+        stmt = stmt.where(_depois_do_cursor(chaves, decode_cursor(cursor, chaves)))
+    ordem = [coluna.desc() if desc else coluna.asc() for coluna, desc in chaves]
+    return stmt.order_by(*ordem).limit(limit + 1)
+
+
+async def paginar(
+    db: AsyncSession,
+    stmt,
+    chaves: list,
+    limit: int = LIMITE_PADRAO,
+    cursor: str | None = None,
+) -> dict:
+    """
+    Paginação keyset. `chaves` é a ordenação completa (deve terminar numa
+    coluna única, ex: id) como lista de (coluna, desc).
+    Retorna {"items": [...], "next_cursor": str | None}.
+    """
+    result = await db.execute(consulta_keyset(stmt, chaves, limit, cursor))
+    items = list(result.scalars().all())
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        ultimo = items[-1]
+        next_cursor = encode_cursor([getattr(ultimo, coluna.key) for coluna, _ in chaves])
+
+    return {"items": items, "next_cursor": next_cursor}
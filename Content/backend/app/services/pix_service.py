@@ -0,0 +1,114 @@
+import json
+import logging
+from datetime import datetime
+
+from app.config.redis_cliente import redis_cliente
+from app.config.settings import settings
+from app.services.asaas_service import AsaasService, asaas_service
+from app.services.cache import TTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_REDIS = "pix:"
+
+
+def _ttl(pix: dict) -> float:
+    """PIX_CACHE_TTL_SECONDS, encurtado se o QR Code expira antes."""
+    ttl = settings.PIX_CACHE_TTL_SECONDS
+    try:
+        expira = datetime.strptime(pix.get("expirationDate") or "", "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return ttl
+    return max(0.0, min(ttl, (expira - datetime.now()).total_seconds()))
+
+
+# ─────────────────────────────────────────────
+# Cache do QR Code PIX por cobrança (chave: Pagamento.asaas_id)
+#   Com REDIS_URL, o cache é o Redis (vale para todos os processos e o
+#   webhook invalida em qualquer um); sem, é um TTLCache por processo.
+#   Se o Redis falhar, usa o TTLCache do processo até ele voltar.
+#   Misses simultâneos da mesma cobrança fazem uma só chamada.
+# ─────────────────────────────────────────────
+class CachePix:
+    def __init__(self, asaas: AsaasService):
+        self.asaas = asaas
+        self.local = TTLCache(maxsize=settings.PIX_CACHE_MAX_SIZE, ttl=settings.PIX_CACHE_TTL_SECONDS)
+        self.em_voo = SingleFlight()
+        self.hits_redis = 0
+        self.misses_redis = 0
+        self.erros_redis = 0
+        self.chamadas_asaas = 0
+        self.invalidacoes = 0
+
+    async def _ler(self, asaas_id: str) -> dict | None:
+        redis = redis_cliente()
+        if redis is None:
+            return self.local.get(asaas_id)
+        try:
+            valor = await redis.get(PREFIXO_REDIS + asaas_id)
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Redis indisponível no cache PIX: %s", e)
+            return self.local.get(asaas_id)
+        if valor is None:
+            self.misses_redis += 1
+            return None
+        self.hits_redis += 1
+        return json.loads(valor)
+
+    async def _gravar(self, asaas_id: str, pix: dict):
+        ttl = _ttl(pix)
+        if ttl <= 0:
+            return
+        redis = redis_cliente()
+        if redis is None:
+            self.local.set(asaas_id, pix, ttl=ttl)
+            return
+        try:
+            await redis.set(PREFIXO_REDIS + asaas_id, json.dumps(pix), ex=max(1, int(ttl)))
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Redis indisponível no cache PIX: %s", e)
+            self.local.set(asaas_id, pix, ttl=ttl)
+
+    async def _buscar(self, asaas_id: str) -> dict:
+        self.chamadas_asaas += 1
+        pix = await self.asaas.obter_qrcode_pix(asaas_id)
+        await self._gravar(asaas_id, pix)
+        return pix
+
+    async def obter(self, asaas_id: str) -> dict:
+        pix = await self._ler(asaas_id)
+        if pix is not None:
+            return pix
+        return await self.em_voo.executar(asaas_id, lambda: self._buscar(asaas_id))
+
+    async def invalidar(self, asaas_ids: list[str]):
+        """Cobranças pagas/canceladas: o QR Code não vale mais."""
+        if not asaas_ids:
+            return
+        self.invalidacoes += len(asaas_ids)
+        for asaas_id in asaas_ids:
+            self.local.invalidate(asaas_id)
+        redis = redis_cliente()
+        if redis is None:
+            return
+        try:
+            await redis.delete(*(PREFIXO_REDIS + asaas_id for asaas_id in asaas_ids))
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Não foi possível invalidar o cache PIX no Redis: %s", e)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis" if redis_cliente() is not None else "memoria",
+            "memoria": self.local.stats(),
+            "redis": {"hits": self.hits_redis, "misses": self.misses_redis, "erros": self.erros_redis},
+            "single_flight": self.em_voo.stats(),
+            "chamadas_asaas": self.chamadas_asaas,
+            "invalidacoes": self.invalidacoes,
+        }
+
+
+# Instância usada pela rota /pagamentos/{id}/pix e pelo consumidor de webhooks
+cache_pix = CachePix(asaas_service)
@@ -0,0 +1,214 @@
+import uuid
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import select, literal, true, and_, any_, bindparam, literal_column, func, Boolean, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert, UUID as PG_UUID, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Aluno, Presenca, ContadorPresenca
+from app.services.estatisticas_service import atualizar_rollups
+
+
+async def atualizar_contadores(db: AsyncSession, dojo_id: UUID, data: datetime, deltas: dict):
+    """
+    Aplica variações no contador de aulas desde a graduação, num único
+    INSERT ... ON CONFLICT DO UPDATE. Presenças anteriores à última
+    graduação (chamada retroativa) não entram na contagem.
+    """
+    deltas = {aluno_id: delta for aluno_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    # Ordem fixa: chamadas concorrentes travam as linhas na mesma sequência
+    ids = sorted(deltas)
+    lista = func.unnest(
+        bindparam("contador_alunos", ids, type_=ARRAY(PG_UUID(as_uuid=True))),
+        bindparam("contador_deltas", [deltas[aluno_id] for aluno_id in ids], type_=ARRAY(Integer)),
+    ).table_valued("aluno_id", "delta").render_derived(name="deltas")
+
+    agora = datetime.utcnow()
+    stmt = pg_insert(ContadorPresenca).from_select(
+        ["aluno_id", "dojo_id", "aulas_desde_graduacao", "atualizado_em"],
+        select(
+            lista.c.aluno_id,
+            literal(dojo_id, PG_UUID(as_uuid=True)),
+            lista.c.delta,
+            literal(agora, ContadorPresenca.atualizado_em.type),
+        ),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["aluno_id"],
+        set_={
+            "aulas_desde_graduacao": func.greatest(
+                ContadorPresenca.aulas_desde_graduacao + stmt.excluded.aulas_desde_graduacao, 0
+            ),
+            "atualizado_em": agora,
+        },
+        where=ContadorPresenca.desde.is_(None) | (ContadorPresenca.desde <= data),
+    )
+    await db.execute(stmt)
+
+
+async def registrar_checkin(
+    db: AsyncSession,
+    dojo_id: UUID,
+    aluno_id: UUID | str,
+    data: datetime,
+    presente: bool = True,
+):
+    """
+    Registra uma presença em UMA ida ao banco:
+      WITH aluno AS (SELECT ... WHERE id = :aluno AND dojo_id = :dojo),
+           ins   AS (INSERT ... SELECT FROM aluno ON CONFLICT (aluno_id, dia) DO NOTHING RETURNING ...)
+      SELECT aluno.id, ins.* FROM aluno LEFT JOIN ins ON true
+
+    Retorna (aluno_existe, presenca) onde presenca é None se já havia
+    registro do aluno naquele dia.
+    """
+    aluno = (
+        select(Aluno.id, Aluno.dojo_id)
+        .where(Aluno.id == aluno_id, Aluno.dojo_id == dojo_id)
+        .cte("aluno")
+    )
+
+    ins = (
+        pg_insert(Presenca)
+        .from_select(
+            ["id", "dojo_id", "aluno_id", "data", "dia", "presente", "criado_em"],
+            select(
+                literal(uuid.uuid4(), PG_UUID(as_uuid=True)),
+                aluno.c.dojo_id,
+                aluno.c.id,
+                literal(data, Presenca.data.type),
+                literal(data.date(), Presenca.dia.type),
+                literal(presente, Presenca.presente.type),
+                literal(datetime.utcnow(), Presenca.criado_em.type),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=["aluno_id", "dia"])
+        .returning(Presenca.id, Presenca.aluno_id, Presenca.data, Presenca.presente)
+        .cte("ins")
+    )
+
+    result = await db.execute(
+        select(
+            aluno.c.id.label("aluno_encontrado"),
+            ins.c.id,
+            ins.c.aluno_id,
+            ins.c.data,
+            ins.c.presente,
+        ).select_from(aluno.outerjoin(ins, true()))
+    )
+    row = result.one_or_none()
+
+    if row is None:
+        return False, None
+    if row.id is None:
+        return True, None
+    deltas = {row.aluno_id: 1 if row.presente else 0}
+    await atualizar_contadores(db, dojo_id, data, deltas)
+    await atualizar_rollups(db, dojo_id, data, deltas, inseridos=1)
+    return True, {"id": row.id, "aluno_id": row.aluno_id, "data": row.data, "presente": row.presente}
+
+
+async def registrar_chamada(
+    db: AsyncSession,
+    dojo_id: UUID,
+    data: datetime,
+    itens: list,
+) -> list[dict]:
+    """
+    Chamada em massa baseada em conjuntos (2 queries, independente do tamanho):
+      1. Valida todos os alunos no dojo (id = ANY(:ids)) e já traz a presença
+         existente no dia, se houver.
+      2. INSERT ... SELECT FROM unnest(:alunos, :presentes) com
+         ON CONFLICT (aluno_id, dia) DO UPDATE, só para o que mudou.
+         RETURNING (xmax = 0) diz se a linha foi inserida ou atualizada.
+      3. Ajusta contadores de aulas e rollups com as variações de presente.
+
+    Retorna um resultado por item: inserido | atualizado | inalterado | rejeitado.
+    """
+    dia = data.date()
+    resultados: dict[UUID, dict] = {}
+    rejeitados: list[dict] = []
+
+    # Último item de cada aluno vale; repetições anteriores são rejeitadas
+    desejado: dict[UUID, bool] = {}
+    for item in reversed(itens):
+        if item.aluno_id in desejado:
+            rejeitados.append({"aluno_id": item.aluno_id, "status": "rejeitado", "motivo": "duplicado na lista"})
+        else:
+            desejado[item.aluno_id] = item.presente
+
+    if desejado:
+        result = await db.execute(
+            select(Aluno.id, Presenca.presente)
+            .outerjoin(Presenca, and_(Presenca.aluno_id == Aluno.id, Presenca.dia == dia))
+            .where(
+                Aluno.id == any_(bindparam("ids", list(desejado), type_=ARRAY(PG_UUID(as_uuid=True)))),
+                Aluno.dojo_id == dojo_id,
+            )
+        )
+        existentes = {row.id: row.presente for row in result}
+    else:
+        existentes = {}
+
+    gravar: dict[UUID, bool] = {}
+    for aluno_id, presente in desejado.items():
+        if aluno_id not in existentes:
+            resultados[aluno_id] = {"aluno_id": aluno_id, "status": "rejeitado", "motivo": "aluno não encontrado no dojo"}
+        elif existentes[aluno_id] == presente:
+            resultados[aluno_id] = {"aluno_id": aluno_id, "status": "inalterado", "motivo": None}
+        else:
+            gravar[aluno_id] = presente
+
+    if gravar:
+        lista = func.unnest(
+            bindparam("alunos", list(gravar), type_=ARRAY(PG_UUID(as_uuid=True))),
+            bindparam("presentes", list(gravar.values()), type_=ARRAY(Boolean)),
+        ).table_valued("aluno_id", "presente").render_derived(name="lista")
+
+        stmt = pg_insert(Presenca).from_select(
+            ["id", "dojo_id", "aluno_id", "data", "dia", "presente", "criado_em"],
+            select(
+                func.gen_random_uuid(),
+                literal(dojo_id, PG_UUID(as_uuid=True)),
+                lista.c.aluno_id,
+                literal(data, Presenca.data.type),
+                literal(dia, Presenca.dia.type),
+                lista.c.presente,
+                literal(datetime.utcnow(), Presenca.criado_em.type),
+            ),
+        )
+        # O WHERE garante que toda linha atualizada inverteu `presente`,
+        # então a variação do contador sai exata do RETURNING mesmo com
+        # outra chamada concorrente no mesmo dia
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["aluno_id", "dia"],
+            set_={"presente": stmt.excluded.presente, "data": stmt.excluded.data},
+            where=Presenca.presente.is_distinct_from(stmt.excluded.presente),
+        ).returning(Presenca.aluno_id, Presenca.presente, literal_column("(xmax = 0)").label("inserido"))
+
+        deltas: dict[UUID, int] = {}
+        for row in await db.execute(stmt):
+            resultados[row.aluno_id] = {
+                "aluno_id": row.aluno_id,
+                "status": "inserido" if row.inserido else "atualizado",
+                "motivo": None,
+            }
+            if row.inserido:
+                deltas[row.aluno_id] = 1 if row.presente else 0
+            else:
+                deltas[row.aluno_id] = 1 if row.presente else -1
+
+        for aluno_id in gravar:
+            resultados.setdefault(aluno_id, {"aluno_id": aluno_id, "status": "inalterado", "motivo": None})
+
+        await atualizar_contadores(db, dojo_id, data, deltas)
+        inseridos = sum(1 for r in resultados.values() if r["status"] == "inserido")
+        await atualizar_rollups(db, dojo_id, data, deltas, inseridos)
+
+    # Mantém a ordem da lista enviada
+    ordem = [resultados[aluno_id] for aluno_id in desejado if aluno_id in resultados]
+    return list(reversed(ordem)) + rejeitados
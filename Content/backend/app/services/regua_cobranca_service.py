@@ -0,0 +1,161 @@
+import time
+from collections import Counter
+from datetime import date, datetime, time as dt_time, timedelta
+
+from sqlalchemy import select, func, tuple_, bindparam, literal, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert, ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import AsyncSessionLocal
+from app.config.settings import settings
+from app.models.models import Aluno, Pagamento, LembreteCobranca
+from app.services.evolution_service import evolution_service
+from app.services.notificacao_service import enfileirar_whatsapp, worker_notificacoes
+
+EM_ABERTO = ("pendente", "atraso")
+
+
+def etapas_configuradas() -> list[int]:
+    """DUNNING_SCHEDULE ("-3,0,3,10") em ordem crescente."""
+    return sorted({int(parte) for parte in settings.DUNNING_SCHEDULE.split(",") if parte.strip()})
+
+
+def etapa_devida(vencimento: date, hoje: date, etapas: list[int], recuperacao: int) -> int | None:
+    """
+    Etapa mais recente já alcançada, se ainda dentro da recuperação. Depois de
+    dias sem rodar, manda só a última: ninguém recebe D-3 e D0 no mesmo dia.
+    """
+    dias = (hoje - vencimento).days
+    alcancadas = [etapa for etapa in etapas if etapa <= dias]
+    if not alcancadas or dias - alcancadas[-1] > recuperacao:
+        return None
+    return alcancadas[-1]
+
+
+def janela(hoje: date, etapas: list[int], recuperacao: int) -> tuple[datetime, datetime]:
+    """[início, fim) de data_vencimento que ainda pode ter etapa devida hoje."""
+    inicio = hoje - timedelta(days=etapas[-1] + recuperacao)
+    fim = hoje - timedelta(days=etapas[0]) + timedelta(days=1)
+    return datetime.combine(inicio, dt_time()), datetime.combine(fim, dt_time())
+
+
+def consulta_janela(inicio: datetime, fim: datetime, depois_de: tuple | None, limite: int):
+    """Pagamentos em aberto na janela, em keyset (data_vencimento, id): índice parcial."""
+    stmt = (
+        select(
+            Pagamento.id,
+            Pagamento.dojo_id,
+            Pagamento.valor,
+            Pagamento.data_vencimento,
+            Aluno.nome,
+            Aluno.telefone,
+        )
+        .join(Aluno, Aluno.id == Pagamento.aluno_id)
+        .where(
+            Pagamento.status.in_(EM_ABERTO),
+            Pagamento.data_vencimento >= inicio,
+            Pagamento.data_vencimento < fim,
+        )
+        .order_by(Pagamento.data_vencimento, Pagamento.id)
+        .limit(limite)
+    )
+    if depois_de is not None:
+        stmt = stmt.where(tuple_(Pagamento.data_vencimento, Pagamento.id) > tuple_(*depois_de))
+    return stmt
+
+
+def mensagem(nome: str, valor: float, vencimento: date, hoje: date) -> str:
+    dias_atraso = (hoje - vencimento).days
+    if dias_atraso > 0:
+        return evolution_service.template_cobranca_atraso(nome, valor, dias_atraso=dias_atraso)
+    return evolution_service.template_cobranca_pendente(
+        nome_aluno=nome, valor=valor, vencimento=vencimento.strftime("%d/%m/%Y")
+    )
+
+
+# ─────────────────────────────────────────────
+# Régua de cobrança (rodar 1x por dia: scripts.regua_cobranca)
+#   Lê só os pagamentos em aberto cujo vencimento cai na janela das etapas
+#   (índice parcial), em lotes. Para cada lote, registra os lembretes em
+#   lembretes_cobranca (PK pagamento + etapa, ON CONFLICT DO NOTHING) e
+#   enfileira na outbox só os que entraram agora, na mesma transação.
+#   Rodar de novo no mesmo dia, ou em dois processos, não repete nada.
+# ─────────────────────────────────────────────
+async def _registrar(db: AsyncSession, devidos: list[tuple], agora: datetime) -> set[tuple]:
+    """Grava (pagamento_id, etapa); devolve só os que ainda não existiam."""
+    lista = func.unnest(
+        bindparam("pagamento_ids", [p for p, _ in devidos], type_=ARRAY(PG_UUID(as_uuid=True))),
+        bindparam("etapas", [e for _, e in devidos], type_=ARRAY(Integer)),
+    ).table_valued("pagamento_id", "etapa").render_derived(name="devidos")
+    result = await db.execute(
+        pg_insert(LembreteCobranca)
+        .from_select(
+            ["pagamento_id", "etapa", "enfileirado_em"],
+            select(lista.c.pagamento_id, lista.c.etapa, literal(agora, LembreteCobranca.enfileirado_em.type)),
+        )
+        .on_conflict_do_nothing()
+        .returning(LembreteCobranca.pagamento_id, LembreteCobranca.etapa)
+    )
+    return {tuple(row) for row in result}
+
+
+async def executar_regua(hoje: date | None = None) -> dict:
+    inicio_execucao = time.perf_counter()
+    hoje = hoje or date.today()
+    etapas = etapas_configuradas()
+    recuperacao = settings.DUNNING_CATCHUP_DAYS
+    inicio, fim = janela(hoje, etapas, recuperacao)
+
+    lidos = 0
+    sem_telefone = 0
+    ja_enviados = 0
+    por_etapa: Counter = Counter()
+    ultimo = None
+    while True:
+        async with AsyncSessionLocal() as db:
+            linhas = (await db.execute(
+                consulta_janela(inicio, fim, ultimo, settings.DUNNING_BATCH_SIZE)
+            )).all()
+            if not linhas:
+                break
+            lidos += len(linhas)
+            ultimo = (linhas[-1].data_vencimento, linhas[-1].id)
+
+            devidos = {}
+            for linha in linhas:
+                etapa = etapa_devida(linha.data_vencimento.date(), hoje, etapas, recuperacao)
+                if etapa is None:
+                    continue
+                if not linha.telefone:
+                    sem_telefone += 1
+                    continue
+                devidos[(linha.id, etapa)] = linha
+
+            novos = await _registrar(db, list(devidos), datetime.utcnow()) if devidos else set()
+            ja_enviados += len(devidos) - len(novos)
+            for chave in novos:
+                linha = devidos[chave]
+                enfileirar_whatsapp(
+                    db,
+                    linha.telefone,
+                    mensagem(linha.nome, linha.valor, linha.data_vencimento.date(), hoje),
+                    dojo_id=linha.dojo_id,
+                )
+                por_etapa[chave[1]] += 1
+            await db.commit()
+        if len(linhas) < settings.DUNNING_BATCH_SIZE:
+            break
+
+    if por_etapa:
+        worker_notificacoes.acordar()
+    return {
+        "hoje": hoje.isoformat(),
+        "etapas": etapas,
+        "janela_vencimento": [inicio.date().isoformat(), (fim - timedelta(days=1)).date().isoformat()],
+        "pagamentos_na_janela": lidos,
+        "enfileirados": sum(por_etapa.values()),
+        "por_etapa": dict(sorted(por_etapa.items())),
+        "ja_enviados": ja_enviados,
+        "sem_telefone": sem_telefone,
+        "duracao_ms": round((time.perf_counter() - inicio_execucao) * 1000, 1),
+    }
@@ -0,0 +1,228 @@
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Awaitable, Callable
+
+import httpx
+
+from app.config.settings import settings
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class IntegracaoIndisponivel(Exception):
+    """
+    A integração não respondeu no tempo do endpoint, respondeu 5xx/429, ou
+    nem chegou a ser chamada (circuito aberto, chamadas simultâneas no
+    limite). Quem chama decide o que fazer no lugar: adiar, 503, próximo lote.
+    """
+
+    def __init__(self, integracao: str, motivo: str, tentar_em: float | None = None):
+        super().__init__(f"{integracao}: {motivo}")
+        self.integracao = integracao
+        self.motivo = motivo
+        # Segundos até valer a pena tentar de novo
+        self.tentar_em = tentar_em
+
+    def retry_after(self) -> str:
+        """Valor do header Retry-After das respostas 503."""
+        return str(max(1, round(self.tentar_em or 5)))
+
+
+def limites_configurados(integracao: str) -> dict[str, float]:
+    """RESILIENCE_TIMEOUTS ("asaas.pagamentos.pix=3,evolution.mensagens.enviar=8") desta integração."""
+    limites = {}
+    for parte in settings.RESILIENCE_TIMEOUTS.split(","):
+        chave, _, valor = parte.strip().partition("=")
+        nome, _, endpoint = chave.partition(".")
+        if nome == integracao and endpoint and valor:
+            limites[endpoint] = float(valor)
+    return limites
+
+
+# ─────────────────────────────────────────────
+# Latência por endpoint: janela das últimas N chamadas (p50/p95/p99)
+# ─────────────────────────────────────────────
+class Latencias:
+    def __init__(self, tamanho: int):
+        self.amostras: deque[float] = deque(maxlen=tamanho)
+
+    def registrar(self, ms: float):
+        self.amostras.append(ms)
+
+    def stats(self) -> dict:
+        ordenadas = sorted(self.amostras)
+        if not ordenadas:
+            return {"amostras": 0}
+
+        def percentil(p: float) -> float:
+            return round(ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))], 1)
+
+        return {
+            "amostras": len(ordenadas),
+            "p50_ms": percentil(0.50),
+            "p95_ms": percentil(0.95),
+            "p99_ms": percentil(0.99),
+            "max_ms": round(ordenadas[-1], 1),
+        }
+
+
+# ─────────────────────────────────────────────
+# Disjuntor (circuit breaker) por integração
+#   fechado: tudo passa; RESILIENCE_FAILURE_THRESHOLD falhas seguidas abrem.
+#   aberto: recusa na hora, sem rede, por RESILIENCE_OPEN_SECONDS.
+#   meio_aberto: uma chamada de sondagem passa (as outras continuam
+#   recusadas); se der certo fecha, se falhar abre de novo.
+# ─────────────────────────────────────────────
+class Disjuntor:
+    def __init__(self, nome: str, limiar: int, aberto_por: float):
+        self.nome = nome
+        self.limiar = max(limiar, 1)
+        self.aberto_por = aberto_por
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self.sondando = False
+        self.aberturas = 0
+        self.recusadas = 0
+
+    def _atualizar(self):
+        if self.estado == ABERTO and time.monotonic() >= self.aberto_ate:
+            self.estado = MEIO_ABERTO
+            self.sondando = False
+
+    def tentar_em(self) -> float:
+        return max(0.0, self.aberto_ate - time.monotonic())
+
+    def disponivel(self) -> bool:
+        """Uma chamada agora passaria? (não reserva a sondagem)"""
+        self._atualizar()
+        return self.estado == FECHADO or (self.estado == MEIO_ABERTO and not self.sondando)
+
+    def entrar(self) -> bool:
+        """Libera a chamada ou levanta IntegracaoIndisponivel. True = é a sondagem."""
+        self._atualizar()
+        if self.estado == FECHADO:
+            return False
+        if self.estado == MEIO_ABERTO and not self.sondando:
+            self.sondando = True
+            return True
+        self.recusadas += 1
+        raise IntegracaoIndisponivel(self.nome, "circuito aberto", tentar_em=self.tentar_em() or self.aberto_por)
+
+    def sucesso(self):
+        self.falhas_seguidas = 0
+        self.estado = FECHADO
+        self.sondando = False
+
+    def falha(self):
+        self.falhas_seguidas += 1
+        if self.estado == ABERTO:
+            # Chamada que saiu antes de abrir: não estende o prazo
+            return
+        if self.estado == MEIO_ABERTO or self.falhas_seguidas >= self.limiar:
+            self.estado = ABERTO
+            self.aberto_ate = time.monotonic() + self.aberto_por
+            self.sondando = False
+            self.aberturas += 1
+
+    def liberar_sondagem(self):
+        """Sondagem que terminou sem veredito (cancelada, recusada pelo limite)."""
+        if self.estado == MEIO_ABERTO:
+            self.sondando = False
+
+    def stats(self) -> dict:
+        self._atualizar()
+        return {
+            "estado": self.estado,
+            "falhas_seguidas": self.falhas_seguidas,
+            "aberturas": self.aberturas,
+            "recusadas": self.recusadas,
+            "reabre_em_s": round(self.tentar_em(), 1) if self.estado == ABERTO else None,
+        }
+
+
+# ─────────────────────────────────────────────
+# Integração: disjuntor + limite de chamadas simultâneas + tempo máximo
+# por endpoint + latências. Toda chamada HTTP ao Asaas e à Evolution passa
+# por chamar(); o limite é o tempo total (fila do pool, conexão e resposta).
+# ─────────────────────────────────────────────
+class Integracao:
+    def __init__(self, nome: str, limites: dict[str, float], max_concorrencia: int):
+        self.nome = nome
+        self.limites = {**limites, **limites_configurados(nome)}
+        self.max_concorrencia = max_concorrencia
+        self.semaforo = asyncio.Semaphore(max_concorrencia)
+        self.disjuntor = Disjuntor(nome, settings.RESILIENCE_FAILURE_THRESHOLD, settings.RESILIENCE_OPEN_SECONDS)
+        self.latencias: dict[str, Latencias] = {}
+        self.resultados: Counter = Counter()
+        self.em_andamento = 0
+        integracoes.append(self)
+
+    def _latencias(self, endpoint: str) -> Latencias:
+        if endpoint not in self.latencias:
+            self.latencias[endpoint] = Latencias(settings.RESILIENCE_LATENCY_WINDOW)
+        return self.latencias[endpoint]
+
+    def _falhou(self, resultado: str, motivo: str) -> IntegracaoIndisponivel:
+        self.resultados[resultado] += 1
+        self.disjuntor.falha()
+        return IntegracaoIndisponivel(self.nome, motivo, tentar_em=self.disjuntor.tentar_em() or None)
+
+    async def chamar(self, endpoint: str, requisicao: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Faz a requisição sob as proteções da integração. Respostas 2xx-4xx
+        voltam como vieram (4xx é erro nosso, não da integração); o resto
+        vira IntegracaoIndisponivel e conta como falha no disjuntor.
+        """
+        limite = self.limites.get(endpoint, settings.HTTP_READ_TIMEOUT)
+        sondagem = self.disjuntor.entrar()
+        try:
+            try:
+                await asyncio.wait_for(self.semaforo.acquire(), timeout=settings.RESILIENCE_QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.resultados["sem_vaga"] += 1
+                raise IntegracaoIndisponivel(
+                    self.nome, f"{self.max_concorrencia} chamadas simultâneas em andamento", tentar_em=1.0
+                ) from None
+
+            self.em_andamento += 1
+            inicio = time.perf_counter()
+            try:
+                resposta = await asyncio.wait_for(requisicao(), timeout=limite)
+            except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+                raise self._falhou("timeout", f"{endpoint} sem resposta em {limite:g}s") from e
+            except httpx.TransportError as e:
+                raise self._falhou("erro_rede", f"{endpoint}: {type(e).__name__}") from e
+            finally:
+                self._latencias(endpoint).registrar((time.perf_counter() - inicio) * 1000)
+                self.em_andamento -= 1
+                self.semaforo.release()
+
+            if resposta.status_code >= 500 or resposta.status_code == 429:
+                raise self._falhou("erro_http", f"{endpoint} respondeu HTTP {resposta.status_code}")
+            self.resultados["ok"] += 1
+            self.disjuntor.sucesso()
+            return resposta
+        finally:
+            if sondagem:
+                self.disjuntor.liberar_sondagem()
+
+    def stats(self) -> dict:
+        return {
+            "disjuntor": self.disjuntor.stats(),
+            "max_concorrencia": self.max_concorrencia,
+            "em_andamento": self.em_andamento,
+            "resultados": dict(self.resultados),
+            "limites_s": self.limites,
+            "latencias": {endpoint: l.stats() for endpoint, l in sorted(self.latencias.items())},
+        }
+
+
+integracoes: list[Integracao] = []
+
+
+def integracoes_stats() -> dict:
+    return {integracao.nome: integracao.stats() for integracao in integracoes}
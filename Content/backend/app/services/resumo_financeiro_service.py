@@ -0,0 +1,190 @@
+import json
+import logging
+from collections import defaultdict
+from typing import Iterable
+from uuid import UUID
+
+from sqlalchemy import select, func
+
+from app.config.database import AsyncSessionLocal
+from app.config.redis_cliente import redis_cliente
+from app.config.settings import settings
+from app.models.models import Pagamento
+from app.services.cache import TTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_REDIS = "resumo_financeiro:"
+
+
+def consulta_resumo(dojo_id: UUID):
+    """
+    Uma linha por (referencia_mes, status) do dojo; status nulo conta como
+    pendente. Index-only scan em ix_pagamentos_dojo_id_referencia_mes_status.
+    """
+    status = func.coalesce(Pagamento.status, "pendente")
+    return (
+        select(
+            Pagamento.referencia_mes,
+            status.label("status"),
+            func.count().label("quantidade"),
+            func.sum(Pagamento.valor).label("valor"),
+        )
+        .where(Pagamento.dojo_id == dojo_id)
+        .group_by(Pagamento.referencia_mes, status)
+    )
+
+
+def _totais(por_status: dict) -> dict:
+    def soma(*status: str) -> float:
+        return round(sum((por_status[s]["valor"] for s in status if s in por_status), 0.0), 2)
+
+    return {
+        "recebido": soma("pago"),
+        "em_aberto": soma("pendente", "atraso"),
+        "em_atraso": soma("atraso"),
+        "cancelado": soma("cancelado"),
+        "quantidade": sum(item["quantidade"] for item in por_status.values()),
+    }
+
+
+def montar_meses(linhas) -> list[dict]:
+    """Linhas da consulta -> meses (mais recente primeiro; sem referência por último)."""
+    meses: dict[str | None, dict] = defaultdict(dict)
+    for linha in linhas:
+        meses[linha.referencia_mes][linha.status] = {
+            "quantidade": linha.quantidade,
+            "valor": round(linha.valor or 0.0, 2),
+        }
+    ordem = sorted(meses, key=lambda mes: (mes is not None, mes or ""), reverse=True)
+    return [
+        {"referencia_mes": mes, **_totais(meses[mes]), "por_status": meses[mes]}
+        for mes in ordem
+    ]
+
+
+# ─────────────────────────────────────────────
+# Cache do resumo financeiro por dojo (chave: dojo_id)
+#   Guarda os meses já agregados; o filtro de período e os totais saem
+#   deles na hora. Com REDIS_URL vale para todos os processos, como o
+#   cache PIX. Quem grava em pagamentos (rota, lote, webhook, conciliação)
+#   chama invalidar() depois do commit; o TTL cobre o que escapar.
+#   Um cálculo que começou antes da invalidação não é guardado.
+# ─────────────────────────────────────────────
+class CacheResumoFinanceiro:
+    def __init__(self):
+        self.local = TTLCache(
+            maxsize=settings.FINANCE_SUMMARY_CACHE_MAX_SIZE,
+            ttl=settings.FINANCE_SUMMARY_CACHE_TTL_SECONDS,
+        )
+        self.em_voo = SingleFlight()
+        self.geracoes: dict[UUID, int] = defaultdict(int)
+        self.hits_redis = 0
+        self.misses_redis = 0
+        self.erros_redis = 0
+        self.calculos = 0
+        self.descartados = 0
+        self.invalidacoes = 0
+
+    async def _ler(self, dojo_id: UUID) -> list[dict] | None:
+        redis = redis_cliente()
+        if redis is None:
+            return self.local.get(dojo_id)
+        try:
+            valor = await redis.get(PREFIXO_REDIS + str(dojo_id))
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Redis indisponível no resumo financeiro: %s", e)
+            return self.local.get(dojo_id)
+        if valor is None:
+            self.misses_redis += 1
+            return None
+        self.hits_redis += 1
+        return json.loads(valor)
+
+    async def _gravar(self, dojo_id: UUID, meses: list[dict]):
+        redis = redis_cliente()
+        if redis is None:
+            self.local.set(dojo_id, meses)
+            return
+        try:
+            await redis.set(
+                PREFIXO_REDIS + str(dojo_id), json.dumps(meses), ex=settings.FINANCE_SUMMARY_CACHE_TTL_SECONDS
+            )
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Redis indisponível no resumo financeiro: %s", e)
+            self.local.set(dojo_id, meses)
+
+    async def _calcular(self, dojo_id: UUID, geracao: int) -> list[dict]:
+        self.calculos += 1
+        # Primário, não réplica: o resultado vai para o cache logo depois de uma invalidação
+        async with AsyncSessionLocal() as db:
+            meses = montar_meses((await db.execute(consulta_resumo(dojo_id))).all())
+        if self.geracoes[dojo_id] == geracao:
+            await self._gravar(dojo_id, meses)
+        else:
+            self.descartados += 1
+        return meses
+
+    async def obter(self, dojo_id: UUID) -> list[dict]:
+        meses = await self._ler(dojo_id)
+        if meses is not None:
+            return meses
+        geracao = self.geracoes[dojo_id]
+        return await self.em_voo.executar((dojo_id, geracao), lambda: self._calcular(dojo_id, geracao))
+
+    async def invalidar(self, dojo_ids: Iterable[UUID]):
+        dojo_ids = set(dojo_ids)
+        if not dojo_ids:
+            return
+        self.invalidacoes += len(dojo_ids)
+        for dojo_id in dojo_ids:
+            self.geracoes[dojo_id] += 1
+            self.local.invalidate(dojo_id)
+        redis = redis_cliente()
+        if redis is None:
+            return
+        try:
+            await redis.delete(*(PREFIXO_REDIS + str(dojo_id) for dojo_id in dojo_ids))
+        except Exception as e:
+            self.erros_redis += 1
+            logger.warning("Não foi possível invalidar o resumo financeiro no Redis: %s", e)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis" if redis_cliente() is not None else "memoria",
+            "memoria": self.local.stats(),
+            "redis": {"hits": self.hits_redis, "misses": self.misses_redis, "erros": self.erros_redis},
+            "single_flight": self.em_voo.stats(),
+            "calculos": self.calculos,
+            "descartados_por_invalidacao": self.descartados,
+            "invalidacoes": self.invalidacoes,
+        }
+
+
+# Instância usada pela rota /pagamentos/resumo e por quem grava em pagamentos
+cache_resumo_financeiro = CacheResumoFinanceiro()
+
+
+async def resumo_financeiro(dojo_id: UUID, desde: str | None = None, ate: str | None = None) -> dict:
+    """Meses do cache filtrados por referência (YYYY-MM, inclusivo) e totais do período."""
+    meses = await cache_resumo_financeiro.obter(dojo_id)
+    if desde or ate:
+        meses = [
+            mes for mes in meses
+            if mes["referencia_mes"]
+            and (not desde or mes["referencia_mes"] >= desde)
+            and (not ate or mes["referencia_mes"] <= ate)
+        ]
+    por_status: dict[str, dict] = defaultdict(lambda: {"quantidade": 0, "valor": 0.0})
+    for mes in meses:
+        for status, item in mes["por_status"].items():
+            por_status[status]["quantidade"] += item["quantidade"]
+            por_status[status]["valor"] += item["valor"]
+    return {
+        "desde": desde,
+        "ate": ate,
+        "totais": _totais(por_status),
+        "meses": meses,
+    }
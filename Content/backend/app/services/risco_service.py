@@ -0,0 +1,231 @@
+import time
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select, func, or_, delete, bindparam, literal, cast, Date, Integer, Float, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert, aggregate_order_by, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Aluno, Pagamento, PresencaSemanaAluno, RiscoAluno
+from app.services.estatisticas_service import hoje, inicio_semana
+
+# Janela de histórico (semanas, incluindo a atual) e tamanho do período "recente"
+JANELA_SEMANAS = 26
+SEMANAS_RECENTES = 4
+
+# Pesos do score (regressão logística ajustada à mão; z = soma ponderada)
+PESOS = {
+    "base": -2.2,
+    "queda_frequencia": 2.5,     # 0..1, quanto a frequência recente caiu frente à média anterior
+    "semanas_sem_treinar": 0.45,  # limitado a 8
+    "sequencia_semanas": -0.15,   # semanas seguidas treinando, limitado a 10
+    "pagamentos_atrasados": 0.9,  # limitado a 3
+}
+NIVEIS = ((0.7, "alto"), (0.4, "medio"))
+
+
+# ─────────────────────────────────────────────
+# Carga colunar: cada consulta devolve arrays paralelos (um por coluna),
+# indexados pela posição (idx) do aluno na lista de ativos. Nenhum UUID
+# passa pelo Python: a escrita junta de volta pelo mesmo idx.
+# ─────────────────────────────────────────────
+def _ativos(dojo_id: UUID | None, inicio: date):
+    semana_inicio = (
+        cast(func.date_trunc("week", func.coalesce(Aluno.data_inicio, literal(inicio))), Date) - literal(inicio)
+    ) / 7
+    stmt = select(
+        Aluno.id,
+        Aluno.dojo_id,
+        semana_inicio.label("semana_inicio"),
+        (func.row_number().over(order_by=Aluno.id) - 1).label("idx"),
+    ).where(Aluno.ativo == True)
+    if dojo_id is not None:
+        stmt = stmt.where(Aluno.dojo_id == dojo_id)
+    return stmt.cte("ativos")
+
+
+async def _carregar(db: AsyncSession, ativos, dojo_id: UUID | None, inicio: date):
+    alunos = (await db.execute(
+        select(func.array_agg(aggregate_order_by(ativos.c.semana_inicio, ativos.c.idx)))
+    )).scalar()
+
+    semana = (PresencaSemanaAluno.semana - literal(inicio)) / 7
+    presencas = (await db.execute(
+        select(
+            func.array_agg(ativos.c.idx),
+            func.array_agg(semana),
+            func.array_agg(PresencaSemanaAluno.presentes),
+        )
+        .select_from(PresencaSemanaAluno)
+        .join(ativos, ativos.c.id == PresencaSemanaAluno.aluno_id)
+        # Chamada com data futura cai numa semana além da atual: fica fora da janela
+        .where(PresencaSemanaAluno.semana >= inicio, PresencaSemanaAluno.semana <= inicio_semana(hoje()))
+    )).one()
+
+    agora = datetime.utcnow()
+    atrasados = (
+        select(Pagamento.aluno_id, func.count().label("qtd"))
+        .where(or_(
+            Pagamento.status == "atraso",
+            (Pagamento.status == "pendente") & (Pagamento.data_vencimento < agora),
+        ))
+        .group_by(Pagamento.aluno_id)
+    )
+    if dojo_id is not None:
+        atrasados = atrasados.where(Pagamento.dojo_id == dojo_id)
+    atrasados = atrasados.subquery()
+    pagamentos = (await db.execute(
+        select(func.array_agg(ativos.c.idx), func.array_agg(atrasados.c.qtd))
+        .select_from(atrasados)
+        .join(ativos, ativos.c.id == atrasados.c.aluno_id)
+    )).one()
+
+    return alunos or [], presencas, pagamentos
+
+
+# ─────────────────────────────────────────────
+# Cálculo vetorizado
+# ─────────────────────────────────────────────
+def calcular_scores(
+    n: int,
+    semana_inicio_aluno: np.ndarray,
+    presenca_idx: np.ndarray,
+    presenca_semana: np.ndarray,
+    presenca_qtd: np.ndarray,
+    atraso_idx: np.ndarray,
+    atraso_qtd: np.ndarray,
+) -> dict:
+    """
+    Matriz alunos x semanas com as presenças; a última coluna é a semana atual
+    (incompleta), por isso fica fora de "recente", "base" e "sequência".
+    """
+    W, R = JANELA_SEMANAS, SEMANAS_RECENTES
+    M = np.zeros((n, W), dtype=np.int32)
+    na_janela = (presenca_semana >= 0) & (presenca_semana < W)
+    M[presenca_idx[na_janela], presenca_semana[na_janela]] = presenca_qtd[na_janela]
+
+    # Semanas anteriores à matrícula não contam na média de base
+    matriculado = np.arange(W)[None, :] >= semana_inicio_aluno[:, None]
+
+    recentes = M[:, -R - 1:-1].sum(axis=1)
+    base = M[:, :-R - 1] * matriculado[:, :-R - 1]
+    semanas_base = matriculado[:, :-R - 1].sum(axis=1)
+    esperado = np.divide(base.sum(axis=1) * R, semanas_base, out=np.zeros(n), where=semanas_base > 0)
+    queda = np.clip(1 - np.divide(recentes, esperado, out=np.ones(n), where=esperado > 0), 0, 1)
+    queda[esperado == 0] = 0
+
+    treinou = M > 0
+    alguma = treinou.any(axis=1)
+    ultima = W - 1 - np.argmax(treinou[:, ::-1], axis=1)
+    semanas_matriculado = np.clip(W - 1 - semana_inicio_aluno, 0, W)
+    sem_treinar = np.where(alguma, W - 1 - ultima, semanas_matriculado)
+
+    completas = treinou[:, :-1][:, ::-1]
+    sequencia = np.where(completas.all(axis=1), W - 1, np.argmax(~completas, axis=1))
+
+    atrasados = np.zeros(n, dtype=np.int32)
+    atrasados[atraso_idx] = atraso_qtd
+
+    z = (
+        PESOS["base"]
+        + PESOS["queda_frequencia"] * queda
+        + PESOS["semanas_sem_treinar"] * np.minimum(sem_treinar, 8)
+        + PESOS["sequencia_semanas"] * np.minimum(sequencia, 10)
+        + PESOS["pagamentos_atrasados"] * np.minimum(atrasados, 3)
+    )
+    score = 1 / (1 + np.exp(-z))
+    nivel = np.select([score >= limite for limite, _ in NIVEIS], [nome for _, nome in NIVEIS], "baixo")
+
+    return {
+        "score": score,
+        "nivel": nivel,
+        "queda_frequencia": queda,
+        "semanas_sem_treinar": sem_treinar,
+        "sequencia_semanas": sequencia,
+        "pagamentos_atrasados": atrasados,
+    }
+
+
+def _array(valores, dtype) -> np.ndarray:
+    return np.asarray(valores if valores is not None else [], dtype=dtype)
+
+
+async def calcular_riscos(db: AsyncSession, dojo_id: UUID | None = None) -> dict:
+    """
+    Job em lote: carrega (colunar), calcula (NumPy) e reescreve risco_alunos
+    de um dojo ou de todos. Não faz commit.
+
+    Cargas e escrita numeram os alunos pelo mesmo row_number(); tudo roda num
+    único snapshot (REPEATABLE READ) para a numeração não mudar no meio. Por
+    isso a sessão precisa chegar aqui sem transação aberta.
+    """
+    tempos = {}
+    t0 = time.perf_counter()
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    inicio = inicio_semana(hoje()) - timedelta(weeks=JANELA_SEMANAS - 1)
+    ativos = _ativos(dojo_id, inicio)
+    alunos, presencas, pagamentos = await _carregar(db, ativos, dojo_id, inicio)
+    n = len(alunos)
+    t1 = time.perf_counter()
+    tempos["carga_ms"] = round((t1 - t0) * 1000, 1)
+
+    scores = calcular_scores(
+        n,
+        _array(alunos, np.int32),
+        _array(presencas[0], np.int64),
+        _array(presencas[1], np.int64),
+        _array(presencas[2], np.int32),
+        _array(pagamentos[0], np.int64),
+        _array(pagamentos[1], np.int32),
+    )
+    t2 = time.perf_counter()
+    tempos["calculo_ms"] = round((t2 - t1) * 1000, 1)
+
+    # Reescrita: um DELETE do escopo + um INSERT ... SELECT FROM unnest(arrays)
+    apagar = delete(RiscoAluno)
+    if dojo_id is not None:
+        apagar = apagar.where(RiscoAluno.dojo_id == dojo_id)
+    await db.execute(apagar)
+
+    if n:
+        colunas = {
+            "score": (scores["score"].round(4), Float),
+            "nivel": (scores["nivel"], String),
+            "queda_frequencia": (scores["queda_frequencia"].round(4), Float),
+            "semanas_sem_treinar": (scores["semanas_sem_treinar"], Integer),
+            "sequencia_semanas": (scores["sequencia_semanas"], Integer),
+            "pagamentos_atrasados": (scores["pagamentos_atrasados"], Integer),
+        }
+        lista = func.unnest(
+            *[bindparam(f"risco_{nome}", valores.tolist(), type_=ARRAY(tipo)) for nome, (valores, tipo) in colunas.items()]
+        ).table_valued(*colunas, with_ordinality="ordem").render_derived(name="risco")
+        await db.execute(
+            pg_insert(RiscoAluno).from_select(
+                ["aluno_id", "dojo_id", *colunas, "calculado_em"],
+                select(
+                    ativos.c.id,
+                    ativos.c.dojo_id,
+                    *[lista.c[nome] for nome in colunas],
+                    literal(datetime.utcnow(), RiscoAluno.calculado_em.type),
+                ).join_from(lista, ativos, ativos.c.idx == lista.c.ordem - 1),
+            )
+        )
+    tempos["escrita_ms"] = round((time.perf_counter() - t2) * 1000, 1)
+
+    niveis, contagem = np.unique(scores["nivel"], return_counts=True)
+    return {"alunos": n, "por_nivel": dict(zip(niveis.tolist(), contagem.tolist())), **tempos}
+
+
+async def listar_riscos(db: AsyncSession, dojo_id: UUID, nivel: str | None = None, limit: int = 50) -> list:
+    stmt = (
+        select(RiscoAluno, Aluno.nome)
+        .join(Aluno, Aluno.id == RiscoAluno.aluno_id)
+        .where(RiscoAluno.dojo_id == dojo_id)
+        .order_by(RiscoAluno.score.desc())
+        .limit(limit)
+    )
+    if nivel:
+        stmt = stmt.where(RiscoAluno.nivel == nivel)
+    result = await db.execute(stmt)
+    return result.all()
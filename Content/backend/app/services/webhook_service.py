@@ -0,0 +1,233 @@
+import hashlib
+import json
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import select, update, func, values, column, tuple_, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import AsyncSessionLocal
+from app.config.settings import settings
+from app.models.models import Aluno, Pagamento, EventoWebhookAsaas
+from app.services.evolution_service import evolution_service
+from app.services.fila_worker import WorkerFila
+from app.services.notificacao_service import enfileirar_whatsapp, worker_notificacoes
+from app.services.pix_service import cache_pix
+from app.services.resumo_financeiro_service import cache_resumo_financeiro
+
+# Eventos do Asaas que mudam o status local do pagamento
+MAPA_STATUS = {
+    "PAYMENT_RECEIVED": "pago",
+    "PAYMENT_CONFIRMED": "pago",
+    "PAYMENT_OVERDUE": "atraso",
+    "PAYMENT_DELETED": "cancelado",
+}
+
+# (status atual, novo): um evento atrasado não desfaz um estado mais avançado
+NAO_REGRIDE = {("pago", "atraso"), ("cancelado", "atraso")}
+
+
+# ─────────────────────────────────────────────
+# Recebimento: grava e responde
+# ─────────────────────────────────────────────
+def id_evento(payload: dict) -> str:
+    """id do evento no Asaas; sem ele, um hash do corpo (retentativas repetem o corpo)."""
+    if payload.get("id"):
+        return str(payload["id"])[:100]
+    corpo = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return "sha256:" + hashlib.sha256(corpo.encode()).hexdigest()
+
+
+async def registrar_evento(db: AsyncSession, payload: dict) -> bool:
+    """Grava o evento bruto e faz commit. False = já recebido (retentativa do Asaas)."""
+    stmt = (
+        pg_insert(EventoWebhookAsaas)
+        .values(
+            id=uuid.uuid4(),
+            asaas_event_id=id_evento(payload),
+            evento=payload.get("event"),
+            asaas_payment_id=(payload.get("payment") or {}).get("id"),
+            payload=json.dumps(payload, default=str),
+            status="pendente",
+            recebido_em=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["asaas_event_id"])
+        .returning(EventoWebhookAsaas.id)
+    )
+    novo = (await db.execute(stmt)).scalar() is not None
+    await db.commit()
+    return novo
+
+
+# ─────────────────────────────────────────────
+# Consumidor em lote
+# ─────────────────────────────────────────────
+def consolidar(eventos: list) -> dict[str, str]:
+    """Status final de cada pagamento do lote, aplicando os eventos na ordem de chegada."""
+    final: dict[str, str] = {}
+    for evento in eventos:
+        novo = MAPA_STATUS.get(evento.evento)
+        if not novo or not evento.asaas_payment_id:
+            continue
+        atual = final.get(evento.asaas_payment_id)
+        if (atual, novo) not in NAO_REGRIDE:
+            final[evento.asaas_payment_id] = novo
+    return final
+
+
+# ─────────────────────────────────────────────
+# Avisos de mudança de status (webhook e conciliação)
+# ─────────────────────────────────────────────
+async def avisar_mudancas_status(db: AsyncSession, atualizados: list) -> int:
+    """
+    Enfileira o WhatsApp de "pago"/"atraso" para as linhas (aluno_id, dojo_id,
+    valor, status, data_vencimento) que de fato mudaram. Devolve quantas
+    mensagens enfileirou.
+    """
+    avisar = [p for p in atualizados if p.status in ("pago", "atraso")]
+    if not avisar:
+        return 0
+    result = await db.execute(
+        select(Aluno.id, Aluno.nome, Aluno.telefone).where(
+            Aluno.id.in_({p.aluno_id for p in avisar}),
+            Aluno.telefone.is_not(None),
+        )
+    )
+    alunos = {row.id: row for row in result}
+    enfileiradas = 0
+    for pagamento in avisar:
+        aluno = alunos.get(pagamento.aluno_id)
+        if aluno is None:
+            continue
+        if pagamento.status == "pago":
+            mensagem = evolution_service.template_pagamento_confirmado(aluno.nome, pagamento.valor)
+        else:
+            dias_atraso = (date.today() - pagamento.data_vencimento.date()).days if pagamento.data_vencimento else 1
+            mensagem = evolution_service.template_cobranca_atraso(
+                aluno.nome, pagamento.valor, dias_atraso=max(dias_atraso, 1)
+            )
+        enfileirar_whatsapp(db, aluno.telefone, mensagem, dojo_id=pagamento.dojo_id)
+        enfileiradas += 1
+    return enfileiradas
+
+
+class ConsumidorWebhooks(WorkerFila):
+    """
+    Pega um lote de eventos pendentes (FOR UPDATE SKIP LOCKED) e, na mesma
+    transação: aplica todas as transições com um UPDATE ... FROM (VALUES ...),
+    enfileira os WhatsApps dos pagamentos que de fato mudaram e marca os
+    eventos. Retentativas e eventos repetidos não mudam nada nem reavisam.
+    """
+    nome = "consumidor-webhooks"
+
+    def __init__(self):
+        super().__init__()
+        self.recebidos = 0
+        self.duplicados = 0
+        self.eventos_processados = 0
+        self.pagamentos_atualizados = 0
+        self.lag_ultimo_lote_ms: float | None = None
+        self.lag_maximo_ms: float = 0.0
+
+    @property
+    def tamanho_lote(self) -> int:
+        return settings.WEBHOOK_BATCH_SIZE
+
+    @property
+    def intervalo(self) -> float:
+        return settings.WEBHOOK_POLL_INTERVAL_SECONDS
+
+    async def _aplicar_status(self, db: AsyncSession, alvo: dict[str, str], agora: datetime) -> list:
+        lista = values(column("asaas_id", String), column("status", String), name="alvo").data(list(alvo.items()))
+        atual = func.coalesce(Pagamento.status, "pendente")
+        result = await db.execute(
+            update(Pagamento)
+            .where(
+                Pagamento.asaas_id == lista.c.asaas_id,
+                atual != lista.c.status,
+                tuple_(atual, lista.c.status).not_in(list(NAO_REGRIDE)),
+            )
+            .values(status=lista.c.status, atualizado_em=agora)
+            .returning(
+                Pagamento.aluno_id,
+                Pagamento.dojo_id,
+                Pagamento.valor,
+                Pagamento.status,
+                Pagamento.asaas_id,
+                Pagamento.data_vencimento,
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        return result.all()
+
+    async def processar_lote(self) -> int:
+        async with AsyncSessionLocal() as db:
+            eventos = (await db.execute(
+                select(
+                    EventoWebhookAsaas.id,
+                    EventoWebhookAsaas.evento,
+                    EventoWebhookAsaas.asaas_payment_id,
+                    EventoWebhookAsaas.recebido_em,
+                )
+                .where(EventoWebhookAsaas.status == "pendente")
+                .order_by(EventoWebhookAsaas.recebido_em)
+                .limit(self.tamanho_lote)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not eventos:
+                return 0
+
+            agora = datetime.utcnow()
+            alvo = consolidar(eventos)
+            atualizados = await self._aplicar_status(db, alvo, agora) if alvo else []
+            enfileiradas = await avisar_mudancas_status(db, atualizados)
+
+            aplicaveis = [e.id for e in eventos if e.asaas_payment_id and e.evento in MAPA_STATUS]
+            ignorados = [e.id for e in eventos if not (e.asaas_payment_id and e.evento in MAPA_STATUS)]
+            for status, ids in (("processado", aplicaveis), ("ignorado", ignorados)):
+                if ids:
+                    await db.execute(
+                        update(EventoWebhookAsaas)
+                        .where(EventoWebhookAsaas.id.in_(ids))
+                        .values(status=status, processado_em=agora),
+                        execution_options={"synchronize_session": False},
+                    )
+            await db.commit()
+
+        if enfileiradas:
+            worker_notificacoes.acordar()
+        await cache_pix.invalidar([p.asaas_id for p in atualizados if p.status in ("pago", "cancelado")])
+        await cache_resumo_financeiro.invalidar(p.dojo_id for p in atualizados)
+        self.eventos_processados += len(eventos)
+        self.pagamentos_atualizados += len(atualizados)
+        self.lag_ultimo_lote_ms = round((agora - min(e.recebido_em for e in eventos)).total_seconds() * 1000, 1)
+        self.lag_maximo_ms = max(self.lag_maximo_ms, self.lag_ultimo_lote_ms)
+        return len(eventos)
+
+    async def fila_stats(self) -> dict:
+        """Tamanho e idade da fila pendente (índice parcial: barato)."""
+        async with AsyncSessionLocal() as db:
+            pendentes, mais_antigo = (await db.execute(
+                select(func.count(), func.min(EventoWebhookAsaas.recebido_em))
+                .where(EventoWebhookAsaas.status == "pendente")
+            )).one()
+        return {
+            "pendentes": pendentes,
+            "idade_mais_antigo_s": round((datetime.utcnow() - mais_antigo).total_seconds(), 1) if mais_antigo else 0,
+        }
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "recebidos": self.recebidos,
+            "duplicados": self.duplicados,
+            "eventos_processados": self.eventos_processados,
+            "pagamentos_atualizados": self.pagamentos_atualizados,
+            "lag_ultimo_lote_ms": self.lag_ultimo_lote_ms,
+            "lag_maximo_ms": self.lag_maximo_ms,
+        }
+
+
+# Instância usada pelo lifespan e pela rota do webhook
+consumidor_webhooks = ConsumidorWebhooks()
@@ -0,0 +1,88 @@
+"""
+Benchmark da chamada em massa (/presencas/bulk): ORM item a item vs. set-based.
+
+Cria um dojo de teste com alunos suficientes e mede as duas estratégias
+para listas de 50, 500 e 5.000 itens, cada rodada num dia diferente.
+Rode contra um banco DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_chamada
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+from app.config.database import engine, AsyncSessionLocal
+from app.models.models import Presenca
+from app.services.presenca_service import registrar_chamada
+
+TAMANHOS = (50, 500, 5000)
+
+
+async def criar_dojo(qtd_alunos: int) -> tuple[uuid.UUID, list[uuid.UUID]]:
+    dojo_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO dojos (id, nome, criado_em) VALUES (:id, 'Dojo Benchmark', now())"),
+            {"id": dojo_id},
+        )
+        result = await conn.execute(
+            text(
+                "INSERT INTO alunos (id, dojo_id, nome, ativo, criado_em, data_inicio, faixa_atual) "
+                "SELECT gen_random_uuid(), :dojo, 'Aluno ' || g, true, now(), now(), 'Branca' "
+                "FROM generate_series(1, :n) g RETURNING id"
+            ),
+            {"dojo": dojo_id, "n": qtd_alunos},
+        )
+        alunos = [row.id for row in result]
+    return dojo_id, alunos
+
+
+async def orm_item_a_item(dojo_id, data, itens):
+    # Como era antes: um objeto Presenca por item, sem validação de dojo
+    async with AsyncSessionLocal() as db:
+        for item in itens:
+            db.add(Presenca(dojo_id=dojo_id, aluno_id=item.aluno_id, data=data, presente=item.presente))
+        await db.commit()
+
+
+async def set_based(dojo_id, data, itens):
+    async with AsyncSessionLocal() as db:
+        await registrar_chamada(db, dojo_id, data, itens)
+        await db.commit()
+
+
+async def medir(func, *args) -> float:
+    inicio = time.perf_counter()
+    await func(*args)
+    return (time.perf_counter() - inicio) * 1000
+
+
+async def main():
+    dojo_id, alunos = await criar_dojo(max(TAMANHOS))
+    base = datetime(2000, 1, 1, 19, 0)
+
+    print(f"{'itens':>6} | {'ORM item a item':>16} | {'set-based':>10} | {'reenvio (upsert)':>16}")
+    for i, n in enumerate(TAMANHOS):
+        itens = [SimpleNamespace(aluno_id=a, presente=True) for a in alunos[:n]]
+        dia_orm = base + timedelta(days=3 * i)
+        dia_set = base + timedelta(days=3 * i + 1)
+
+        t_orm = await medir(orm_item_a_item, dojo_id, dia_orm, itens)
+        t_set = await medir(set_based, dojo_id, dia_set, itens)
+
+        # Reenvio da mesma chamada com metade trocada: caminho de update
+        reenvio = [SimpleNamespace(aluno_id=it.aluno_id, presente=(j % 2 == 0)) for j, it in enumerate(itens)]
+        t_upsert = await medir(set_based, dojo_id, dia_set, reenvio)
+
+        print(f"{n:>6} | {t_orm:>13.1f} ms | {t_set:>7.1f} ms | {t_upsert:>13.1f} ms")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
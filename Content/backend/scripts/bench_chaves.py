@@ -0,0 +1,267 @@
+"""
+Benchmark do chaveamento (app/services/chaveamento_service.py).
+
+1. Geração em memória de 8 a 4096 atletas: tempo para montar todas as
+   rodadas e a qualidade da separação por dojo, comparada com o sorteio
+   puro que a rota fazia (embaralhar e parear em sequência): quantos pares
+   de companheiros de dojo podem se enfrentar já na rodada 1 e até a 2.
+2. Banco: 1.000 inscritos pagos numa categoria, de 40 dojos. Carga com um
+   SELECT de nome por inscrito (como a rota fazia) contra o join único, e
+   a rota POST /eventos/{id}/gerar-chaves completa.
+3. Resultados: o torneio inteiro disputado pela rota
+   POST /eventos/{id}/lutas/{luta}/resultado com N áreas de luta gravando
+   ao mesmo tempo, contra o jeito antigo (ler, alterar e regravar o JSON
+   do evento inteiro, travando a linha do evento).
+
+Rode contra um banco DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_chaves
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+import httpx
+from sqlalchemy import text, select
+
+from app.config.database import engine, AsyncSessionLocal
+from app.models.models import Aluno, InscricaoEvento
+from app.services.chaveamento_service import consulta_inscritos, gerar_chave
+
+TAMANHOS = [8, 13, 32, 100, 257, 1000, 2048, 4096]
+
+SQL_CATEGORIA = [
+    "INSERT INTO dojos (id, nome, criado_em) "
+    "SELECT gen_random_uuid(), 'Dojo Chaves ' || g, now() FROM generate_series(1, :dojos) g",
+    "INSERT INTO eventos (id, dojo_id, titulo, data_evento, tipo, status, criado_em) "
+    "SELECT :evento, id, 'Open Chaves', now(), 'publico', 'aberto', now() FROM dojos "
+    "WHERE nome = 'Dojo Chaves 1' ORDER BY criado_em DESC LIMIT 1",
+    "INSERT INTO categorias_evento (id, evento_id, nome) VALUES (:categoria, :evento, 'Absoluto')",
+    # Dojos de tamanhos bem diferentes (alguns trazem dezenas de atletas)
+    "INSERT INTO alunos (id, dojo_id, nome, ativo, criado_em, faixa_atual) "
+    "SELECT gen_random_uuid(), d.id, 'Atleta ' || g, true, now(), 'Branca' "
+    "FROM generate_series(1, :atletas) g "
+    "JOIN LATERAL (SELECT id FROM dojos WHERE nome = 'Dojo Chaves ' || (1 + floor(power(random(), 2) * :dojos))::int "
+    "              ORDER BY criado_em DESC LIMIT 1) d ON true",
+    "INSERT INTO inscricoes_evento (id, evento_id, aluno_id, categoria_id, pago) "
+    "SELECT gen_random_uuid(), :evento, a.id, :categoria, true FROM alunos a "
+    "JOIN dojos d ON d.id = a.dojo_id WHERE d.nome LIKE 'Dojo Chaves %' "
+    "AND NOT EXISTS (SELECT 1 FROM inscricoes_evento i WHERE i.aluno_id = a.id)",
+]
+
+
+def inscritos_falsos(quantidade: int, dojos: int, rng: random.Random) -> list:
+    ids = [uuid.uuid4() for _ in range(dojos)]
+    # Distribuição desigual: poucos dojos grandes, muitos pequenos
+    return [
+        SimpleNamespace(
+            aluno_id=uuid.uuid4(), nome=f"Atleta {i}", dojo_id=ids[int(rng.random() ** 2 * dojos)], dojo=None
+        )
+        for i in range(quantidade)
+    ]
+
+
+def encontros_por_rodada(posicoes: list) -> Counter:
+    """Pares de companheiros de dojo pela rodada em que podem se cruzar."""
+    por_dojo = defaultdict(list)
+    for posicao, atleta in enumerate(posicoes):
+        if atleta is not None:
+            por_dojo[atleta["dojo_id"]].append(posicao)
+    rodadas = Counter()
+    for lista in por_dojo.values():
+        for i, p in enumerate(lista):
+            for q in lista[i + 1:]:
+                rodadas[(p ^ q).bit_length()] += 1
+    return rodadas
+
+
+def posicoes_da_chave(chave: dict) -> list:
+    posicoes = []
+    for luta in chave["rodada_1"]:
+        posicoes += [luta["atleta_a"], None if luta["atleta_b"]["id"] == "BYE" else luta["atleta_b"]]
+    return posicoes
+
+
+def sorteio_antigo(inscritos, rng: random.Random) -> list:
+    """Como a rota fazia: embaralha e pareia em sequência, bye no fim."""
+    atletas = [{"id": str(i.aluno_id), "dojo_id": str(i.dojo_id)} for i in inscritos]
+    rng.shuffle(atletas)
+    return atletas + [None] * (len(atletas) % 2)
+
+
+def em_memoria(dojos: int):
+    print(f"── Geração em memória ({dojos} dojos, distribuição desigual) ──")
+    print(f"{'atletas':>8} {'tamanho':>8} {'byes':>5} {'rodadas':>8} {'lutas':>6} {'ms':>8}"
+          f" {'R1 mesmo dojo':>14} {'antes':>6} {'até R2':>7} {'antes':>6}")
+    rng = random.Random(42)
+    for quantidade in TAMANHOS:
+        inscritos = inscritos_falsos(quantidade, min(dojos, quantidade), rng)
+        cabecas = [i.aluno_id for i in inscritos[:4]]
+        inicio = time.perf_counter()
+        vezes = 5
+        for semente in range(vezes):
+            chave = gerar_chave(inscritos, cabecas, semente=semente)
+        ms = (time.perf_counter() - inicio) / vezes * 1000
+
+        # Byes: só contra as melhores sementes, nunca dois na mesma luta
+        assert all(l["atleta_a"]["id"] != "BYE" for l in chave["rodada_1"])
+        assert sum(l["atleta_b"]["id"] == "BYE" for l in chave["rodada_1"]) == chave["byes"]
+        lutas = sum(r["lutas"] for r in chave["rodadas"])
+        novo = encontros_por_rodada(posicoes_da_chave(chave))
+        # O sorteio antigo só montava a rodada 1; "até R2" supõe a continuação natural
+        antigo = encontros_por_rodada(sorteio_antigo(inscritos, rng))
+        print(f"{quantidade:>8} {chave['tamanho']:>8} {chave['byes']:>5} {len(chave['rodadas']):>8} {lutas:>6} "
+              f"{ms:>8.2f} {novo[1]:>14} {antigo[1]:>6} {novo[1] + novo[2]:>7} {antigo[1] + antigo[2]:>6}")
+
+
+async def no_banco(atletas: int, dojos: int, areas: int):
+    from app.main import app, lifespan
+    from app.services.auth_service import get_current_user
+
+    print(f"\n── Banco: {atletas} inscritos pagos de {dojos} dojos ──")
+    evento_id, categoria_id = uuid.uuid4(), uuid.uuid4()
+    async with engine.begin() as conn:
+        for sql in SQL_CATEGORIA:
+            await conn.execute(
+                text(sql), {"evento": evento_id, "categoria": categoria_id, "atletas": atletas, "dojos": dojos}
+            )
+        await conn.execute(text("ANALYZE inscricoes_evento"))
+        dojo_evento = (await conn.execute(
+            text("SELECT dojo_id FROM eventos WHERE id = :e"), {"e": evento_id}
+        )).scalar()
+
+    async with AsyncSessionLocal() as db:
+        inicio = time.perf_counter()
+        inscricoes = (await db.execute(
+            select(InscricaoEvento).where(
+                InscricaoEvento.evento_id == evento_id,
+                InscricaoEvento.categoria_id == categoria_id,
+                InscricaoEvento.pago == True,
+            )
+        )).scalars().all()
+        for inscricao in inscricoes:
+            (await db.execute(select(Aluno.nome).where(Aluno.id == inscricao.aluno_id))).scalar()
+        n_mais_1 = (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        linhas = (await db.execute(consulta_inscritos(evento_id, categoria_id))).all()
+        join = (time.perf_counter() - inicio) * 1000
+        inicio = time.perf_counter()
+        chave = gerar_chave(linhas)
+        geracao = (time.perf_counter() - inicio) * 1000
+    print(f"carga N+1 ({len(inscricoes) + 1} consultas): {n_mais_1:8.1f} ms")
+    print(f"carga com join (1 consulta):     {join:8.1f} ms")
+    print(f"geração das {len(chave['rodadas'])} rodadas:          {geracao:8.1f} ms")
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        id=uuid.uuid4(), dojo_id=dojo_evento, role="professor", aluno_id=None
+    )
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+            inicio = time.perf_counter()
+            resposta = await cliente.post(f"/eventos/{evento_id}/gerar-chaves", json={"categoria_id": str(categoria_id)})
+            rota = (time.perf_counter() - inicio) * 1000
+            estrutura = resposta.json()["estrutura"]
+            print(f"rota gerar-chaves: HTTP {resposta.status_code} em {rota:.1f} ms "
+                  f"({estrutura['inscritos']} atletas, chave de {estrutura['tamanho']}, {estrutura['byes']} byes)")
+
+            print(f"\n── Resultados com {areas} áreas de luta simultâneas ──")
+            tempos, total = await disputar(cliente, evento_id, categoria_id, areas)
+            print(f"lutas gravadas (linha da luta + vaga da próxima): {len(tempos)} em {total:.1f}s, {percentis(tempos)}")
+            await json_antigo(dojo_evento, estrutura, len(tempos), areas)
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+def percentis(tempos: list[float]) -> str:
+    tempos = sorted(tempos)
+    p = lambda q: tempos[min(len(tempos) - 1, int(q * len(tempos)))] * 1000
+    return f"p50 {p(0.5):.1f} ms, p99 {p(0.99):.1f} ms"
+
+
+async def disputar(cliente, evento_id, categoria_id, areas: int) -> tuple[list[float], float]:
+    """Rodada a rodada: lê a chave (GET, cache) e grava um vencedor sorteado em cada luta pendente."""
+    rng = random.Random(7)
+    vagas = asyncio.Semaphore(areas)
+    tempos: list[float] = []
+
+    async def lutar(luta: dict):
+        vencedor = rng.choice([luta["atleta_a"], luta["atleta_b"]])
+        async with vagas:
+            inicio = time.perf_counter()
+            resposta = await cliente.post(
+                f"/eventos/{evento_id}/lutas/{luta['id']}/resultado", json={"vencedor_id": vencedor["id"]}
+            )
+            tempos.append(time.perf_counter() - inicio)
+        assert resposta.status_code == 200, resposta.text
+
+    inicio = time.perf_counter()
+    rodada = 1
+    while True:
+        chave = (await cliente.get(f"/eventos/{evento_id}/chaves", params={"categoria_id": str(categoria_id)})).json()
+        if rodada > len(chave["rodadas"]):
+            break
+        lutas = chave[f"rodada_{rodada}"]
+        assert all(l["status"] != "aguardando" for l in lutas), f"rodada {rodada} com vaga sem vencedor"
+        await asyncio.gather(*[lutar(l) for l in lutas if l["status"] == "pendente"])
+        rodada += 1
+    final = chave[f"rodada_{len(chave['rodadas'])}"][0]
+    assert final["status"] == "finalizado" and final["vencedor"], final
+    print(f"campeão: {final['vencedor']['nome']} ({final['vencedor']['dojo']})")
+    return tempos, time.perf_counter() - inicio
+
+
+async def json_antigo(dojo_id, estrutura: dict, resultados: int, areas: int):
+    """O mesmo número de resultados gravando no Evento.chaves_json inteiro."""
+    evento_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO eventos (id, dojo_id, titulo, data_evento, tipo, status, chaves_json, criado_em) "
+                 "VALUES (:e, :d, 'Open JSON', now(), 'publico', 'aberto', :c, now())"),
+            {"e": evento_id, "d": dojo_id, "c": json.dumps({"categoria": estrutura})},
+        )
+    vagas = asyncio.Semaphore(areas)
+    tempos: list[float] = []
+
+    async def gravar(numero: int):
+        async with vagas:
+            inicio = time.perf_counter()
+            async with engine.begin() as conn:
+                blob = (await conn.execute(
+                    text("SELECT chaves_json FROM eventos WHERE id = :e FOR UPDATE"), {"e": evento_id}
+                )).scalar()
+                chaves = json.loads(blob)
+                luta = chaves["categoria"]["rodada_1"][numero % len(chaves["categoria"]["rodada_1"])]
+                luta["vencedor"], luta["status"] = luta["atleta_a"], "finalizado"
+                await conn.execute(
+                    text("UPDATE eventos SET chaves_json = :c WHERE id = :e"), {"c": json.dumps(chaves), "e": evento_id}
+                )
+            tempos.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[gravar(i) for i in range(resultados)])
+    print(f"jeito antigo (JSON do evento inteiro):            {resultados} em "
+          f"{time.perf_counter() - inicio:.1f}s, {percentis(tempos)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--atletas", type=int, default=1000)
+    parser.add_argument("--dojos", type=int, default=40)
+    parser.add_argument("--areas", type=int, default=8, help="áreas de luta gravando resultados ao mesmo tempo")
+    parser.add_argument("--sem-banco", action="store_true")
+    args = parser.parse_args()
+
+    em_memoria(args.dojos)
+    if not args.sem_banco:
+        await no_banco(args.atletas, args.dojos, args.areas)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
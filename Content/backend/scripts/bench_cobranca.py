@@ -0,0 +1,135 @@
+"""
+Benchmark da cobrança mensal em lote contra um Asaas falso (scripts/fake_asaas.py).
+
+1. Vazão: um dojo novo por nível de concorrência (1, 8, 16), mesmo número de
+   alunos, cada um sem cliente no Asaas ainda (busca + cria cliente + cobra).
+2. Queda e retomada: cancela a execução no meio, roda de novo (e mais uma vez,
+   para os 503 injetados) e confere que cada pagamento gerou exatamente UMA
+   cobrança no Asaas.
+
+Rode contra um banco DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_cobranca
+    python -m scripts.bench_cobranca --alunos 500 --latencia-ms 80
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+from sqlalchemy import text, select, func
+
+from app.config.database import engine, AsyncSessionLocal
+from app.config.http_clientes import fechar_clientes_http
+from app.models.models import ItemLoteCobranca, Pagamento
+from app.services.asaas_service import asaas_service
+from app.services.cobranca_service import abrir_lote, ExecucaoLote
+from scripts.fake_asaas import servidor_fake
+
+MES = "2030-01"
+
+SQL_DOJO = [
+    "SET LOCAL statement_timeout = 0",
+    "INSERT INTO dojos (id, nome, criado_em) VALUES (:dojo, :nome, now())",
+    "INSERT INTO alunos (id, dojo_id, nome, cpf, telefone, ativo, criado_em, faixa_atual) "
+    "SELECT gen_random_uuid(), :dojo, 'Aluno ' || g, "
+    "       lpad((floor(random() * 1e11))::bigint::text, 11, '0'), "
+    "       CASE WHEN g % 2 = 0 THEN '55119' || lpad(g::text, 8, '0') END, true, now(), 'Branca' "
+    "FROM generate_series(1, :alunos) g",
+]
+
+
+async def novo_dojo(nome: str, alunos: int):
+    dojo = uuid.uuid4()
+    async with engine.begin() as conn:
+        for sql in SQL_DOJO:
+            await conn.execute(text(sql), {"dojo": dojo, "nome": nome, "alunos": alunos})
+    return dojo
+
+
+async def lote_do_dojo(dojo):
+    async with AsyncSessionLocal() as db:
+        return (await abrir_lote(db, dojo, MES, 150.0, 10)).id
+
+
+async def vazao(alunos: int):
+    print(f"\n── Vazão ({alunos} alunos por execução) ──")
+    for concorrencia in (1, 8, 16):
+        lote = await lote_do_dojo(await novo_dojo(f"Dojo Cobrança c{concorrencia}", alunos))
+        resumo = await ExecucaoLote(lote, concorrencia=concorrencia).executar()
+        print(
+            f"concorrência {concorrencia:>2}: {resumo['cobrados']}/{resumo['total']} cobrados em "
+            f"{resumo['duracao_s']} s ({resumo['cobrancas_por_segundo']}/s, "
+            f"{resumo['chamadas_asaas']} chamadas ao Asaas)"
+        )
+
+
+async def queda_e_retomada(fake, alunos: int):
+    print(f"\n── Queda e retomada ({alunos} alunos, {fake.falhas:.0%} de 503) ──")
+    lote = await lote_do_dojo(await novo_dojo("Dojo Cobrança retomada", alunos))
+
+    antes = len(fake.pagamentos)
+    execucao = asyncio.create_task(ExecucaoLote(lote, concorrencia=8).executar())
+    while len(fake.pagamentos) - antes < alunos * 0.4:
+        await asyncio.sleep(0.05)
+    execucao.cancel()
+    try:
+        await execucao
+    except asyncio.CancelledError:
+        pass
+    async with AsyncSessionLocal() as db:
+        gravados = (await db.execute(
+            select(func.count()).where(ItemLoteCobranca.lote_id == lote, ItemLoteCobranca.status == "cobrado")
+        )).scalar()
+    print(f"queda: {len(fake.pagamentos) - antes} cobranças no Asaas, {gravados} gravadas no banco")
+
+    for rodada in (1, 2, 3):
+        resumo = await ExecucaoLote(lote, concorrencia=8).executar()
+        print(
+            f"retomada {rodada}: {resumo['status']}, {resumo['processados_nesta_execucao']} processados, "
+            f"{resumo['recuperados_por_referencia']} recuperados pela externalReference, {resumo['falhas']} falhas"
+        )
+        if resumo["status"] == "concluido":
+            break
+
+    async with AsyncSessionLocal() as db:
+        ids = set((await db.execute(
+            select(Pagamento.id).join(ItemLoteCobranca, ItemLoteCobranca.pagamento_id == Pagamento.id)
+            .where(ItemLoteCobranca.lote_id == lote)
+        )).scalars())
+        sem_asaas = (await db.execute(
+            select(func.count()).select_from(Pagamento)
+            .where(Pagamento.id.in_(ids), Pagamento.asaas_id.is_(None))
+        )).scalar()
+    por_referencia = Counter({ref: n for ref, n in fake.cobrancas_por_referencia().items() if ref in {str(i) for i in ids}})
+    duplicadas = {ref: n for ref, n in por_referencia.items() if n > 1}
+    print(
+        f"cobranças no Asaas para o lote: {sum(por_referencia.values())} de {len(ids)} pagamentos; "
+        f"duplicadas: {len(duplicadas)}; pagamentos sem asaas_id: {sem_asaas}"
+    )
+    assert not duplicadas, duplicadas
+    assert len(por_referencia) == len(ids) and not sem_asaas
+
+
+async def main(args):
+    async with servidor_fake(latencia_ms=args.latencia_ms) as fake:
+        asaas_service.http.base_url = fake.url
+        await fechar_clientes_http()
+        inicio = time.perf_counter()
+        await vazao(args.alunos)
+        fake.falhas = args.falhas
+        await queda_e_retomada(fake, args.alunos * 2)
+        print(f"\npico de requisições simultâneas no Asaas falso: {fake.pico_simultaneas}")
+        print(f"total: {time.perf_counter() - inicio:.1f} s")
+        await fechar_clientes_http()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=300)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--falhas", type=float, default=0.02, help="fração de 503 na retomada")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+"""
+Benchmark da conciliação de status com o Asaas (scripts/fake_asaas.py).
+
+Cria N pagamentos locais com cobrança no Asaas falso, faz ~20% divergirem
+(webhooks "perdidos") e concilia: compara as chamadas ao Asaas com o que a
+abordagem antiga custaria (uma buscar_pagamento por linha) e confere que,
+depois, local e Asaas batem em todas as linhas. Rode contra um banco
+DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_conciliacao
+    python -m scripts.bench_conciliacao --pagamentos 20000 --latencia-ms 80
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import date
+
+from sqlalchemy import text
+
+from app.config.database import engine
+from app.config.http_clientes import fechar_clientes_http
+from app.services.asaas_service import asaas_service
+from app.services.conciliacao_service import Conciliacao, filtros_asaas, MAPA_STATUS_ASAAS
+from scripts.fake_asaas import servidor_fake
+
+VENCIMENTO = date(2030, 6, 10)
+
+SQL_SEED = [
+    "SET LOCAL statement_timeout = 0",
+    "INSERT INTO dojos (id, nome, criado_em) VALUES (:dojo, 'Dojo Conciliação', now())",
+    "INSERT INTO alunos (id, dojo_id, nome, ativo, criado_em, faixa_atual) "
+    "SELECT gen_random_uuid(), :dojo, 'Aluno ' || g, true, now(), 'Branca' FROM generate_series(1, :alunos) g",
+    "INSERT INTO pagamentos (id, dojo_id, aluno_id, valor, status, asaas_id, referencia_mes, data_vencimento, criado_em) "
+    "SELECT gen_random_uuid(), :dojo, a.id, 150, 'pendente', :prefixo || row_number() OVER (), '2030-06', :venc, now() "
+    "FROM alunos a, generate_series(1, :por_aluno) WHERE a.dojo_id = :dojo",
+]
+
+
+async def main(args):
+    dojo = uuid.uuid4()
+    prefixo = f"pay_{dojo.hex[:6]}_"
+    alunos = max(args.pagamentos // 10, 1)
+    async with engine.begin() as conn:
+        for sql in SQL_SEED:
+            await conn.execute(text(sql), {
+                "dojo": dojo, "alunos": alunos, "por_aluno": args.pagamentos // alunos,
+                "prefixo": prefixo, "venc": VENCIMENTO,
+            })
+        ids = (await conn.execute(text("SELECT asaas_id FROM pagamentos WHERE dojo_id = :d"), {"d": dojo})).scalars().all()
+
+    async with servidor_fake(latencia_ms=args.latencia_ms) as fake:
+        asaas_service.http.base_url = fake.url
+        await fechar_clientes_http()
+        # No Asaas: 20% já mudaram sem o webhook chegar
+        for asaas_id in ids:
+            status = "PENDING"
+            if random.random() < 0.2:
+                status = random.choice(["RECEIVED", "CONFIRMED", "OVERDUE", "REFUNDED"])
+            fake.pagamentos[asaas_id] = {
+                "object": "payment", "id": asaas_id, "status": status,
+                "dueDate": VENCIMENTO.isoformat(), "dateCreated": VENCIMENTO.isoformat(), "value": 150,
+            }
+        filtros = filtros_asaas(VENCIMENTO, VENCIMENTO)
+
+        inicio = time.perf_counter()
+        resumo = await Conciliacao(filtros).executar()
+        duracao = time.perf_counter() - inicio
+        print(
+            f"{len(ids)} pagamentos: {resumo['chamadas_asaas']} chamadas ao Asaas (antes: {len(ids)}), "
+            f"{resumo['corrigidos']} corrigidos em {duracao:.1f} s; transições {resumo['transicoes']}; "
+            f"sem mapeamento {resumo['status_sem_mapeamento']}"
+        )
+        segunda = await Conciliacao(filtros).executar()
+        print(f"segunda rodada: {segunda['divergentes']} divergentes, {segunda['chamadas_asaas']} chamadas")
+
+        async with engine.connect() as conn:
+            locais = dict((await conn.execute(
+                text("SELECT asaas_id, status FROM pagamentos WHERE dojo_id = :d"), {"d": dojo}
+            )).all())
+        erradas = [
+            i for i, p in fake.pagamentos.items()
+            if i in locais and p["status"] in MAPA_STATUS_ASAAS and MAPA_STATUS_ASAAS[p["status"]] != locais[i]
+        ]
+        print(f"divergências restantes: {len(erradas)}")
+        assert not erradas and segunda["divergentes"] == 0
+        await fechar_clientes_http()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pagamentos", type=int, default=5000)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    asyncio.run(main(parser.parse_args()))
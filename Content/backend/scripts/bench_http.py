@@ -0,0 +1,142 @@
+"""
+Benchmark dos clientes HTTP das integrações (Asaas, Evolution).
+
+Sobe um servidor local que responde como a API (JSON fixo, com e sem TLS) e
+compara, por chamada de saída:
+  - um httpx.AsyncClient novo a cada chamada (comportamento antigo: TCP + TLS
+    a cada requisição);
+  - o ClienteHTTP compartilhado (keep-alive; handshake só na primeira).
+
+Uso (na pasta backend):
+    python -m scripts.bench_http
+"""
+import asyncio
+import datetime
+import ssl
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from app.config.http_clientes import ClienteHTTP, timeouts, limites
+
+CHAMADAS = 300
+RAJADA = 100
+CORPO = b'{"id": "pay_000000000000", "status": "PENDING", "value": 150.0}'
+
+
+# ─────────────────────────────────────────────
+# Servidor local (HTTP/1.1 com keep-alive)
+# ─────────────────────────────────────────────
+async def _atender(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            cabecalho = await reader.readuntil(b"\r\n\r\n")
+            tamanho = 0
+            for linha in cabecalho.split(b"\r\n"):
+                if linha.lower().startswith(b"content-length:"):
+                    tamanho = int(linha.split(b":")[1])
+            if tamanho:
+                await reader.readexactly(tamanho)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(CORPO)).encode() + b"\r\n\r\n" + CORPO
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _certificado(pasta: Path) -> ssl.SSLContext:
+    """Certificado autoassinado para localhost (só para o benchmark)."""
+    chave = ec.generate_private_key(ec.SECP256R1())
+    nome = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    agora = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(nome)
+        .issuer_name(nome)
+        .public_key(chave.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(agora)
+        .not_valid_after(agora + datetime.timedelta(days=1))
+        .sign(chave, hashes.SHA256())
+    )
+    (pasta / "cert.pem").write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    (pasta / "chave.pem").write_bytes(
+        chave.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    )
+    contexto = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    contexto.load_cert_chain(pasta / "cert.pem", pasta / "chave.pem")
+    return contexto
+
+
+# ─────────────────────────────────────────────
+# Cenários
+# ─────────────────────────────────────────────
+async def por_chamada(base_url: str) -> float:
+    inicio = time.perf_counter()
+    async with httpx.AsyncClient(verify=False) as client:
+        response = await client.post(f"{base_url}/payments", json={"value": 150.0})
+    response.json()
+    return (time.perf_counter() - inicio) * 1000
+
+
+async def compartilhado(cliente: ClienteHTTP) -> float:
+    inicio = time.perf_counter()
+    response = await cliente.client.post("/payments", json={"value": 150.0})
+    response.json()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def _resumo(tempos: list[float]) -> str:
+    p95 = statistics.quantiles(tempos, n=20)[18]
+    return f"mediana {statistics.median(tempos):6.2f} ms  p95 {p95:6.2f} ms"
+
+
+async def cenario(rotulo: str, base_url: str):
+    cliente = ClienteHTTP(f"bench-{rotulo}", base_url, {"Content-Type": "application/json"}, verify=False)
+
+    antigo = [await por_chamada(base_url) for _ in range(CHAMADAS)]
+    novo = [await compartilhado(cliente) for _ in range(CHAMADAS)]
+    economia = statistics.median(antigo) - statistics.median(novo)
+    print(f"[{rotulo}] sequencial, {CHAMADAS} chamadas")
+    print(f"  cliente por chamada   {_resumo(antigo)}")
+    print(f"  cliente compartilhado {_resumo(novo)}  ({cliente.conexoes_novas} conexão(ões) aberta(s))")
+    print(f"  economia por chamada  {economia:6.2f} ms")
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[por_chamada(base_url) for _ in range(RAJADA)])
+    rajada_antiga = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    await asyncio.gather(*[compartilhado(cliente) for _ in range(RAJADA)])
+    rajada_nova = (time.perf_counter() - inicio) * 1000
+    print(
+        f"  rajada de {RAJADA}: por chamada {rajada_antiga:7.1f} ms, compartilhado {rajada_nova:7.1f} ms "
+        f"(limite {limites().max_connections} conexões, timeout connect {timeouts().connect}s)"
+    )
+    await cliente.fechar()
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as pasta:
+        contexto = _certificado(Path(pasta))
+        http = await asyncio.start_server(_atender, "127.0.0.1", 0)
+        https = await asyncio.start_server(_atender, "127.0.0.1", 0, ssl=contexto)
+        async with http, https:
+            await cenario("http", f"http://127.0.0.1:{http.sockets[0].getsockname()[1]}")
+            await cenario("https", f"https://127.0.0.1:{https.sockets[0].getsockname()[1]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark: bcrypt inline vs. pool de threads dedicado.
+
+Simula a "corrida de login" de segunda à noite: N logins concorrentes
+enquanto outro cliente martela um endpoint leve (/ping). Mede o p99 dos
+logins e quantas requisições /ping foram atendidas no mesmo intervalo.
+
+Uso (na pasta backend):
+    python -m scripts.bench_login --logins 40 --concorrencia 20
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+import bcrypt
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from app.services.auth_service import verify_password, verify_password_async
+
+SENHA = "senha-de-teste"
+
+
+def criar_app(senha_hash: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login-inline")
+    async def login_inline():
+        # Como era antes: bcrypt direto na rota (bloqueia o event loop)
+        return {"ok": verify_password(SENHA, senha_hash)}
+
+    @app.post("/login-pool")
+    async def login_pool():
+        return {"ok": await verify_password_async(SENHA, senha_hash)}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def p99(amostras: list[float]) -> float:
+    if len(amostras) < 2:
+        return amostras[0] if amostras else 0.0
+    return statistics.quantiles(amostras, n=100)[98]
+
+
+def subir_servidor(app: FastAPI, porta: int) -> uvicorn.Server:
+    # Servidor real (um worker, como em produção) numa thread separada
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor
+
+
+async def rodar(rota: str, base_url: str, logins: int, concorrencia: int) -> dict:
+    limites = httpx.Limits(max_connections=concorrencia + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=None) as client:
+        latencias: list[float] = []
+        semaforo = asyncio.Semaphore(concorrencia)
+        terminou = asyncio.Event()
+        pings = 0
+
+        async def um_login():
+            async with semaforo:
+                inicio = time.perf_counter()
+                await client.post(rota)
+                latencias.append(time.perf_counter() - inicio)
+
+        async def pingar():
+            nonlocal pings
+            while not terminou.is_set():
+                await client.get("/ping")
+                pings += 1
+
+        inicio = time.perf_counter()
+        tarefa_ping = asyncio.create_task(pingar())
+        await asyncio.gather(*(um_login() for _ in range(logins)))
+        terminou.set()
+        await tarefa_ping
+        duracao = time.perf_counter() - inicio
+
+    return {
+        "rota": rota,
+        "login_p50_ms": round(statistics.median(latencias) * 1000, 1),
+        "login_p99_ms": round(p99(latencias) * 1000, 1),
+        "ping_req_s": round(pings / duracao, 1),
+        "duracao_s": round(duracao, 2),
+    }
+
+
+async def main(logins: int, concorrencia: int, porta: int):
+    senha_hash = bcrypt.hashpw(SENHA.encode(), bcrypt.gensalt()).decode()
+    servidor = subir_servidor(criar_app(senha_hash), porta)
+
+    for rota in ("/login-inline", "/login-pool"):
+        resultado = await rodar(rota, f"http://127.0.0.1:{porta}", logins, concorrencia)
+        print(
+            f"{resultado['rota']:<14} login p50={resultado['login_p50_ms']}ms "
+            f"p99={resultado['login_p99_ms']}ms | /ping {resultado['ping_req_s']} req/s "
+            f"| total {resultado['duracao_s']}s"
+        )
+
+    servidor.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concorrencia, args.porta))
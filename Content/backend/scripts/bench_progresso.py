@@ -0,0 +1,82 @@
+"""
+Benchmark do relatório de progresso do dojo (/alunos/progresso).
+
+Cria um dojo com 2.000 alunos, 7 faixas e 500 mil presenças, recalcula os
+contadores e mede listar_progresso_dojo (todos e só os prontos para exame).
+Rode contra um banco DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_progresso
+"""
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.config.database import engine, AsyncSessionLocal
+from app.services.graduacao_service import listar_progresso_dojo, recalcular_contadores
+
+ALUNOS = 2000
+PRESENCAS = 500_000
+RODADAS = 20
+
+SQL_SEED = [
+    "INSERT INTO dojos (id, nome, criado_em) VALUES (:dojo, 'Dojo Benchmark', now())",
+
+    "INSERT INTO graduacoes (id, dojo_id, nome, ordem, aulas_necessarias) "
+    "SELECT gen_random_uuid(), :dojo, 'Faixa ' || g, g, 20 + g * 10 FROM generate_series(0, 6) g",
+
+    "INSERT INTO alunos (id, dojo_id, nome, ativo, criado_em, data_inicio, faixa_atual, graduacao_id) "
+    "SELECT gen_random_uuid(), :dojo, 'Aluno ' || g, g % 20 <> 0, now(), now(), 'Branca', "
+    "       (SELECT id FROM graduacoes WHERE dojo_id = :dojo AND ordem = g % 5) "
+    "FROM generate_series(1, :alunos) g",
+
+    # Um dia por presença, andando para trás a partir de hoje
+    "INSERT INTO presencas (id, dojo_id, aluno_id, data, dia, presente, criado_em) "
+    "SELECT gen_random_uuid(), :dojo, a.id, now() - (g || ' days')::interval, "
+    "       (now() - (g || ' days')::interval)::date, random() > 0.15, now() "
+    "FROM alunos a, generate_series(1, :por_aluno) g WHERE a.dojo_id = :dojo",
+
+    "INSERT INTO historico_graduacoes (id, aluno_id, dojo_id, graduacao_id, data) "
+    "SELECT gen_random_uuid(), a.id, a.dojo_id, a.graduacao_id, now() - (random() * 200 || ' days')::interval "
+    "FROM alunos a WHERE a.dojo_id = :dojo",
+]
+
+
+async def medir(dojo_id, **kw) -> tuple[float, int]:
+    tempos = []
+    for _ in range(RODADAS):
+        async with AsyncSessionLocal() as db:
+            inicio = time.perf_counter()
+            linhas = await listar_progresso_dojo(db, dojo_id, **kw)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), len(linhas)
+
+
+async def main():
+    dojo_id = uuid.uuid4()
+    params = {"dojo": dojo_id, "alunos": ALUNOS, "por_aluno": PRESENCAS // ALUNOS}
+    async with engine.begin() as conn:
+        for sql in SQL_SEED:
+            await conn.execute(text(sql), params)
+    async with AsyncSessionLocal() as db:
+        await recalcular_contadores(db, dojo_id)
+        await db.commit()
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+
+    for rotulo, kw in [
+        ("todos, por progresso", {}),
+        ("só prontos para exame", {"somente_prontos": True}),
+        ("todos, por nome", {"ordenar": "nome", "crescente": True}),
+    ]:
+        mediana, qtd = await medir(dojo_id, **kw)
+        print(f"{rotulo:<24} {qtd:>5} alunos  mediana {mediana:6.1f} ms")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
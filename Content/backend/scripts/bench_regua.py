@@ -0,0 +1,78 @@
+"""
+Benchmark da régua de cobrança.
+
+Cria 20 mil alunos com 24 meses de pagamentos (480 mil linhas, a maioria
+paga) e roda a régua dia a dia por 20 dias. Mostra quantas linhas cada
+execução lê (só a janela, pelo índice parcial) e confere que nenhum
+pagamento recebeu a mesma etapa duas vezes, mesmo rodando duas vezes por
+dia. Rode contra um banco DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_regua
+"""
+import asyncio
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app.config.database import engine
+from app.services.regua_cobranca_service import executar_regua, etapas_configuradas
+
+DOJOS = 100
+ALUNOS_POR_DOJO = 200
+MESES = 24
+DIAS = 20
+
+SQL_SEED = [
+    "SET LOCAL statement_timeout = 0",
+    "INSERT INTO dojos (id, nome, criado_em) "
+    "SELECT gen_random_uuid(), 'Dojo Régua ' || g, now() FROM generate_series(1, :dojos) g",
+    "INSERT INTO alunos (id, dojo_id, nome, telefone, ativo, criado_em, faixa_atual) "
+    "SELECT gen_random_uuid(), d.id, 'Aluno ' || g, CASE WHEN g % 10 <> 0 THEN '5511' || lpad(g::text, 9, '0') END, "
+    "       true, now(), 'Branca' "
+    "FROM dojos d, generate_series(1, :por_dojo) g WHERE d.nome LIKE 'Dojo Régua %'",
+    # Vencimentos espalhados no mês; o passado quase todo pago, o mês atual e o próximo em aberto
+    "INSERT INTO pagamentos (id, dojo_id, aluno_id, valor, status, data_vencimento, criado_em) "
+    "SELECT gen_random_uuid(), a.dojo_id, a.id, 150, "
+    "       CASE WHEN m > 1 AND random() < 0.97 THEN 'pago' WHEN m > 0 THEN 'atraso' ELSE 'pendente' END, "
+    "       date_trunc('month', now()) - (m || ' months')::interval + ((abs(hashtext(a.id::text)) % 28) || ' days')::interval, "
+    "       now() "
+    "FROM alunos a JOIN dojos d ON d.id = a.dojo_id, generate_series(-1, :meses - 2) m "
+    "WHERE d.nome LIKE 'Dojo Régua %'",
+    "ANALYZE pagamentos",
+]
+
+
+async def main():
+    inicio = time.perf_counter()
+    async with engine.begin() as conn:
+        for sql in SQL_SEED:
+            await conn.execute(text(sql), {"dojos": DOJOS, "por_dojo": ALUNOS_POR_DOJO, "meses": MESES})
+        total = (await conn.execute(text("SELECT count(*) FROM pagamentos"))).scalar()
+        outbox_antes = (await conn.execute(text("SELECT count(*) FROM notificacoes_outbox"))).scalar()
+    print(f"seed: {total} pagamentos em {time.perf_counter() - inicio:.1f} s; etapas {etapas_configuradas()}")
+
+    hoje = date.today()
+    enfileirados = 0
+    for dia in range(DIAS):
+        referencia = hoje + timedelta(days=dia)
+        resumo = await executar_regua(referencia)
+        repetida = await executar_regua(referencia)
+        enfileirados += resumo["enfileirados"] + repetida["enfileirados"]
+        print(
+            f"{referencia}: leu {resumo['pagamentos_na_janela']} de {total} em {resumo['duracao_ms']} ms, "
+            f"enfileirou {resumo['enfileirados']} {resumo['por_etapa']}; "
+            f"2ª execução no dia: {repetida['enfileirados']} enfileirados, {repetida['ja_enviados']} já enviados"
+        )
+
+    async with engine.connect() as conn:
+        lembretes = (await conn.execute(text("SELECT count(*) FROM lembretes_cobranca"))).scalar()
+        outbox = (await conn.execute(text("SELECT count(*) FROM notificacoes_outbox"))).scalar() - outbox_antes
+    print(f"lembretes registrados: {lembretes}; mensagens na outbox: {outbox}; enfileirados: {enfileirados}")
+    assert lembretes == outbox == enfileirados
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
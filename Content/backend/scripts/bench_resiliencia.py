@@ -0,0 +1,174 @@
+"""
+Benchmark da camada de resiliência (app/services/resiliencia.py) contra um
+Asaas falso (scripts/fake_asaas.py).
+
+1. Asaas travado: 200 pedidos de QR Code PIX simultâneos com o Asaas sem
+   responder. Mostra quanto cada chamador esperou e quantos chegaram ao
+   Asaas: o disjuntor abre após RESILIENCE_FAILURE_THRESHOLD timeouts e o
+   resto falha na hora.
+2. Volta do Asaas: depois do tempo aberto, uma sondagem passa e fecha o
+   disjuntor; as chamadas seguintes voltam ao normal.
+3. Cobranças adiadas: pagamentos gravados com o Asaas fora do ar saem
+   depois pelo WorkerCobrancasAdiadas, uma cobrança por pagamento.
+
+Rode contra um banco DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_resiliencia
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import text, select, func
+
+from app.config.database import engine, AsyncSessionLocal
+from app.models.models import Pagamento
+from app.services.asaas_service import asaas_service
+from app.services.cobranca_service import worker_cobrancas_adiadas
+from app.services.resiliencia import IntegracaoIndisponivel
+from scripts.fake_asaas import servidor_fake
+
+COBRANCA_PIX = "pay_bench_pix"
+
+SQL_DOJO = [
+    "INSERT INTO dojos (id, nome, criado_em) VALUES (:dojo, 'Dojo Resiliência', now())",
+    "INSERT INTO alunos (id, dojo_id, nome, cpf, ativo, criado_em, faixa_atual) "
+    "SELECT gen_random_uuid(), :dojo, 'Aluno ' || g, lpad((floor(random() * 1e11))::bigint::text, 11, '0'), "
+    "       true, now(), 'Branca' "
+    "FROM generate_series(1, :alunos) g",
+    # Como a rota POST /pagamentos grava quando o Asaas não atende
+    "INSERT INTO pagamentos (id, dojo_id, aluno_id, valor, status, referencia_mes, cobranca_adiada, criado_em) "
+    "SELECT gen_random_uuid(), dojo_id, id, 150, 'pendente', '2030-02', true, now() "
+    "FROM alunos WHERE dojo_id = :dojo",
+]
+
+
+def percentis(tempos: list[float]) -> str:
+    tempos = sorted(tempos)
+    p = lambda q: tempos[min(len(tempos) - 1, int(q * len(tempos)))] * 1000
+    return f"p50 {p(0.5):.0f} ms, p99 {p(0.99):.0f} ms, máx {tempos[-1] * 1000:.0f} ms"
+
+
+async def pedir_pix() -> tuple[float, str]:
+    inicio = time.perf_counter()
+    try:
+        await asaas_service.obter_qrcode_pix(COBRANCA_PIX)
+        resultado = "ok"
+    except IntegracaoIndisponivel as e:
+        if "circuito" in e.motivo:
+            resultado = "circuito aberto"
+        elif "simultâneas" in e.motivo:
+            resultado = "sem vaga"
+        else:
+            resultado = "timeout"
+    except Exception as e:
+        resultado = type(e).__name__
+    return time.perf_counter() - inicio, resultado
+
+
+async def asaas_travado(fake, chamadas: int):
+    integracao = asaas_service.integracao
+    print(f"\n── Asaas travado: {chamadas} pedidos de PIX simultâneos ──")
+    print(f"limite pagamentos.pix = {integracao.limites['pagamentos.pix']:g}s, "
+          f"máx. simultâneas = {integracao.max_concorrencia}, "
+          f"abre após {integracao.disjuntor.limiar} falhas")
+    fake.latencia_ms = 10_000
+    antes = integracao.resultados["timeout"]
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*[pedir_pix() for _ in range(chamadas)])
+    total = time.perf_counter() - inicio
+    tempos = [t for t, _ in resultados]
+    contagem: dict[str, int] = {}
+    for _, r in resultados:
+        contagem[r] = contagem.get(r, 0) + 1
+    print(f"todos responderam em {total:.1f}s ({percentis(tempos)})")
+    print(f"resultados: {contagem}")
+    print(f"requisições que chegaram a sair para o Asaas: {integracao.resultados['timeout'] - antes}")
+    print(f"disjuntor: {integracao.disjuntor.stats()}")
+
+
+async def asaas_volta(fake, aberto_por: float):
+    integracao = asaas_service.integracao
+    print("\n── Volta do Asaas ──")
+    fake.latencia_ms = 20
+    tempo, resultado = await pedir_pix()
+    print(f"ainda aberto: {resultado} em {tempo * 1000:.1f} ms")
+    await asyncio.sleep(integracao.disjuntor.tentar_em() + 0.05)
+    print(f"depois de {aberto_por:g}s: {integracao.disjuntor.stats()['estado']}")
+    fake.latencia_ms = 300
+    sondagem = asyncio.ensure_future(pedir_pix())
+    await asyncio.sleep(0.05)
+    outros = await asyncio.gather(*[pedir_pix() for _ in range(10)])
+    tempo, resultado = await sondagem
+    print(f"sondagem: {resultado} em {tempo * 1000:.0f} ms; "
+          f"durante ela, {sum(1 for _, r in outros if r == 'circuito aberto')}/10 recusadas na hora")
+    fake.latencia_ms = 20
+    depois = await asyncio.gather(*[pedir_pix() for _ in range(20)])
+    print(f"depois: {sum(1 for _, r in depois if r == 'ok')}/20 ok, "
+          f"{percentis([t for t, _ in depois])}; disjuntor {integracao.disjuntor.stats()['estado']}")
+
+
+async def cobrancas_adiadas(fake, alunos: int):
+    print(f"\n── Cobranças adiadas ({alunos} pagamentos gravados com o Asaas fora) ──")
+    dojo = uuid.uuid4()
+    async with engine.begin() as conn:
+        for sql in SQL_DOJO:
+            await conn.execute(text(sql), {"dojo": dojo, "alunos": alunos})
+
+    async def pendentes() -> int:
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(
+                select(func.count()).select_from(Pagamento)
+                .where(Pagamento.dojo_id == dojo, Pagamento.cobranca_adiada)
+            )).scalar_one()
+
+    fake.falhas = 1.0
+    rodadas = 0
+    while asaas_service.integracao.disjuntor.disponivel():
+        await worker_cobrancas_adiadas.processar_lote()
+        rodadas += 1
+    adiado = await worker_cobrancas_adiadas.processar_lote()
+    print(f"Asaas respondendo 503: disjuntor abriu após {rodadas} rodada(s); "
+          f"com ele aberto o worker nem consulta a fila ({adiado} processados); pendentes: {await pendentes()}")
+
+    fake.falhas = 0.0
+    await asyncio.sleep(asaas_service.integracao.disjuntor.tentar_em() + 0.05)
+    inicio = time.perf_counter()
+    while await worker_cobrancas_adiadas.processar_lote():
+        pass
+    print(f"Asaas de volta: fila drenada em {time.perf_counter() - inicio:.1f}s; pendentes: {await pendentes()}")
+
+    async with AsyncSessionLocal() as db:
+        ids = {str(i) for i in (await db.execute(
+            select(Pagamento.id).where(Pagamento.dojo_id == dojo, Pagamento.asaas_id.is_not(None))
+        )).scalars()}
+    por_referencia = fake.cobrancas_por_referencia()
+    duplicadas = sum(1 for ref in ids if por_referencia.get(ref, 0) > 1)
+    print(f"cobrados: {len(ids)}/{alunos}; cobranças em dobro no Asaas: {duplicadas}")
+    print(f"worker: {worker_cobrancas_adiadas.stats()}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chamadas", type=int, default=200)
+    parser.add_argument("--alunos", type=int, default=100)
+    parser.add_argument("--aberto-por", type=float, default=2.0, help="RESILIENCE_OPEN_SECONDS do bench")
+    args = parser.parse_args()
+
+    asaas_service.integracao.disjuntor.aberto_por = args.aberto_por
+    async with servidor_fake() as fake:
+        asaas_service.http.base_url = fake.url
+        fake.pagamentos[COBRANCA_PIX] = {"id": COBRANCA_PIX, "status": "PENDING", "externalReference": None}
+        await asaas_travado(fake, args.chamadas)
+        await asaas_volta(fake, args.aberto_por)
+        await cobrancas_adiadas(fake, args.alunos)
+        await asaas_service.http.fechar()
+
+    print(f"\nlatências por endpoint: {asaas_service.integracao.stats()['latencias']}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
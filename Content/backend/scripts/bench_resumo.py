@@ -0,0 +1,126 @@
+"""
+Benchmark do resumo financeiro do dojo (GET /pagamentos/resumo).
+
+Cria um dojo com 300 alunos e 10 anos de mensalidades (36 mil
+pagamentos) e compara:
+1. somar no cliente: ler todas as linhas de pagamentos do dojo e agregar
+   em Python (o que o dashboard fazia com listar_pagamentos);
+2. resumo sem cache: o GROUP BY no banco;
+3. resumo com cache: chamadas seguintes;
+4. 100 pedidos simultâneos logo após uma invalidação: um único cálculo.
+Depois confere a invalidação: um pagamento novo e um webhook de
+pagamento recebido aparecem no resumo seguinte.
+
+Rode contra um banco DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_resumo
+"""
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+
+from sqlalchemy import text, select
+
+from app.config.database import engine, AsyncSessionLocal
+from app.models.models import Pagamento
+from app.services.resumo_financeiro_service import cache_resumo_financeiro, resumo_financeiro
+from app.services.webhook_service import registrar_evento, consumidor_webhooks
+
+REFERENCIA_TESTE = "2099-01"
+ALUNOS = 300
+MESES = 120
+
+SQL_DOJO = [
+    "SET LOCAL statement_timeout = 0",
+    "INSERT INTO dojos (id, nome, criado_em) VALUES (:dojo, 'Dojo Resumo', now())",
+    "INSERT INTO alunos (id, dojo_id, nome, ativo, criado_em, faixa_atual) "
+    "SELECT gen_random_uuid(), :dojo, 'Aluno ' || g, true, now(), 'Branca' FROM generate_series(1, :alunos) g",
+    # Passado quase todo pago; os últimos meses com atraso e pendências
+    "INSERT INTO pagamentos (id, dojo_id, aluno_id, valor, status, referencia_mes, criado_em) "
+    "SELECT gen_random_uuid(), :dojo, a.id, 150, "
+    "       CASE WHEN m > 2 AND random() < 0.96 THEN 'pago' WHEN m > 0 THEN 'atraso' ELSE 'pendente' END, "
+    "       to_char(date_trunc('month', now()) - (m || ' months')::interval, 'YYYY-MM'), now() "
+    "FROM alunos a, generate_series(0, :meses - 1) m WHERE a.dojo_id = :dojo",
+]
+
+
+async def somar_no_cliente(dojo_id) -> dict:
+    async with AsyncSessionLocal() as db:
+        pagamentos = (await db.execute(select(Pagamento).where(Pagamento.dojo_id == dojo_id))).scalars().all()
+    totais = defaultdict(float)
+    for pagamento in pagamentos:
+        totais[(pagamento.referencia_mes, pagamento.status or "pendente")] += pagamento.valor
+    return totais
+
+
+async def cronometrar(coro_fabrica, vezes: int = 1) -> float:
+    inicio = time.perf_counter()
+    for _ in range(vezes):
+        await coro_fabrica()
+    return (time.perf_counter() - inicio) / vezes * 1000
+
+
+def mes_teste(resumo: dict) -> dict | None:
+    return next((m for m in resumo["meses"] if m["referencia_mes"] == REFERENCIA_TESTE), None)
+
+
+async def main():
+    dojo_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        for sql in SQL_DOJO:
+            await conn.execute(text(sql), {"dojo": dojo_id, "alunos": ALUNOS, "meses": MESES})
+        await conn.execute(text("ANALYZE pagamentos"))
+    print(f"dojo com {ALUNOS} alunos e {MESES} meses: {ALUNOS * MESES} pagamentos")
+
+    cliente_ms = await cronometrar(lambda: somar_no_cliente(dojo_id), 5)
+
+    async def sem_cache():
+        await cache_resumo_financeiro.invalidar([dojo_id])
+        await resumo_financeiro(dojo_id)
+
+    frio_ms = await cronometrar(sem_cache, 5)
+    quente_ms = await cronometrar(lambda: resumo_financeiro(dojo_id), 1000)
+    print(f"somar no cliente:   {cliente_ms:8.1f} ms")
+    print(f"resumo sem cache:   {frio_ms:8.1f} ms")
+    print(f"resumo com cache:   {quente_ms:8.3f} ms")
+
+    await cache_resumo_financeiro.invalidar([dojo_id])
+    calculos = cache_resumo_financeiro.calculos
+    await asyncio.gather(*[resumo_financeiro(dojo_id) for _ in range(100)])
+    print(f"100 pedidos simultâneos após invalidar: {cache_resumo_financeiro.calculos - calculos} cálculo(s)")
+
+    # Invalidação: pagamento novo (como a rota) e webhook de recebimento
+    async with engine.connect() as conn:
+        aluno_id = (await conn.execute(
+            text("SELECT id FROM alunos WHERE dojo_id = :d LIMIT 1"), {"d": dojo_id}
+        )).scalar()
+    asaas_id = f"pay_resumo_{uuid.uuid4().hex[:8]}"
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO pagamentos (id, dojo_id, aluno_id, valor, status, referencia_mes, asaas_id, criado_em) "
+                "VALUES (gen_random_uuid(), :d, :a, 123.45, 'pendente', :ref, :asaas, now())"
+            ),
+            {"d": dojo_id, "a": aluno_id, "ref": REFERENCIA_TESTE, "asaas": asaas_id},
+        )
+    await cache_resumo_financeiro.invalidar([dojo_id])
+    mes = mes_teste(await resumo_financeiro(dojo_id))
+    print(f"\napós pagamento novo: em_aberto {mes['em_aberto']}, recebido {mes['recebido']}")
+
+    async with AsyncSessionLocal() as db:
+        await registrar_evento(db, {"id": f"evt_{asaas_id}", "event": "PAYMENT_RECEIVED", "payment": {"id": asaas_id}})
+    while await consumidor_webhooks.processar_lote():
+        pass
+    mes = mes_teste(await resumo_financeiro(dojo_id))
+    print(f"após webhook PAYMENT_RECEIVED: em_aberto {mes['em_aberto']}, recebido {mes['recebido']}")
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM pagamentos WHERE asaas_id = :asaas"), {"asaas": asaas_id})
+    print(f"\ncache: {cache_resumo_financeiro.stats()}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
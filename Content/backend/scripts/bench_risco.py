@@ -0,0 +1,72 @@
+"""
+Benchmark do job de risco de evasão.
+
+Cria 50 dojos com 2.000 alunos cada (100 mil alunos), 26 semanas de rollup
+por aluno e alguns pagamentos em atraso, e mede calcular_riscos para todos os
+dojos de uma vez. Rode contra um banco DESCARTÁVEL já migrado.
+
+Uso (na pasta backend):
+    python -m scripts.bench_risco
+"""
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.config.database import engine, AsyncSessionLocal
+from app.services.risco_service import calcular_riscos, JANELA_SEMANAS
+
+DOJOS = 50
+ALUNOS_POR_DOJO = 2000
+
+SQL_SEED = [
+    "SET LOCAL statement_timeout = 0",
+
+    "INSERT INTO dojos (id, nome, criado_em) "
+    "SELECT gen_random_uuid(), 'Dojo Risco ' || g, now() FROM generate_series(1, :dojos) g",
+
+    # Matrículas espalhadas no último ano
+    "INSERT INTO alunos (id, dojo_id, nome, ativo, criado_em, data_inicio, faixa_atual) "
+    "SELECT gen_random_uuid(), d.id, 'Aluno ' || g, true, now(), now() - (random() * 365 || ' days')::interval, 'Branca' "
+    "FROM dojos d, generate_series(1, :por_dojo) g WHERE d.nome LIKE 'Dojo Risco %'",
+
+    # Cada aluno tem um ritmo (1..3 aulas/semana); ~1/4 deles "some" nas últimas 5 semanas
+    "INSERT INTO presencas_semana_aluno (aluno_id, semana, dojo_id, presentes) "
+    "SELECT a.id, date_trunc('week', now())::date - (s * 7), a.dojo_id, "
+    "       CASE WHEN h % 4 = 0 AND s < 5 THEN 0 ELSE greatest(0, 1 + h % 3 - (random() * 1.5)::int) END "
+    "FROM (SELECT a.*, abs(hashtext(a.id::text)) AS h FROM alunos a) a "
+    "JOIN dojos d ON d.id = a.dojo_id, generate_series(0, :semanas - 1) s "
+    "WHERE d.nome LIKE 'Dojo Risco %' AND date_trunc('week', now())::date - (s * 7) >= a.data_inicio::date - 6",
+
+    "INSERT INTO pagamentos (id, aluno_id, dojo_id, valor, status, data_vencimento, criado_em) "
+    "SELECT gen_random_uuid(), a.id, a.dojo_id, 150, 'atraso', now() - interval '20 days', now() "
+    "FROM alunos a JOIN dojos d ON d.id = a.dojo_id WHERE d.nome LIKE 'Dojo Risco %' AND random() < 0.1",
+]
+
+
+async def main():
+    params = {"dojos": DOJOS, "por_dojo": ALUNOS_POR_DOJO, "semanas": JANELA_SEMANAS}
+    inicio = time.perf_counter()
+    async with engine.begin() as conn:
+        for sql in SQL_SEED:
+            await conn.execute(text(sql), params)
+        await conn.execute(text("ANALYZE"))
+    print(f"seed: {time.perf_counter() - inicio:.1f} s")
+
+    for rodada in range(3):
+        inicio = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            resultado = await calcular_riscos(db)
+            await db.commit()
+        total = (time.perf_counter() - inicio) * 1000
+        print(
+            f"rodada {rodada + 1}: {resultado['alunos']} alunos em {total:.0f} ms "
+            f"(carga {resultado['carga_ms']}, cálculo {resultado['calculo_ms']}, escrita {resultado['escrita_ms']}) "
+            f"{resultado['por_nivel']}"
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
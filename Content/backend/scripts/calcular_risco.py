@@ -0,0 +1,38 @@
+"""
+Job em lote do score de risco de evasão (tabela risco_alunos).
+
+Lê os rollups semanais de presença e os pagamentos em atraso, calcula o score
+com NumPy e reescreve risco_alunos. Agende (cron) uma vez por dia; a API só
+lê o resultado em GET /alunos/risco.
+
+Uso (na pasta backend):
+    python -m scripts.calcular_risco             # todos os dojos
+    python -m scripts.calcular_risco --dojo <id> # um dojo
+"""
+import argparse
+import asyncio
+import time
+from uuid import UUID
+
+from app.config.database import engine, AsyncSessionLocal
+from app.services.risco_service import calcular_riscos
+
+
+async def main(dojo_id: UUID | None):
+    inicio = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        resultado = await calcular_riscos(db, dojo_id)
+        await db.commit()
+    await engine.dispose()
+    print(
+        f"{resultado['alunos']} alunos em {(time.perf_counter() - inicio) * 1000:.0f} ms "
+        f"(carga {resultado['carga_ms']} ms, cálculo {resultado['calculo_ms']} ms, "
+        f"escrita {resultado['escrita_ms']} ms). Por nível: {resultado['por_nivel']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dojo", type=UUID, help="calcula só os alunos deste dojo")
+    args = parser.parse_args()
+    asyncio.run(main(args.dojo))
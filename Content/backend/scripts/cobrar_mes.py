@@ -0,0 +1,40 @@
+"""
+Cobrança mensal de um dojo pela linha de comando (mesmo fluxo de POST /pagamentos/lotes).
+
+Abre (ou reabre) o lote do mês e executa. Se cair no meio, rode de novo com
+os mesmos argumentos: só os alunos ainda não cobrados são processados, e quem
+já tinha tentativa é conferido no Asaas pela externalReference antes.
+
+Uso (na pasta backend):
+    python -m scripts.cobrar_mes --dojo <id> --mes 2026-11 --valor 150
+    python -m scripts.cobrar_mes --dojo <id> --mes 2026-11 --valor 150 --dia 5 --concorrencia 16
+"""
+import argparse
+import asyncio
+from uuid import UUID
+
+from app.config.database import engine, AsyncSessionLocal
+from app.config.http_clientes import fechar_clientes_http
+from app.services.cobranca_service import abrir_lote, ExecucaoLote
+
+
+async def main(args):
+    async with AsyncSessionLocal() as db:
+        lote = await abrir_lote(db, args.dojo, args.mes, args.valor, args.dia)
+    try:
+        resumo = await ExecucaoLote(lote.id, concorrencia=args.concorrencia).executar()
+    finally:
+        await fechar_clientes_http()
+        await engine.dispose()
+    for chave, valor in resumo.items():
+        print(f"{chave}: {valor}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dojo", type=UUID, required=True)
+    parser.add_argument("--mes", required=True, help="referência no formato AAAA-MM")
+    parser.add_argument("--valor", type=float, required=True)
+    parser.add_argument("--dia", type=int, default=10, help="dia do vencimento (1 a 28)")
+    parser.add_argument("--concorrencia", type=int, help="padrão: BILLING_CONCURRENCY")
+    asyncio.run(main(parser.parse_args()))
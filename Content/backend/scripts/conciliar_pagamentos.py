@@ -0,0 +1,43 @@
+"""
+Conciliação do status dos pagamentos com o Asaas (repara webhooks perdidos).
+
+Lê a listagem de cobranças do Asaas em páginas de 100, compara com os
+pagamentos locais pelo asaas_id e corrige os divergentes em lote. Agende
+(cron) uma vez por dia para a janela recente; rode à mão para períodos maiores.
+
+Uso (na pasta backend):
+    python -m scripts.conciliar_pagamentos                        # vencimentos dos últimos 60 dias
+    python -m scripts.conciliar_pagamentos --desde 2026-01-01 --ate 2026-06-30
+    python -m scripts.conciliar_pagamentos --status OVERDUE --simular
+    python -m scripts.conciliar_pagamentos --campo pagamento --desde 2026-10-01
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+from app.config.database import engine
+from app.config.http_clientes import fechar_clientes_http
+from app.config.redis_cliente import fechar_redis
+from app.services.conciliacao_service import Conciliacao, filtros_asaas, CAMPOS_DATA
+
+
+async def main(args):
+    filtros = filtros_asaas(args.desde, args.ate, args.campo, args.status)
+    try:
+        resumo = await Conciliacao(filtros, aplicar=not args.simular).executar()
+    finally:
+        await fechar_clientes_http()
+        await fechar_redis()
+        await engine.dispose()
+    for chave, valor in resumo.items():
+        print(f"{chave}: {valor}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desde", type=date.fromisoformat, default=date.today() - timedelta(days=60))
+    parser.add_argument("--ate", type=date.fromisoformat)
+    parser.add_argument("--campo", choices=list(CAMPOS_DATA), default="vencimento", help="data usada no período")
+    parser.add_argument("--status", help="status no Asaas (PENDING, OVERDUE, RECEIVED...)")
+    parser.add_argument("--simular", action="store_true", help="só mostra as divergências, sem gravar")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,306 @@
+"""
+Harness de EXPLAIN para as consultas quentes das rotas.
+
+Popula um banco DESCARTÁVEL (já migrado com `alembic upgrade head`) com um
+volume realista, roda ANALYZE e faz EXPLAIN de cada consulta registrada em
+CONSULTAS. Sai com código 1 se alguma delas cair num Seq Scan.
+
+Uso (na pasta backend, com DATABASE_URL apontando para o banco de teste):
+    python -m scripts.explain_consultas --seed
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, text, and_
+
+from app.config.database import engine
+from app.models.models import (
+    Aluno, Presenca, Pagamento, Evento, InscricaoEvento, PresencaDiaDojo, PresencaSemanaAluno, RiscoAluno,
+    NotificacaoOutbox, EventoWebhookAsaas,
+)
+from app.services.estatisticas_service import consulta_presencas_30dias
+from app.services.graduacao_service import consulta_progresso, data_ultima_graduacao
+from app.services.paginacao import consulta_keyset, encode_cursor
+from app.services.regua_cobranca_service import consulta_janela, janela
+from app.services.chaveamento_service import consulta_inscritos, consulta_lutas
+from app.services.cobranca_service import fila_adiadas
+from app.services.resumo_financeiro_service import consulta_resumo
+
+# Volume padrão do seed (por dojo)
+DOJOS = 200
+ALUNOS_POR_DOJO = 100
+PRESENCAS_POR_ALUNO = 20
+PAGAMENTOS_POR_ALUNO = 6
+EVENTOS_POR_DOJO = 10
+
+SQL_SEED = [
+    "INSERT INTO dojos (id, nome, criado_em) "
+    "SELECT gen_random_uuid(), 'Dojo ' || g, now() FROM generate_series(1, :dojos) g",
+
+    "INSERT INTO alunos (id, dojo_id, nome, cpf, telefone, ativo, criado_em, data_inicio, faixa_atual) "
+    "SELECT gen_random_uuid(), d.id, 'Aluno ' || md5(random()::text), NULL, "
+    "       '119' || lpad((random() * 1e8)::int::text, 8, '0'), random() > 0.1, now(), now(), 'Branca' "
+    "FROM dojos d, generate_series(1, :alunos_por_dojo)",
+
+    "INSERT INTO presencas (id, dojo_id, aluno_id, data, dia, presente, criado_em) "
+    "SELECT gen_random_uuid(), a.dojo_id, a.id, now() - (g || ' days')::interval, "
+    "       (now() - (g || ' days')::interval)::date, random() > 0.1, now() "
+    "FROM alunos a, generate_series(1, :presencas_por_aluno) g",
+
+    "INSERT INTO pagamentos (id, dojo_id, aluno_id, valor, status, asaas_id, referencia_mes, data_vencimento, criado_em, atualizado_em) "
+    "SELECT gen_random_uuid(), a.dojo_id, a.id, 150, (ARRAY['pendente','pago','atraso','cancelado'])[1 + (random() * 3)::int], "
+    "       'pay_' || md5(random()::text), to_char(now() - (g || ' months')::interval, 'YYYY-MM'), "
+    "       now() - (g || ' months')::interval, now() - (g || ' months')::interval, now() "
+    "FROM alunos a, generate_series(1, :pagamentos_por_aluno) g",
+
+    "INSERT INTO eventos (id, dojo_id, titulo, data_evento, tipo, visivel_rede, promovido, valor_inscricao, status, criado_em) "
+    "SELECT gen_random_uuid(), d.id, 'Evento ' || g, now() + (g || ' days')::interval, 'publico', "
+    "       random() < 0.05, random() < 0.01, 50, 'aberto', now() "
+    "FROM dojos d, generate_series(1, :eventos_por_dojo) g",
+
+    "INSERT INTO graduacoes (id, dojo_id, nome, ordem, aulas_necessarias) "
+    "SELECT gen_random_uuid(), d.id, 'Faixa ' || g, g, 20 + g * 4 "
+    "FROM dojos d, generate_series(0, 6) g",
+
+    "UPDATE alunos a SET graduacao_id = g.id FROM graduacoes g "
+    "WHERE g.dojo_id = a.dojo_id AND g.ordem = (hashtext(a.id::text) & 3)",
+
+    "INSERT INTO historico_graduacoes (id, aluno_id, dojo_id, graduacao_id, data) "
+    "SELECT gen_random_uuid(), a.id, a.dojo_id, a.graduacao_id, now() - (g * 90 || ' days')::interval "
+    "FROM alunos a, generate_series(1, 3) g WHERE a.graduacao_id IS NOT NULL",
+
+    "INSERT INTO contadores_presenca (aluno_id, dojo_id, aulas_desde_graduacao, atualizado_em) "
+    "SELECT a.id, a.dojo_id, count(p.id) FILTER (WHERE p.presente), now() "
+    "FROM alunos a LEFT JOIN presencas p ON p.aluno_id = a.id GROUP BY a.id, a.dojo_id",
+
+    "INSERT INTO presencas_dia_dojo (dojo_id, dia, presentes, registros) "
+    "SELECT dojo_id, dia, count(*) FILTER (WHERE presente), count(*) FROM presencas GROUP BY dojo_id, dia",
+
+    "INSERT INTO presencas_semana_aluno (aluno_id, semana, dojo_id, presentes) "
+    "SELECT aluno_id, date_trunc('week', dia)::date, dojo_id, count(*) FROM presencas "
+    "WHERE presente GROUP BY aluno_id, date_trunc('week', dia)::date, dojo_id",
+
+    "INSERT INTO risco_alunos (aluno_id, dojo_id, score, nivel, queda_frequencia, semanas_sem_treinar, "
+    "                          sequencia_semanas, pagamentos_atrasados, calculado_em) "
+    "SELECT id, dojo_id, random(), 'baixo', 0, 0, 0, 0, now() FROM alunos WHERE ativo",
+
+    "INSERT INTO notificacoes_outbox (id, dojo_id, canal, instancia, destino, mensagem, status, tentativas, disponivel_em, criado_em) "
+    "SELECT gen_random_uuid(), a.dojo_id, 'whatsapp', 'budomanager', a.telefone, 'Mensagem', "
+    "       CASE WHEN random() < 0.02 THEN 'pendente' ELSE 'enviada' END, 1, now(), now() "
+    "FROM alunos a",
+
+    "INSERT INTO eventos_webhook_asaas (id, asaas_event_id, evento, asaas_payment_id, payload, status, recebido_em) "
+    "SELECT gen_random_uuid(), 'evt_' || md5(random()::text), 'PAYMENT_RECEIVED', asaas_id, '{}', "
+    "       CASE WHEN random() < 0.01 THEN 'pendente' ELSE 'processado' END, now() "
+    "FROM pagamentos",
+
+    "INSERT INTO categorias_evento (id, evento_id, nome) "
+    "SELECT gen_random_uuid(), e.id, 'Absoluto' FROM eventos e",
+
+    "INSERT INTO inscricoes_evento (id, evento_id, aluno_id, categoria_id, pago) "
+    "SELECT gen_random_uuid(), c.evento_id, a.id, c.id, random() > 0.3 "
+    "FROM categorias_evento c JOIN eventos e ON e.id = c.evento_id "
+    "JOIN LATERAL (SELECT id FROM alunos WHERE dojo_id = e.dojo_id LIMIT 8) a ON true",
+]
+
+
+async def seed(conn):
+    ja_tem = (await conn.execute(select(func.count()).select_from(Aluno))).scalar()
+    if ja_tem:
+        print(f"Banco já possui {ja_tem} alunos; seed ignorado.")
+        return
+
+    params = {
+        "dojos": DOJOS,
+        "alunos_por_dojo": ALUNOS_POR_DOJO,
+        "presencas_por_aluno": PRESENCAS_POR_ALUNO,
+        "pagamentos_por_aluno": PAGAMENTOS_POR_ALUNO,
+        "eventos_por_dojo": EVENTOS_POR_DOJO,
+    }
+    for sql in SQL_SEED:
+        await conn.execute(text(sql), params)
+    print("Seed concluído.")
+
+
+async def amostra(conn) -> dict:
+    """Ids reais para parametrizar as consultas."""
+    aluno = (await conn.execute(select(Aluno.id, Aluno.dojo_id).limit(1))).one()
+    pagamento = (await conn.execute(select(Pagamento.asaas_id).limit(1))).scalar()
+    inscricao = (await conn.execute(
+        select(InscricaoEvento.evento_id, InscricaoEvento.categoria_id).limit(1)
+    )).one()
+    return {
+        "aluno_id": aluno.id,
+        "dojo_id": aluno.dojo_id,
+        "asaas_id": pagamento,
+        "evento_id": inscricao.evento_id,
+        "categoria_id": inscricao.categoria_id,
+        "agora": datetime.utcnow(),
+    }
+
+
+# ─────────────────────────────────────────────
+# Consultas quentes (espelham as rotas em app/routes)
+# ─────────────────────────────────────────────
+CHAVES_ALUNOS = [(Aluno.nome, False), (Aluno.id, False)]
+CHAVES_PRESENCAS = [(Presenca.data, True), (Presenca.id, True)]
+CHAVES_PAGAMENTOS = [(Pagamento.criado_em, True), (Pagamento.id, True)]
+CHAVES_EVENTOS = [(Evento.data_evento, True), (Evento.id, True)]
+CHAVES_FEED = [(Evento.promovido, True), (Evento.data_evento, False), (Evento.id, False)]
+
+# Cursor "meio da lista" para exercitar a condição keyset
+CURSOR_ALUNOS = encode_cursor(["Aluno 8", "00000000-0000-0000-0000-000000000000"])
+CURSOR_DATA = lambda p: encode_cursor([p["agora"] - timedelta(days=10), "ffffffff-ffff-ffff-ffff-ffffffffffff"])
+CURSOR_FEED = lambda p: encode_cursor([False, p["agora"], "00000000-0000-0000-0000-000000000000"])
+
+CONSULTAS = {
+    "alunos.listar_alunos": lambda p: consulta_keyset(
+        select(Aluno).where(Aluno.dojo_id == p["dojo_id"]), CHAVES_ALUNOS, 50, CURSOR_ALUNOS
+    ),
+    "presencas.historico_presenca": lambda p: consulta_keyset(
+        select(Presenca).where(Presenca.aluno_id == p["aluno_id"], Presenca.data >= p["agora"] - timedelta(days=30)),
+        CHAVES_PRESENCAS, 50, CURSOR_DATA(p),
+    ),
+    "presencas.resumo_presenca": lambda p: (
+        select(func.sum(PresencaSemanaAluno.presentes)).where(
+            PresencaSemanaAluno.aluno_id == p["aluno_id"],
+            PresencaSemanaAluno.semana >= (p["agora"] - timedelta(weeks=4)).date(),
+        )
+    ),
+    "presencas.resumo_30dias": lambda p: consulta_presencas_30dias(
+        p["aluno_id"], (p["agora"] - timedelta(days=30)).date()
+    ),
+    "presencas.aulas_do_dojo": lambda p: (
+        select(func.count()).where(
+            PresencaDiaDojo.dojo_id == p["dojo_id"],
+            PresencaDiaDojo.dia >= (p["agora"] - timedelta(weeks=8)).date(),
+            PresencaDiaDojo.presentes > 0,
+        )
+    ),
+    "presencas.dashboard_frequencia": lambda p: (
+        select(Aluno.id, func.sum(PresencaSemanaAluno.presentes))
+        .outerjoin(
+            PresencaSemanaAluno,
+            and_(
+                PresencaSemanaAluno.aluno_id == Aluno.id,
+                PresencaSemanaAluno.semana >= (p["agora"] - timedelta(weeks=8)).date(),
+            ),
+        )
+        .where(Aluno.dojo_id == p["dojo_id"], Aluno.ativo == True)
+        .group_by(Aluno.id)
+    ),
+    "graduacao.calcular_progresso_aluno": lambda p: (
+        consulta_progresso().where(Aluno.id == p["aluno_id"])
+    ),
+    "graduacao.contar_aulas_desde_graduacao": lambda p: (
+        select(func.count(Presenca.id)).where(
+            Presenca.aluno_id == p["aluno_id"],
+            Presenca.data >= func.coalesce(data_ultima_graduacao(p["aluno_id"]), datetime.min),
+            Presenca.presente == True,
+        )
+    ),
+    "alunos.risco_dojo": lambda p: (
+        select(RiscoAluno, Aluno.nome)
+        .join(Aluno, Aluno.id == RiscoAluno.aluno_id)
+        .where(RiscoAluno.dojo_id == p["dojo_id"])
+        .order_by(RiscoAluno.score.desc())
+        .limit(50)
+    ),
+    "notificacoes.reservar_lote": lambda p: (
+        select(NotificacaoOutbox.id)
+        .where(NotificacaoOutbox.status == "pendente", NotificacaoOutbox.disponivel_em <= p["agora"])
+        .order_by(NotificacaoOutbox.disponivel_em)
+        .limit(50)
+        .with_for_update(skip_locked=True)
+    ),
+    "pagamentos.webhook_asaas": lambda p: (
+        select(Pagamento).where(Pagamento.asaas_id == p["asaas_id"])
+    ),
+    "webhooks.consumidor_lote": lambda p: (
+        select(EventoWebhookAsaas.id, EventoWebhookAsaas.evento, EventoWebhookAsaas.asaas_payment_id)
+        .where(EventoWebhookAsaas.status == "pendente")
+        .order_by(EventoWebhookAsaas.recebido_em)
+        .limit(500)
+        .with_for_update(skip_locked=True)
+    ),
+    "cobranca.regua_janela": lambda p: consulta_janela(
+        *janela(p["agora"].date(), [-3, 0, 3, 10], 2), (p["agora"] - timedelta(days=10), p["aluno_id"]), 500
+    ),
+    "cobranca.adiadas_fila": lambda p: fila_adiadas(20),
+    "pagamentos.resumo": lambda p: consulta_resumo(p["dojo_id"]),
+    "pagamentos.listar_pagamentos": lambda p: consulta_keyset(
+        select(Pagamento).where(Pagamento.dojo_id == p["dojo_id"]), CHAVES_PAGAMENTOS, 50, CURSOR_DATA(p)
+    ),
+    "pagamentos.listar_meus_pagamentos": lambda p: consulta_keyset(
+        select(Pagamento).where(Pagamento.aluno_id == p["aluno_id"]), CHAVES_PAGAMENTOS, 50
+    ),
+    "eventos.inscrever (duplicidade)": lambda p: (
+        select(InscricaoEvento).where(
+            InscricaoEvento.evento_id == p["evento_id"],
+            InscricaoEvento.aluno_id == p["aluno_id"],
+        )
+    ),
+    "eventos.gerar_chaves_competicao": lambda p: consulta_inscritos(p["evento_id"], p["categoria_id"]),
+    "eventos.ver_chaves": lambda p: consulta_lutas(p["evento_id"]),
+    "eventos.listar_meus_eventos": lambda p: consulta_keyset(
+        select(Evento).where(Evento.dojo_id == p["dojo_id"]), CHAVES_EVENTOS, 50, CURSOR_DATA(p)
+    ),
+    "eventos.feed_eventos_publicos": lambda p: consulta_keyset(
+        select(Evento).where(Evento.visivel_rede == True), CHAVES_FEED, 50, CURSOR_FEED(p)
+    ),
+}
+
+
+def seq_scans(plano: dict) -> list[str]:
+    """Percorre a árvore do plano e devolve as tabelas lidas por Seq Scan."""
+    encontrados = []
+    if plano.get("Node Type") == "Seq Scan":
+        encontrados.append(plano.get("Relation Name", "?"))
+    for filho in plano.get("Plans", []):
+        encontrados.extend(seq_scans(filho))
+    return encontrados
+
+
+async def explain(conn, stmt) -> dict:
+    # render_postcompile: expande IN (...) em parâmetros comuns
+    compilado = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    if compilado.positional:
+        params = tuple(compilado.params[nome] for nome in compilado.positiontup)
+    else:
+        params = compilado.params
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compilado}", params)
+    bruto = result.scalar()
+    return (json.loads(bruto) if isinstance(bruto, str) else bruto)[0]["Plan"]
+
+
+async def main(fazer_seed: bool) -> int:
+    async with engine.begin() as conn:
+        if fazer_seed:
+            await seed(conn)
+        await conn.execute(text("ANALYZE"))
+
+    falhas = 0
+    async with engine.connect() as conn:
+        params = await amostra(conn)
+        for nome, montar in CONSULTAS.items():
+            plano = await explain(conn, montar(params))
+            tabelas = seq_scans(plano)
+            if tabelas:
+                falhas += 1
+                print(f"FALHA  {nome}: Seq Scan em {', '.join(tabelas)}")
+            else:
+                print(f"ok     {nome} ({plano['Node Type']}, custo {plano['Total Cost']})")
+
+    await engine.dispose()
+    print(f"\n{len(CONSULTAS) - falhas}/{len(CONSULTAS)} consultas sem Seq Scan.")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="popula o banco se estiver vazio")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.seed)))
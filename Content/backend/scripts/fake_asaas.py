@@ -0,0 +1,197 @@
+"""
+Servidor falso do Asaas para testes e benchmarks locais.
+
+Guarda clientes e cobranças em memória e responde no mesmo formato da API
+v3 (só as rotas que o BudoManager usa). Latência e taxa de falhas (503) são
+configuráveis para exercitar concorrência, retomada e retentativas.
+
+Uso (na pasta backend):
+    python -m scripts.fake_asaas --porta 8099 --latencia-ms 80 --falhas 0.02
+    # e no .env: ASAAS_BASE_URL=http://127.0.0.1:8099/api/v3
+
+Em scripts de benchmark, use `async with servidor_fake(...) as fake:`.
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+
+import uvicorn
+from fastapi import FastAPI, APIRouter, Request, HTTPException
+from fastapi.responses import JSONResponse
+
+
+class EstadoFake:
+    def __init__(self, latencia_ms: float = 0, falhas: float = 0.0):
+        self.latencia_ms = latencia_ms
+        self.falhas = falhas
+        self.clientes: dict[str, dict] = {}
+        self.pagamentos: dict[str, dict] = {}
+        self.chamadas: Counter = Counter()
+        self.simultaneas = 0
+        self.pico_simultaneas = 0
+
+    def cobrancas_por_referencia(self) -> Counter:
+        return Counter(p["externalReference"] for p in self.pagamentos.values() if p.get("externalReference"))
+
+
+def _pagina(itens: list, request: Request) -> dict:
+    offset = int(request.query_params.get("offset", 0))
+    limit = min(int(request.query_params.get("limit", 10)), 100)
+    pagina = itens[offset:offset + limit]
+    return {
+        "object": "list",
+        "hasMore": offset + limit < len(itens),
+        "totalCount": len(itens),
+        "limit": limit,
+        "offset": offset,
+        "data": pagina,
+    }
+
+
+def criar_app(estado: EstadoFake) -> FastAPI:
+    app = FastAPI(title="Asaas falso")
+    api = APIRouter(prefix="/api/v3")
+
+    @app.middleware("http")
+    async def simular_rede(request: Request, call_next):
+        # "POST payments", "GET customers", "GET pixQrCode"...
+        partes = request.url.path.removeprefix("/api/v3/").split("/")
+        rota = f"{request.method} {partes[-1] if partes[-1] == 'pixQrCode' else partes[0]}"
+        estado.simultaneas += 1
+        estado.pico_simultaneas = max(estado.pico_simultaneas, estado.simultaneas)
+        try:
+            if estado.latencia_ms:
+                await asyncio.sleep(estado.latencia_ms / 1000 * random.uniform(0.7, 1.3))
+            if not request.url.path.startswith("/_") and random.random() < estado.falhas:
+                estado.chamadas["503"] += 1
+                return JSONResponse({"errors": [{"description": "Serviço indisponível"}]}, status_code=503)
+            response = await call_next(request)
+            estado.chamadas[rota] += 1
+            return response
+        finally:
+            estado.simultaneas -= 1
+
+    # ── Clientes ───────────────────────────────
+    @api.post("/customers")
+    async def criar_cliente(corpo: dict):
+        cliente = {
+            "object": "customer",
+            "id": f"cus_{uuid.uuid4().hex[:12]}",
+            "name": corpo.get("name"),
+            "cpfCnpj": corpo.get("cpfCnpj"),
+            "dateCreated": date.today().isoformat(),
+        }
+        estado.clientes[cliente["id"]] = cliente
+        return cliente
+
+    @api.get("/customers")
+    async def listar_clientes(request: Request):
+        cpf = request.query_params.get("cpfCnpj")
+        itens = [c for c in estado.clientes.values() if not cpf or c["cpfCnpj"] == cpf]
+        return _pagina(itens, request)
+
+    # ── Cobranças ──────────────────────────────
+    @api.post("/payments")
+    async def criar_cobranca(corpo: dict):
+        if corpo.get("customer") not in estado.clientes:
+            return JSONResponse(
+                {"errors": [{"code": "invalid_customer", "description": "Cliente inexistente."}]}, status_code=400
+            )
+        cobranca = {
+            "object": "payment",
+            "id": f"pay_{uuid.uuid4().hex[:12]}",
+            "customer": corpo["customer"],
+            "value": corpo.get("value"),
+            "billingType": corpo.get("billingType", "BOLETO"),
+            "dueDate": corpo.get("dueDate"),
+            "status": "PENDING",
+            "externalReference": corpo.get("externalReference"),
+            "invoiceUrl": "https://sandbox.asaas.com/i/fake",
+            "dateCreated": date.today().isoformat(),
+        }
+        estado.pagamentos[cobranca["id"]] = cobranca
+        return cobranca
+
+    @api.get("/payments")
+    async def listar_cobrancas(request: Request):
+        q = request.query_params
+        itens = list(estado.pagamentos.values())
+        for campo in ("externalReference", "status", "customer"):
+            if q.get(campo):
+                itens = [p for p in itens if p.get(campo) == q[campo]]
+        for campo in ("dateCreated", "dueDate", "paymentDate"):
+            if q.get(f"{campo}[ge]"):
+                itens = [p for p in itens if (p.get(campo) or "") >= q[f"{campo}[ge]"]]
+            if q.get(f"{campo}[le]"):
+                itens = [p for p in itens if (p.get(campo) or "9999") <= q[f"{campo}[le]"]]
+        return _pagina(itens, request)
+
+    @api.get("/payments/{payment_id}")
+    async def obter_cobranca(payment_id: str):
+        if payment_id not in estado.pagamentos:
+            raise HTTPException(status_code=404)
+        return estado.pagamentos[payment_id]
+
+    @api.get("/payments/{payment_id}/pixQrCode")
+    async def pix(payment_id: str):
+        if payment_id not in estado.pagamentos:
+            raise HTTPException(status_code=404)
+        return {
+            "encodedImage": "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==",
+            "payload": f"00020126580014br.gov.bcb.pix0136{payment_id}5204000053039865802BR",
+            "expirationDate": f"{date.today().isoformat()} 23:59:59",
+        }
+
+    app.include_router(api)
+
+    # ── Controle do teste ──────────────────────
+    @app.get("/_stats")
+    async def stats():
+        return {
+            "chamadas": dict(estado.chamadas),
+            "clientes": len(estado.clientes),
+            "pagamentos": len(estado.pagamentos),
+            "pico_simultaneas": estado.pico_simultaneas,
+        }
+
+    @app.post("/_pagamentos/{payment_id}/status")
+    async def mudar_status(payment_id: str, corpo: dict):
+        estado.pagamentos[payment_id]["status"] = corpo["status"]
+        if corpo["status"] in ("RECEIVED", "CONFIRMED"):
+            estado.pagamentos[payment_id]["paymentDate"] = datetime.utcnow().date().isoformat()
+        return estado.pagamentos[payment_id]
+
+    return app
+
+
+@asynccontextmanager
+async def servidor_fake(porta: int = 0, latencia_ms: float = 0, falhas: float = 0.0):
+    """Sobe o servidor no event loop atual; devolve o estado com `.url` preenchida."""
+    estado = EstadoFake(latencia_ms, falhas)
+    servidor = uvicorn.Server(
+        uvicorn.Config(criar_app(estado), host="127.0.0.1", port=porta, log_level="warning", lifespan="off")
+    )
+    task = asyncio.create_task(servidor.serve())
+    while not servidor.started:
+        await asyncio.sleep(0.01)
+    porta_real = servidor.servers[0].sockets[0].getsockname()[1]
+    estado.url = f"http://127.0.0.1:{porta_real}/api/v3"
+    try:
+        yield estado
+    finally:
+        servidor.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8099)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--falhas", type=float, default=0.0, help="fração de respostas 503 (0 a 1)")
+    args = parser.parse_args()
+    estado = EstadoFake(args.latencia_ms, args.falhas)
+    uvicorn.run(criar_app(estado), host="127.0.0.1", port=args.porta)
@@ -0,0 +1,38 @@
+"""
+Recalcula os contadores de aulas (contadores_presenca) e os rollups de
+frequência (presencas_dia_dojo, presencas_semana_aluno) a partir das
+presenças brutas. Use depois de importar presenças por fora da API ou se
+suspeitar de divergência.
+
+Uso (na pasta backend):
+    python -m scripts.recalcular_contadores             # todos os dojos
+    python -m scripts.recalcular_contadores --dojo <id> # um dojo
+"""
+import argparse
+import asyncio
+import time
+from uuid import UUID
+
+from app.config.database import engine, AsyncSessionLocal
+from app.services.graduacao_service import recalcular_contadores
+from app.services.estatisticas_service import recalcular_rollups
+
+
+async def main(dojo_id: UUID | None):
+    inicio = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        total = await recalcular_contadores(db, dojo_id)
+        dias, semanas = await recalcular_rollups(db, dojo_id)
+        await db.commit()
+    await engine.dispose()
+    print(
+        f"{total} contadores, {dias} dias de dojo e {semanas} semanas de aluno "
+        f"recalculados em {(time.perf_counter() - inicio) * 1000:.0f} ms."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dojo", type=UUID, help="recalcula só os alunos deste dojo")
+    args = parser.parse_args()
+    asyncio.run(main(args.dojo))
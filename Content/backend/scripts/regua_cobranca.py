@@ -0,0 +1,33 @@
+"""
+Régua de cobrança: lembretes de WhatsApp antes e depois do vencimento.
+
+Enfileira na outbox o lembrete da etapa do dia (DUNNING_SCHEDULE, ex: D-3,
+D0, D+3, D+10) de cada pagamento em aberto. Cada etapa sai uma vez só por
+pagamento; rodar de novo no mesmo dia não repete nada. Agende (cron) uma
+vez por dia, no horário em que as mensagens devem chegar.
+
+Uso (na pasta backend):
+    python -m scripts.regua_cobranca
+    python -m scripts.regua_cobranca --data 2026-11-13   # simula outro dia
+"""
+import argparse
+import asyncio
+from datetime import date
+
+from app.config.database import engine
+from app.services.regua_cobranca_service import executar_regua
+
+
+async def main(hoje: date | None):
+    try:
+        resumo = await executar_regua(hoje)
+    finally:
+        await engine.dispose()
+    for chave, valor in resumo.items():
+        print(f"{chave}: {valor}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", type=date.fromisoformat, help="dia de referência (padrão: hoje)")
+    asyncio.run(main(parser.parse_args().data))
@@ -0,0 +1,44 @@
+"""
+Worker da outbox de notificações (WhatsApp) como processo separado.
+
+Use quando a API roda com OUTBOX_WORKER_ENABLED=false (ex: vários workers do
+uvicorn e um único processo enviando). Vários workers deste script também
+podem rodar juntos: cada lote é reservado com FOR UPDATE SKIP LOCKED. O limite
+de taxa por instância da Evolution vale por processo.
+
+Uso (na pasta backend):
+    python -m scripts.worker_notificacoes
+"""
+import asyncio
+import signal
+
+from app.config.database import engine
+from app.config.http_clientes import abrir_clientes_http, fechar_clientes_http
+from app.services.notificacao_service import worker_notificacoes
+
+
+async def main():
+    abrir_clientes_http()
+    worker_notificacoes.iniciar()
+    loop = asyncio.get_running_loop()
+    parar = asyncio.Event()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sinal, parar.set)
+        except NotImplementedError:  # Windows
+            pass
+    print("Worker de notificações rodando (Ctrl+C para sair).")
+    try:
+        await parar.wait()
+    finally:
+        await worker_notificacoes.parar()
+        await fechar_clientes_http()
+        await engine.dispose()
+    print(f"Encerrado: {worker_notificacoes.stats()}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,44 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.cliente_asaas_service import ResolvedorClientesAsaas
+from app.services.resiliencia import IntegracaoIndisponivel
+
+
+class AsaasFalso:
+    def __init__(self, erro: Exception):
+        self.erro = erro
+        self.criados = 0
+
+    async def buscar_cliente_por_cpf(self, cpf: str):
+        raise self.erro
+
+    async def criar_cliente(self, nome: str, cpf: str) -> dict:
+        self.criados += 1
+        return {"id": "cus_novo"}
+
+
+def _http_erro(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://asaas.test/customers")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+def test_busca_recusada_4xx_vira_none_sem_criar_cliente():
+    asaas = AsaasFalso(_http_erro(400))
+    resolvedor = ResolvedorClientesAsaas(asaas)
+
+    assert asyncio.run(resolvedor.resolver_cpf("123.456.789-00", "Aluno")) is None
+    assert asaas.criados == 0
+    assert resolvedor.stats()["recusados_asaas"] == 1
+
+
+def test_asaas_indisponivel_continua_subindo():
+    asaas = AsaasFalso(IntegracaoIndisponivel("asaas", "erro_http"))
+    resolvedor = ResolvedorClientesAsaas(asaas)
+
+    with pytest.raises(IntegracaoIndisponivel):
+        asyncio.run(resolvedor.resolver_cpf("12345678900", "Aluno"))
+    assert asaas.criados == 0
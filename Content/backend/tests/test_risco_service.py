@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.services.risco_service import JANELA_SEMANAS, calcular_scores
+
+
+def _scores(presenca_idx, presenca_semana, presenca_qtd, n=2):
+    return calcular_scores(
+        n,
+        np.zeros(n, dtype=np.int32),
+        np.asarray(presenca_idx, dtype=np.int64),
+        np.asarray(presenca_semana, dtype=np.int64),
+        np.asarray(presenca_qtd, dtype=np.int32),
+        np.asarray([], dtype=np.int64),
+        np.asarray([], dtype=np.int32),
+    )
+
+
+def test_presenca_em_semana_futura_fica_fora_da_janela():
+    atual = JANELA_SEMANAS - 1
+    # Aluno 0 treinou nas últimas semanas; a chamada do aluno 1 foi lançada com data futura
+    idx = [0, 0, 0, 1]
+    semana = [atual - 3, atual - 2, atual - 1, JANELA_SEMANAS + 2]
+    qtd = [2, 2, 2, 3]
+
+    scores = _scores(idx, semana, qtd)
+    esperado = _scores(idx[:3], semana[:3], qtd[:3])
+
+    for campo in ("score", "semanas_sem_treinar", "sequencia_semanas"):
+        np.testing.assert_array_equal(scores[campo], esperado[campo])
+    # A presença futura não conta como treino para o aluno 1
+    assert scores["semanas_sem_treinar"][1] == esperado["semanas_sem_treinar"][1]
+
+
+def test_presenca_anterior_a_janela_e_ignorada():
+    scores = _scores([0], [-1], [5], n=1)
+    assert scores["sequencia_semanas"][0] == 0
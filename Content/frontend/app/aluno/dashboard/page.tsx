@@ -2,7 +2,7 @@
 import { useEffect, useState } from "react";
 import Link from "next/link";
 import { useAuth } from "@/context/AuthContext";
-import api, { eventosAPI } from "@/services/api";
+import api, { eventosAPI, listarTodos } from "@/services/api";
 import ProtectedRoute from "@/middleware/ProtectedRoute";
 import { Shield, Zap, Target, ArrowRight, Trophy } from "lucide-react";
 import { toast } from "react-hot-toast";
@@ -20,7 +20,7 @@ function AlunoDashboard() {
         if (user) {
             Promise.all([
                 api.get("/alunos/meu-progresso"),
-                api.get("/pagamentos/meus"),
+                listarTodos("/pagamentos/meus"),
                 eventosAPI.listarFeed() // Carrega as competições abertas
             ]).then(([prog, pag, ev]) => {
                 setStats(prog.data);
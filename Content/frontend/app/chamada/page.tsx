@@ -1,6 +1,6 @@
 ﻿"use client";
 import { useState, useEffect } from "react";
-import api from "@/services/api";
+import api, { alunosAPI } from "@/services/api";
 import * as React from "react";
 
 export default function ChamadaPage() {
@@ -11,7 +11,7 @@ export default function ChamadaPage() {
 
     // Carregar alunos do Dojo ao abrir a página
     useEffect(() => {
-        api.get("/alunos/").then((res) => {
+        alunosAPI.listar().then((res) => {
             setAlunos(res.data);
             // Inicializa todos como presentes por padrão
             const init: any = {};
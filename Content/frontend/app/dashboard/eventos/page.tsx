@@ -3,7 +3,7 @@ import { useEffect, useState } from "react";
 import { useAuth } from "@/context/AuthContext";
 import ProtectedRoute from "@/middleware/ProtectedRoute";
 import DashboardLayout from "@/components/DashboardLayout";
-import api from "@/services/api";
+import api, { eventosAPI } from "@/services/api";
 import { Calendar, Trophy, Users, Plus, Zap, Globe, Lock, Eye } from "lucide-react";
 import * as React from "react";
 import BracketView from "@/components/BracketView";
@@ -50,7 +50,7 @@ function EventosPage() {
     const fetchEventos = async () => {
         try {
             // Rota para buscar eventos do dojo logado
-            const res = await api.get("/eventos/meus");
+            const res = await eventosAPI.listarMeus();
             setEventos(res.data);
         } catch (error) {
             console.error("Erro ao carregar eventos");
@@ -82,6 +82,25 @@ function EventosPage() {
         }
     };
 
+    const verChaves = async (eventoId: string, categoriaId: string) => {
+        try {
+            const { data } = await eventosAPI.verChaves(eventoId, categoriaId);
+            setCategoriaVisualizar({ eventoId, catId: categoriaId, chaves: data || null });
+        } catch (error: any) {
+            alert(error.response?.data?.detail || "Erro ao carregar chaves");
+        }
+    };
+
+    const registrarVencedor = async (lutaId: string, vencedorId: string) => {
+        if (!categoriaVisualizar) return;
+        try {
+            await eventosAPI.registrarResultado(categoriaVisualizar.eventoId, lutaId, vencedorId);
+            await verChaves(categoriaVisualizar.eventoId, categoriaVisualizar.catId);
+        } catch (error: any) {
+            alert(error.response?.data?.detail || "Erro ao registrar resultado");
+        }
+    };
+
     return (
         <DashboardLayout>
             <div className="flex justify-between items-center mb-8">
@@ -251,14 +270,7 @@ function EventosPage() {
                                                         <Zap size={12} />
                                                     </button>
                                                     <button 
-                                                        onClick={() => {
-                                                            const chavesAll = evento.chaves_json ? JSON.parse(evento.chaves_json) : {};
-                                                            setCategoriaVisualizar({
-                                                                eventoId: evento.id,
-                                                                catId: cat.id,
-                                                                chaves: chavesAll[cat.id] || null
-                                                            });
-                                                        }}
+                                                        onClick={() => verChaves(evento.id, cat.id)}
                                                         className="bg-primary/10 text-primary p-1 rounded hover:bg-primary/20 transition-colors"
                                                         title="Visualizar Chaves"
                                                     >
@@ -276,7 +288,7 @@ function EventosPage() {
                                                 <p className="text-[10px] font-bold text-secondary uppercase italic">Árvore de Competição</p>
                                                 <button onClick={() => setCategoriaVisualizar(null)} className="text-[10px] text-gray-400 hover:text-red-500">Fechar</button>
                                             </div>
-                                            <BracketView chaves={categoriaVisualizar.chaves} />
+                                            <BracketView chaves={categoriaVisualizar.chaves} onVencedor={registrarVencedor} />
                                         </div>
                                     )}
                                 </div>
@@ -1,7 +1,7 @@
 "use client";
 import { useEffect, useState } from "react";
 import { useParams } from "next/navigation";
-import api from "@/services/api";
+import api, { eventosAPI } from "@/services/api";
 import { Calendar, MapPin, Trophy, ShieldCheck, Zap } from "lucide-react";
 import { toast, Toaster } from "react-hot-toast";
 
@@ -25,7 +25,7 @@ export default function EventoPublicoPage() {
     const fetchEvento = async () => {
         try {
             // Rota pública para detalhes do evento (precisamos garantir que o backend permita)
-            const res = await api.get(`/eventos/feed`);
+            const res = await eventosAPI.listarFeed();
             const ev = res.data.find((e: any) => e.id === id);
             if (!ev) throw new Error("Evento não encontrado");
             setEvento(ev);
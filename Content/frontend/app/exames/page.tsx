@@ -8,12 +8,12 @@ export default function ExamesPage() {
 
     useEffect(() => {
         // Busca alunos que ja atingiram o progresso minimo
-        api.get("/alunos/candidatos-graduacao").then((res) => setCandidatos(res.data));
+        api.get("/alunos/progresso", { params: { pronto_para_exame: true } }).then((res) => setCandidatos(res.data));
     }, []);
 
     const realizarGraduacao = async (alunoId: string, proximaGradId: string) => {
         try {
-            await api.post(`/alunos/${alunoId}/graduar`, { nova_gradu_id: proximaGradId });
+            await api.post(`/alunos/${alunoId}/graduar`, null, { params: { nova_gradu_id: proximaGradId } });
             alert("Graduacao realizada!");
             setCandidatos(prev => prev.filter(a => a.id !== alunoId));
         } catch (err) {
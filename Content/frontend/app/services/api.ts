@@ -13,26 +13,42 @@ api.interceptors.request.use((config) => {
     return config;
 });
 
+// Listagens são paginadas por cursor ({ items, next_cursor }).
+// Para telas que precisam da lista completa, segue os cursores até o fim.
+export async function listarTodos(url: string, params: Record<string, any> = {}) {
+    const items: any[] = [];
+    let cursor: string | null = null;
+    do {
+        const res: any = await api.get(url, { params: { ...params, limit: 200, cursor: cursor ?? undefined } });
+        items.push(...res.data.items);
+        cursor = res.data.next_cursor;
+    } while (cursor);
+    return { data: items };
+}
+
 export const authAPI = {
     login: (email: string, senha: string) => api.post("/auth/login", { email, senha }),
 };
 
 export const alunosAPI = {
-    listar: () => api.get("/alunos"),
+    listar: () => listarTodos("/alunos"),
     criar: (dados: any) => api.post("/alunos", dados),
 };
 
 export const pagamentosAPI = {
-    listar: () => api.get("/pagamentos"),
+    listar: () => listarTodos("/pagamentos"),
     criar: (dados: any) => api.post("/pagamentos", dados),
 };
 
 export const eventosAPI = {
     criar: (dados: any) => api.post("/eventos", dados),
-    listarMeus: () => api.get("/eventos/meus"),
-    listarFeed: () => api.get("/eventos/feed"),
+    listarMeus: () => listarTodos("/eventos/meus"),
+    listarFeed: () => listarTodos("/eventos/feed"),
     inscrever: (eventoId: string, categoriaId: string) => api.post(`/eventos/${eventoId}/inscrever`, { categoria_id: categoriaId }),
     gerarChaves: (eventoId: string, categoriaId: string) => api.post(`/eventos/${eventoId}/gerar-chaves`, { categoria_id: categoriaId }),
+    verChaves: (eventoId: string, categoriaId: string) => api.get(`/eventos/${eventoId}/chaves`, { params: { categoria_id: categoriaId } }),
+    registrarResultado: (eventoId: string, lutaId: string, vencedorId: string) =>
+        api.post(`/eventos/${eventoId}/lutas/${lutaId}/resultado`, { vencedor_id: vencedorId }),
 };
 
 export default api;